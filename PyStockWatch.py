@@ -1,10 +1,24 @@
 import contextlib
 from os import devnull
-from sys import argv
+from sys import argv, exit
+
+# the startup profile has to be enabled before anything else is imported to time the imports,
+# run with --startup-profile to print it, or --startup-profile=file.json to also write it
+from StockWatch._startup_profile import PROFILE
+if any(arg.startswith('--startup-profile') for arg in argv):
+    PROFILE.enable()
+
+# headless mode, keeps the tables of a watchlist current without windows (or tkinter):
+#   $ python3 PyStockWatch.py daemon --watchlist watchlist.txt
+if argv[1:2] == ['daemon']:
+    from StockWatch._daemon import main
+    exit(main(argv[2:]))
+
 from tkinter import *
 from tkinter import ttk
 
-from StockWatch import MainControl, AutoComplete, Link, ToolTip, DisplayWindow, TimeKeep
+from StockWatch import MainControl, AutoComplete, Link, ToolTip, DisplayWindow, TimeKeep, QuoteHub, UIDispatcher, AsyncEngine
+from StockWatch import MetricsDumper, StatsPanel, TRACE
 
 
 class Main(Frame):
@@ -15,24 +29,57 @@ class Main(Frame):
         and access database on the same connection useing different scoped sessions.
     """
 
-    def __init__(self, parent):
+    def __init__(self, parent, provider=None, metricsPath=None, asyncEngine=False):
         """
         Main object constructor.
 
         Args:
             parent: root Tk() window
+            provider (DataProvider object, optional): the source of all market data. Defaults to YahooProvider().
+            metricsPath (String, optional): path of a file to dump metrics snapshots to periodically. Defaults to None.
+            asyncEngine (Boolean, optional): True to run the engines of all windows on a shared AsyncEngine,
+                instead of two threads per window. Defaults to False.
         """
         super().__init__(parent)
         self.parent = parent
         self.parent.protocol("WM_DELETE_WINDOW", self._close_window)
 
         # declare a TimeKeep instance for time control, and start its engine
-        self.timeKeep = TimeKeep()
-        self.timeKeep.start()
+        with PROFILE.phase('TimeKeep'):
+            self.timeKeep = TimeKeep()
+            self.timeKeep.start()
+
+        # declare a QuoteHub instance to fetch quotes of all windows in one request, and start its engine
+        with PROFILE.phase('QuoteHub'):
+            self.quoteHub = QuoteHub(self.timeKeep, fetcher=provider.quotes if provider else None)
+            self.quoteHub.start()
+
+        # declare a UIDispatcher instance, the only path from engine threads to widgets, and start its pump
+        with PROFILE.phase('UIDispatcher'):
+            self.ui = UIDispatcher(self.parent)
+            self.ui.start()
+
+        # declare an AsyncEngine instance, the event loop running the engines of all windows, if asked to,
+        # and start it (without it every window runs its engine in two threads of its own)
+        self.engine = None
+        if asyncEngine:
+            with PROFILE.phase('AsyncEngine'):
+                self.engine = AsyncEngine()
+                self.engine.start()
+
+        # declare a MetricsDumper instance to dump stage metrics periodically if asked to, and start it
+        self.metricsPath = metricsPath
+        self.metricsDumper = None
+        if metricsPath:
+            self.metricsDumper = MetricsDumper(metricsPath)
+            self.metricsDumper.start()
+        self.statsPanel = None
 
         # declare a MainControl instance for database control
-        self.db_con = MainControl()
-        self.symbols = self.db_con.symbols.get_symbols()
+        with PROFILE.phase('MainControl'):
+            self.db_con = MainControl(provider=provider)
+        with PROFILE.phase('symbols index'):
+            self.symbols = self.db_con.symbols.get_index()
 
         # create window with geometry
         self.parent.title('PyStockWatch')
@@ -50,7 +97,24 @@ class Main(Frame):
             self.prtHeight / 2), 'taken': False} for i in range(8)]  # WOHOHOHO, WHAT A RIDE
 
         # show this window
-        self._run_mainWindow()
+        with PROFILE.phase('main window'):
+            self._run_mainWindow()
+
+        # refresh a stale symbols list in the background, the existing one is used meanwhile
+        if self.db_con.symbols.needs_refresh():
+            self.db_con.symbols.refresh_async(self._swap_symbols)
+
+    def _swap_symbols(self, index):
+        """
+        Private instance method _swap_symbols() is called from the symbols refresh thread
+            with the new symbols index, it replaces the index used by auto-complete.
+            (input validation checks the symbols table directly so it needs no swap)
+
+        Args:
+            index (SymbolIndex): the new prefix index of the symbols table
+        """
+        self.symbols = index
+        self.autoComplete.index = index
 
     def _get_display_cell(self):
         """
@@ -91,7 +155,7 @@ class Main(Frame):
         self.symInput.pack(pady=6)
         ToolTip(self.symInput,
                 text='Single Symbol: msft\nMultiple Symbols: msft aapl amzn')
-        AutoComplete(self.symInput, self.symbols)
+        self.autoComplete = AutoComplete(self.symInput, self.symbols, search=self.db_con.symbols.search)
 
         # RUN BUTTON
         runButton = Button(mainFrame, text='Check', fg='red',
@@ -108,6 +172,22 @@ class Main(Frame):
                             command=lambda: self._close_window(), width=8, height=1)
         exitButton.place(anchor='s', relx=1, rely=1, y=-15, x=-65)
 
+        # STATS BUTTON
+        statsButton = Button(root, text='Stats', command=lambda: self._open_stats(), width=8, height=1)
+        statsButton.place(anchor='s', relx=0, rely=1, y=-15, x=65)
+        ToolTip(statsButton, text='Timing of every stage\n(network, database, render)')
+
+    def _open_stats(self):
+        """
+        Private instance method _open_stats() is called when Stats button is clicked,
+            it opens the stats panel, or raises it if it's already open.
+        """
+        if self.statsPanel is not None and self.statsPanel.alive:
+            self.statsPanel.lift()
+            return
+        # a child of the root window, not of this frame, whose children are all display windows
+        self.statsPanel = StatsPanel(self.parent, dumpPath=self.metricsPath)
+
     def _run(self):
         """
         Private instance method _run() is called when Check button is clicked
@@ -129,7 +209,7 @@ class Main(Frame):
                 symbol = symbol.upper()
                 # if the symbol is not in the database (AKA incorrect)
                 # display and error message
-                if not any(sym == symbol for sym in self.symbols['Symbol']):
+                if not self.db_con.symbols.is_symbol(symbol):
                     self.errorVar.set(
                         f'ticker "{symbol}" is not a valid ticker')
                 else:
@@ -169,6 +249,13 @@ class Main(Frame):
             child.stop_engine()
 
         self.timeKeep.kill()
+        self.quoteHub.kill()
+        self.ui.kill()
+        if self.engine:
+            self.engine.kill()
+        self.db_con.writer.kill()
+        if self.metricsDumper:
+            self.metricsDumper.kill()
 
         # destroy window
         root.destroy()
@@ -177,10 +264,42 @@ class Main(Frame):
 #################################################
 if __name__ == '__main__':
     root = Tk()
+    # record the live data provider, or replay a recording instead (offline):
+    #   --record=session.rec, --replay=session.rec [--replay-speed=10] [--replay-latency=0.05]
+    # and dump stage metrics snapshots to a file every 10 seconds:
+    #   --metrics-dump=metrics.jsonl
+    # trace events below a level are dropped, and the trace ring is dumped to a file on an uncaught exception:
+    #   --trace-level=info, --trace-dump=trace.log
+    # run the engines of all windows as tasks on one event loop, instead of two threads per window:
+    #   --async-engine
+    options = dict(arg[2:].split('=', 1) for arg in argv[1:] if arg.startswith('--') and '=' in arg)
+    from StockWatch._trace import LEVELS
+    TRACE.level = LEVELS.get(options.get('trace-level', 'debug').lower(), TRACE.level)
+    TRACE.install_dump(options.get('trace-dump'))
+
+    def report_callback_exception(excType, value, traceback):
+        # exceptions in tkinter callbacks are reported by tkinter, not by sys.excepthook
+        TRACE.dump_failure(value)
+        Tk.report_callback_exception(root, excType, value, traceback)
+    root.report_callback_exception = report_callback_exception
+
+    provider = None
+    if 'record' in options or 'replay' in options:
+        from StockWatch._providers import provider_from_args
+        provider = provider_from_args(options.get('record'), options.get('replay'),
+                                      float(options.get('replay-speed', 1)),
+                                      float(options['replay-latency']) if 'replay-latency' in options else None)
+    if PROFILE.enabled:
+        # the first idle callback runs once the main window is drawn
+        profilePath = next((arg.split('=', 1)[1] for arg in argv if arg.startswith('--startup-profile=')), None)
+        root.after_idle(lambda: PROFILE.report(profilePath))
     if 'silent' in argv:
+        # trace events are still recorded in the ring (to be dumped), but never formatted or printed,
+        # stdout is still silenced for the output of third-party libraries
+        TRACE.echo = False
         with open(devnull, "w") as f, contextlib.redirect_stdout(f):
-            run = Main(root)
+            run = Main(root, provider, options.get('metrics-dump'), '--async-engine' in argv)
             root.mainloop()
     else:
-        run = Main(root)
+        run = Main(root, provider, options.get('metrics-dump'), '--async-engine' in argv)
         root.mainloop()
@@ -1,4 +1,30 @@
-from ._db_control import MainControl
-from ._helper_toolbox import AutoComplete, Link, ToolTip
-from ._sym_window import DisplayWindow
-from ._time_control import TimeKeep
+# names exported by the package -> the submodule that defines them,
+# submodules are imported on first access so "__main__" only pays for what it uses
+_EXPORTS = {
+    'MainControl': '._db_control',
+    'AutoComplete': '._helper_toolbox',
+    'Link': '._helper_toolbox',
+    'ToolTip': '._helper_toolbox',
+    'QuoteHub': '._quote_hub',
+    'DisplayWindow': '._sym_window',
+    'TimeKeep': '._time_control',
+    'UIDispatcher': '._ui_dispatcher',
+    'AsyncEngine': '._async_engine',
+    'IngestDaemon': '._daemon',
+    'PROFILE': '._startup_profile',
+    'METRICS': '._metrics',
+    'MetricsDumper': '._metrics',
+    'StatsPanel': '._stats_panel',
+    'TRACE': '._trace',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    # __import__ rather than importlib.import_module, so the startup profile sees it
+    value = getattr(__import__(__name__ + _EXPORTS[name], fromlist=[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,118 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Event, Thread
+
+from ._trace import TRACE
+
+# default number of blocking jobs that may run at once, per kind of work
+NET_LIMIT = 8
+DB_LIMIT = 4
+
+
+class AsyncEngine():
+    """
+    Class AsyncEngine represents a single asyncio event loop running in a background thread, that runs the
+        time and data tasks of all symbol windows, instead of two threads per window.
+    Blocking work (network fetches, database reads, pandas) is run in a small shared thread pool,
+        bounded per kind of work by semaphores, so a large watchlist never opens more than NET_LIMIT
+        connections to yahoo, or keeps more than DB_LIMIT database reads busy, at once (database writes are
+        bounded by the DbWriter, a single writer thread).
+    The class is intended to be initialized and started only once by the Main window object (with --async-engine),
+        or by the ingest daemon, and passed down to DisplayWindow objects.
+    """
+
+    def __init__(self, netLimit=NET_LIMIT, dbLimit=DB_LIMIT):
+        """
+        AsyncEngine object constructor.
+
+        Args:
+            netLimit (int, optional): the most network jobs run at once. Defaults to NET_LIMIT.
+            dbLimit (int, optional): the most database jobs run at once. Defaults to DB_LIMIT.
+        """
+        TRACE.info('>>>> [MAIN]: INITIALIZING ASYNC ENGINE')
+        # primary switch
+        self.alive = True
+
+        self.limits = {'net': netLimit, 'db': dbLimit}
+        self.executor = ThreadPoolExecutor(max_workers=netLimit + dbLimit, thread_name_prefix='engine')
+        self.loop = asyncio.new_event_loop()
+        # semaphores are created on the loop once it runs
+        self._semaphores = {}
+        self._ready = Event()
+
+    def _run_loop(self):
+        """
+        Private instance method _run_loop() runs the event loop until kill() stops it.
+        """
+        asyncio.set_event_loop(self.loop)
+        self._semaphores = {kind: asyncio.Semaphore(limit) for kind, limit in self.limits.items()}
+        self._ready.set()
+        self.loop.run_forever()
+
+        # cancel whatever is left, and let the tasks handle their cancellation
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+        TRACE.info('>>>> [MAIN] async engine terminated - primary switch triggered')
+
+    def start(self):
+        """
+        Instance method start() creates and starts a thread that runs the event loop in daemon mode,
+            and waits until the loop is ready to take tasks.
+        """
+        engineThread = Thread(target=self._run_loop, daemon=True)
+        engineThread.start()
+        self._ready.wait()
+
+    def submit(self, coroutine):
+        """
+        Instance method submit() schedules a coroutine as a task on the event loop, it can be called from any thread.
+
+        Args:
+            coroutine (coroutine): the coroutine to run
+
+        Returns:
+            concurrent.futures.Future: the future of the task, cancelling it cancels the task
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call_soon(self, function, *args):
+        """
+        Instance method call_soon() calls a function on the event loop thread, it can be called from any thread,
+            it is used to signal asyncio events from other threads.
+
+        Args:
+            function (callable): the function to call
+        """
+        if self.alive:
+            self.loop.call_soon_threadsafe(function, *args)
+
+    async def run_blocking(self, kind, function, *args, **kwargs):
+        """
+        Instance coroutine run_blocking() runs a blocking function in the thread pool once a slot of its kind is free.
+
+        Args:
+            kind (String): 'net' or 'db', or None for work of neither kind (it takes no slot)
+            function (callable): the blocking function
+
+        Returns:
+            the return value of function
+        """
+        if kind is None:
+            return await self.loop.run_in_executor(self.executor, partial(function, *args, **kwargs))
+        async with self._semaphores[kind]:
+            return await self.loop.run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+    def kill(self):
+        """
+        Instance function kill() stops the event loop, cancelling all tasks, and shuts the thread pool down
+            without waiting for running jobs.
+        """
+        if not self.alive:
+            return
+        self.alive = False
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
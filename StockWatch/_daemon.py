@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import signal
+import sys
+from concurrent.futures import CancelledError
+from time import perf_counter
+
+from ._async_engine import AsyncEngine
+from ._db_control import MainControl, TableControl
+from ._metrics import DUMP_INTERVAL, METRICS, MetricsDumper
+from ._providers import provider_from_args
+from ._time_control import TimeKeep
+from ._trace import DUMP_PATH, LEVELS, TRACE
+
+# seconds between the starts of two update cycles while the market is open
+INTERVAL = 60
+
+
+def read_watchlist(path):
+    """
+    Function read_watchlist() reads the symbols of a watchlist file, separated by spaces or new lines,
+        anything after a '#' on a line is a comment.
+
+    Args:
+        path (String): path of the watchlist file
+
+    Returns:
+        list: the upper case symbols, without duplicates, in file order
+    """
+    symbols = []
+    with open(path) as watchlist:
+        for line in watchlist:
+            symbols += line.split('#', 1)[0].upper().split()
+    return list(dict.fromkeys(symbols))
+
+
+class IngestDaemon():
+    """
+    Class IngestDaemon represents the data engine without windows, it keeps the tables of a watchlist current
+        in the database: the first cycle backfills every table (TableControl.write_table()), and every
+        following cycle updates the last entry of each (TableControl.update_last()) once every interval
+        while the market is open, and waits for the open while it's closed.
+    The tables are synced as tasks on an AsyncEngine, so the engine limits bound the concurrent fetches,
+        and the shared UPSTREAM limits the request rate. Failed symbols are retried on the next cycle.
+    Every cycle reports its throughput (symbols and rows per second), and kill() reports the totals.
+    """
+
+    def __init__(self, symbols, db_con, timeKeep, engine, interval=INTERVAL):
+        """
+        IngestDaemon object constructor.
+
+        Args:
+            symbols (list): the symbols of the watchlist
+            db_con (MainControl object): a MainControl database connection object
+            timeKeep (TimeKeep object): a started TimeKeep object
+            engine (AsyncEngine object): a started AsyncEngine object
+            interval (int, optional): seconds between the starts of two update cycles. Defaults to INTERVAL.
+        """
+        TRACE.info('>>>> [DAEMON]: INITIALIZING INGEST DAEMON (%d symbols)', len(symbols))
+        # primary switch
+        self.alive = True
+
+        self.timeKeep = timeKeep
+        self.engine = engine
+        self.interval = interval
+        self.tables = {sym: TableControl(sym, db_con, timeKeep) for sym in symbols}
+        self._preload(db_con)
+
+        # totals of all cycles
+        self.cycles = 0
+        self.synced = 0
+        self.failed = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+        self._task = None
+        self._marketSignal = None
+
+    def _preload(self, db_con):
+        """
+        Private instance method _preload() reads the tables that have no history file to be loaded from
+            in a single query, and fills their caches, so the first cycle doesn't read them one by one.
+
+        Args:
+            db_con (MainControl object): a MainControl database connection object
+        """
+        missing = [sym for sym, table in self.tables.items() if not table.cache.stored]
+        if not missing:
+            return
+        with METRICS.timed('db.read', 'watchlist'):
+            bars = db_con.bars.read_bars(missing)
+        for sym, frame in bars.items():
+            self.tables[sym].cache.preload(frame)
+
+    def _market_transition(self, isOpen):
+        """
+        Private instance method _market_transition() is the callback subscribed to timeKeep,
+            it wakes the daemon up on market open.
+
+        Args:
+            isOpen (Boolean): True if the market has just opened, False if it has just closed
+        """
+        if self._marketSignal is not None:
+            self.engine.call_soon(self._marketSignal.set if isOpen else self._marketSignal.clear)
+
+    async def _sync(self, sym, backfill):
+        """
+        Private instance coroutine _sync() backfills or updates the table of a symbol.
+
+        Args:
+            sym (String): the symbol
+            backfill (Boolean): True to backfill the table, False to update its last entry
+
+        Returns:
+            int: the number of rows written, None if the sync failed
+        """
+        table = self.tables[sym]
+        try:
+            rows = await self.engine.run_blocking('net', table.write_table if backfill else table.update_last)
+        except Exception as e:
+            TRACE.error('>> [%s]: sync failed %r', sym, e)
+            return None
+        return rows if rows else 0
+
+    async def _cycle(self, pending):
+        """
+        Private instance coroutine _cycle() syncs every table once, backfilling the pending ones,
+            and reports the throughput of the cycle.
+
+        Args:
+            pending (set): the symbols whose tables were not backfilled yet
+
+        Returns:
+            set: the symbols whose backfill failed
+        """
+        start_time = perf_counter()
+        symbols = list(self.tables)
+        results = await asyncio.gather(*(self._sync(sym, sym in pending) for sym in symbols))
+        seconds = perf_counter() - start_time
+
+        failed = [sym for sym, rows in zip(symbols, results) if rows is None]
+        rows = sum(rows for rows in results if rows)
+        synced = len(symbols) - len(failed)
+        self.cycles += 1
+        self.synced += synced
+        self.failed += len(failed)
+        self.rows += rows
+        self.seconds += seconds
+        TRACE.info('>>>> [DAEMON]: cycle %d (%s): %d/%d symbols, %d rows in %.1fs, %.1f symbols/s, %.0f rows/s',
+                   self.cycles, 'backfill' if pending else 'update', synced, len(symbols), rows, seconds,
+                   synced / seconds, rows / seconds)
+        if failed:
+            TRACE.warning('>>>> [DAEMON]: failed, retried next cycle: %s', ' '.join(failed))
+        return pending.intersection(failed)
+
+    async def _run(self):
+        """
+        Private instance coroutine _run() runs cycles as long as the primary switch == True.
+        """
+        self._marketSignal = asyncio.Event()
+        if self.timeKeep.msBool:
+            self._marketSignal.set()
+        pending = set(self.tables)
+        while self.alive:
+            start_time = perf_counter()
+            pending = await self._cycle(pending)
+            if pending or self._marketSignal.is_set():
+                await asyncio.sleep(max(0, self.interval - (perf_counter() - start_time)))
+            else:
+                TRACE.info('>>>> [DAEMON]: market closed, waiting for the open')
+                await self._marketSignal.wait()
+
+    def start(self):
+        """
+        Instance method start() subscribes to timeKeep and submits the cycles to the engine.
+        """
+        TRACE.info('>>>> [DAEMON]: STARTING INGEST DAEMON')
+        self.timeKeep.subscribe(self._market_transition)
+        self._task = self.engine.submit(self._run())
+
+    def wait(self):
+        """
+        Instance method wait() blocks until the daemon is killed.
+        """
+        try:
+            self._task.result()
+        except CancelledError:
+            pass
+
+    def report(self):
+        """
+        Instance method report() prints the throughput of all cycles so far.
+        """
+        seconds = self.seconds if self.seconds else float('nan')
+        TRACE.info('>>>> [DAEMON]: %d cycles: %d symbols synced (%d failed), %d rows in %.1fs, %.1f symbols/s, %.0f rows/s',
+                   self.cycles, self.synced, self.failed, self.rows, self.seconds, self.synced / seconds,
+                   self.rows / seconds)
+
+    def kill(self):
+        """
+        Instance function kill() stops the daemon by setting the primary switch to False
+            and cancelling its cycles, and reports the totals.
+        """
+        if not self.alive:
+            return
+        self.alive = False
+        self.timeKeep.unsubscribe(self._market_transition)
+        if self._task is not None:
+            self._task.cancel()
+        self.report()
+        TRACE.info('>>>> [DAEMON] ingest daemon terminated - primary switch triggered')
+
+
+def main(args=None):
+    """
+    Function main() runs the ingest daemon from the command line until it's interrupted (Ctrl+C or SIGTERM).
+
+        $ python3 PyStockWatch.py daemon --watchlist watchlist.txt [--interval 60] [--db stocks.db]
+            [--record session.rec | --replay session.rec [--replay-speed 10] [--replay-latency 0.05]]
+            [--metrics-dump metrics.jsonl [--metrics-interval 10]] [--trace-level info] [--trace-dump trace.log]
+    The trace ring is dumped to the trace dump file on an uncaught exception, or on SIGUSR1.
+
+    Args:
+        args (list, optional): command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: the exit status
+    """
+    parser = argparse.ArgumentParser(prog='PyStockWatch.py daemon',
+                                     description='Keep the tables of a watchlist current without windows.')
+    parser.add_argument('--watchlist', required=True, help='file of symbols, separated by spaces or new lines')
+    parser.add_argument('--interval', type=int, default=INTERVAL, help='seconds between update cycles')
+    parser.add_argument('--db', default='stocks.db', help='path of the sqlite database file')
+    parser.add_argument('--record', help='record the data provider to this file')
+    parser.add_argument('--replay', help='replay a recording instead of the live data provider (offline)')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='replay clock speed')
+    parser.add_argument('--replay-latency', type=float, help='seconds every replayed call takes')
+    parser.add_argument('--metrics-dump', help='append stage metrics snapshots to this file')
+    parser.add_argument('--metrics-interval', type=float, default=DUMP_INTERVAL, help='seconds between snapshots')
+    parser.add_argument('--trace-level', choices=list(LEVELS), default='debug', help='lowest level of trace events')
+    parser.add_argument('--trace-dump', default=DUMP_PATH, help='file the trace ring is dumped to')
+    args = parser.parse_args(args)
+
+    TRACE.level = LEVELS[args.trace_level]
+    TRACE.install_dump(args.trace_dump)
+    # events are echoed as they happen, even when stdout is a pipe or a file
+    sys.stdout.reconfigure(line_buffering=True)
+
+    symbols = read_watchlist(args.watchlist)
+    if not symbols:
+        TRACE.error('>>>> [DAEMON]: no symbols in %s', args.watchlist)
+        return 1
+
+    timeKeep = TimeKeep()
+    timeKeep.start()
+    engine = AsyncEngine()
+    engine.start()
+    provider = provider_from_args(args.record, args.replay, args.replay_speed, args.replay_latency)
+    dumper = MetricsDumper(args.metrics_dump, args.metrics_interval) if args.metrics_dump else None
+    if dumper:
+        dumper.start()
+    db_con = MainControl(args.db, provider)
+    daemon = IngestDaemon(symbols, db_con, timeKeep, engine, interval=args.interval)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.kill())
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: TRACE.dump(reason='SIGUSR1'))
+    daemon.start()
+    try:
+        daemon.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.kill()
+        engine.kill()
+        db_con.writer.kill()
+        timeKeep.kill()
+        if dumper:
+            dumper.kill()
+    return 0
@@ -1,48 +1,104 @@
-from threading import Thread
+import asyncio
+from threading import Event, Thread
 from time import sleep, time
 
-import pandas_datareader as fetch
-
 from ._db_control import TableControl
+from ._metrics import METRICS
+from ._resilience import Backoff, CircuitOpenError
+from ._trace import TRACE
+
+# seconds to wait for a quote from the quote hub before counting it as a failed attempt
+QUOTE_TIMEOUT = 10
 
 
 class DataControl():
     """
     Class DataControl is a data controller object for a DisplayWindow object, it organizes the processes
         of table reading/writing and updating data on the symbol data display window.
-    The class is designed to act as an engine, once started, two parallel threads for time generation
-        and data generation are created, each thread runs a loop that keeps generating and updating data
-        as long as the primary switch variable is True AND the window exists as a secondary kill switch.
+    The class is designed to act as an engine, once started, a time generator and a data generator
+        keep generating and updating data as long as the primary switch variable is True. They run as two tasks
+        on the shared AsyncEngine event loop, or, without an engine, as two parallel threads.
+    Both ways run the same step methods, only the waiting differs.
     """
 
-    def __init__(self, db_con, timeKeep):
+    def __init__(self, db_con, timeKeep, quoteHub, ui, engine=None):
         """
         DataControl contstructor
 
         Args:
             db_con (MainControl object): a MainControl database connection object
             timeKeep (TimeKeep object): a Time Keep object
+            quoteHub (QuoteHub object): a shared QuoteHub object
+            ui (UIDispatcher object): the shared UIDispatcher object, engine threads update widgets only through it
+            engine (AsyncEngine object, optional): the shared AsyncEngine object, the generators run as its tasks.
+                Defaults to None (two threads).
         """
-        print(f'>>> [{self.sym}]: INITIALIZING DATA CONTROL')
+        TRACE.info('>>> [%s]: INITIALIZING DATA CONTROL', self.sym)
         # primary switch flag for time and data generators
         self.alive = True
         # reference timeKeep as an instance variable
         self.timeKeep = timeKeep
+        # reference quoteHub, and the latest quote it delivered
+        self.quoteHub = quoteHub
+        self._quoteReady = Event()
+        self._quote = None
+        self._quoteError = None
+        # reference the ui dispatcher
+        self.ui = ui
+        # reference the async engine, the futures of the generator tasks, and the asyncio events
+        # signalled from the quote hub and timeKeep threads (created on the event loop)
+        self.engine = engine
+        self._tasks = []
+        self._quoteSignal = None
+        self._marketSignal = None
+        # retry delays of the data generator, reset on every successful fetch
+        self._backoff = Backoff()
         # initialize database table control using passed database connection
         self.db = TableControl(self.sym, db_con, timeKeep)
-        # instance varialbe of the current data in the table after initialization
-        self.dbRead = self.db.read_table()
-        # instance boolean variable of whather the market is open or closed
-        self.msbool = None
+        # load the table into the history cache after initialization
+        self.db.read_table()
+        # instance boolean variable of whather the market is open or closed,
+        # set by timeKeep on market open/close, and an event set while it's open
+        self.msBool = None
+        self._marketOpen = Event()
+
+    @property
+    def dbRead(self):
+        """
+        Dataframe: the current data in the symbol table, a view of the table's history cache.
+        """
+        return self.db.read_table()
+
+    @property
+    def dbPyramid(self):
+        """
+        OHLCPyramid: the daily, weekly, monthly and quarterly bars of dbRead, cached with it.
+        """
+        return self.db.cache.pyramid()
+
+    @property
+    def dbStats(self):
+        """
+        RollingStats: the 52-week high/low and average volume of dbRead, kept current with it.
+        """
+        return self.db.cache.stats()
 
     def start_engine(self):
         """
         Instance methos start_engine() is called to, well, start the engine.
-        It creates a first thread that runs __timeGen(), and a second thread
-            that runs __dataGet(), separately.
+        With an AsyncEngine, it submits _time_task() and _data_task() to its event loop, otherwise it creates
+            a first thread that runs _timeGen(), and a second thread that runs _dataGen(), separately.
         The threads are started in daemon mode so they die on exceptions and returns.
         """
-        print(f'>> [{self.sym}]: STARTING ENGINE')
+        TRACE.info('>> [%s]: STARTING ENGINE', self.sym)
+        self.quoteHub.subscribe(self.sym, self._receive_quote)
+        self.timeKeep.subscribe(self._market_transition)
+
+        if self.engine is not None:
+            self._tasks = [self.engine.submit(self._time_task()),
+                           self.engine.submit(self._data_task())]
+            return
+
         timeThread = Thread(target=self._timeGen, daemon=True)
         timeThread.start()
 
@@ -52,49 +108,189 @@ class DataControl():
     def stop_engine(self):
         """
         Instance function stop_engine() kills running threads by
-            setting the primary switch to False so the loops break.
+            setting the primary switch to False so the loops break, or cancels the running tasks.
         """
         self.alive = False
+        self.quoteHub.unsubscribe(self.sym, self._receive_quote)
+        self.timeKeep.unsubscribe(self._market_transition)
+        # release the data generator if it's waiting for the market to open
+        self._marketOpen.set()
+        for task in self._tasks:
+            task.cancel()
+
+    def _market_transition(self, isOpen):
+        """
+        Private instance method _market_transition() is the callback subscribed to timeKeep,
+            it is called on market open and close.
+
+        Args:
+            isOpen (Boolean): True if the market has just opened, False if it has just closed
+        """
+        self.msBool = isOpen
+        if isOpen:
+            self._marketOpen.set()
+        else:
+            self._marketOpen.clear()
+        if self._marketSignal is not None:
+            self.engine.call_soon(self._marketSignal.set if isOpen else self._marketSignal.clear)
+
+    def _receive_quote(self, sym, quote, error):
+        """
+        Private instance method _receive_quote() is the callback subscribed to the quote hub,
+            it keeps the latest quote (or error) and signals the data generator.
+
+        Args:
+            sym (String): the symbol of the quote
+            quote (Dataframe): a single row dataframe of the quote
+            error (Exception): the error raised on fetch, None if the fetch succeeded
+        """
+        self._quote = quote
+        self._quoteError = error
+        self._quoteReady.set()
+        if self._quoteSignal is not None:
+            self.engine.call_soon(self._quoteSignal.set)
+
+    def _take_quote(self):
+        """
+        Private instance method _take_quote() returns the quote delivered by the quote hub, once it's signalled.
+
+        Raises:
+            Exception: the error the quote hub ran into while fetching.
+
+        Returns:
+            Dataframe: a single row dataframe of the quote
+        """
+        self._quoteReady.clear()
+        if self._quoteError is not None:
+            raise self._quoteError
+        return self._quote
+
+    def _wait_quote(self):
+        """
+        Private instance method _wait_quote() waits for the next quote delivered by the quote hub.
+
+        Raises:
+            TimeoutError: if no quote was delivered in QUOTE_TIMEOUT seconds.
+            Exception: the error the quote hub ran into while fetching.
+
+        Returns:
+            Dataframe: a single row dataframe of the quote
+        """
+        if not self._quoteReady.wait(timeout=QUOTE_TIMEOUT):
+            raise TimeoutError(f'no quote received for {self.sym}')
+        return self._take_quote()
+
+    async def _await_quote(self):
+        """
+        Private instance coroutine _await_quote() is _wait_quote() of the async engine.
+        """
+        try:
+            await asyncio.wait_for(self._quoteSignal.wait(), QUOTE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f'no quote received for {self.sym}')
+        self._quoteSignal.clear()
+        return self._take_quote()
+
+    def _time_step(self):
+        """
+        Private instance method _time_step() is the body of the time generator, it uses timeKeep object
+            to update time in the display window.
+        The updates are posted to the ui dispatcher, unchanged values (like the market status)
+            are skipped by it, so only the time labels are actually updated every second.
+        """
+        self.ui.set(self.localTimeVal, self.timeKeep.localTime)
+        self.ui.set(self.localDateVal, self.timeKeep.localDate)
+        # special case for estTimeVal to be set
+        # at close time when market is closed
+        if self.msBool == True:
+            self.ui.set(self.estTimeVal, f'| {self.timeKeep.estTime} {self.timeKeep.estZone}')
+            self.ui.set(self.marketStatusVal, 'Markets Are Open')
+            self.ui.config(self.marketStatusDisp, fg='green')
+        elif self.msBool == False:
+            self.ui.set(self.estTimeVal, f'| {self.timeKeep.closeTime} {self.timeKeep.estZone}')
+            self.ui.config(self.asOf, text='At Close:')
+            self.ui.set(self.marketStatusVal, 'Markets Are Closed')
+            self.ui.config(self.marketStatusDisp, fg='red')
+
+    def _sync_table(self, first_run):
+        """
+        Private instance method _sync_table() is the blocking part of a data generator fetch, on the first run
+            it updates name and writes the table, on the remaining runs it updates the last entry in the table.
+
+        Args:
+            first_run (Boolean): True on the first fetch of the data generator
+        """
+        if first_run:
+            self.update_name()
+            self.db.write_table()
+        else:
+            self.db.update_last()
+
+    def _show_data(self, first_run, start_time):
+        """
+        Private instance method _show_data() updates the window with the fetched data, and sets Status and Interval.
+        The window update, and the whole fetch (from its start) are recorded in METRICS.
+
+        Args:
+            first_run (Boolean): True on the first fetch of the data generator
+            start_time (float): the time the fetch started
+        """
+        try:
+            with METRICS.timed('ui.update', self.sym):
+                self.update_window(first_run)
+            METRICS.observe('tick', time() - start_time, self.sym)
+            self.update_status(intervalUpdate=start_time, status='Data Fetched')
+        except Exception as e:
+            TRACE.error('>> [%s]: window update failed %r', self.sym, e)
+
+    def _retry_delay(self, error):
+        """
+        Private instance method _retry_delay() updates status after a failed fetch, and returns the delay before
+            the next attempt, the next backoff delay, or longer while the upstream circuit is open.
+
+        Args:
+            error (Exception): the error raised by the failed attempt
+
+        Returns:
+            float: seconds to wait before the next attempt
+        """
+        delay = self._backoff.next()
+        METRICS.count('errors', sym=self.sym)
+        if isinstance(error, CircuitOpenError):
+            delay = max(delay, error.retryIn)
+        else:
+            TRACE.error('>> [%s]: %r', self.sym, error)
+        TRACE.warning('>> [%s]: fetch failed, retrying in %.1fs', self.sym, delay)
+        self.update_status(status=f'Error.. Retrying in {delay:.0f}s')
+        return delay
 
     def _timeGen(self):
         """
         Private instance method _timeGen() starts a loop that runs as long as
-            the primary switch == True, the loop body uses timeKeep object to keep track of time
-            and update time in the display window once every 1 second.
-        This part is designed to apply the changes directly so the time updates
-            remains as accurate as possible no matter the amount of calls made to other instance methods
-            in the display window object, or how long they take to run. 
+            the primary switch == True, the loop body runs _time_step() once every 1 second.
         """
-        print(f'>> [{self.sym}]: Starting time generator')
+        TRACE.info('>> [%s]: Starting time generator', self.sym)
         while self.alive:
-            self.msBool = self.timeKeep.msBool
-            # The try except statements on data update act as secondary switches to kill the loop
-            # in case the window is closed before a call to stop_engine() is made
-            try:
-                self.localTimeVal.set(self.timeKeep.localTime)
-                self.localDateVal.set(self.timeKeep.localDate)
-                # special case for estTimeVal to be set
-                # at close time when market is closed
-                if self.msBool == True:
-                    self.estTimeVal.set(f'| {self.timeKeep.estTime} EST')
-                    self.marketStatusVal.set('Markets Are Open')
-                    self.marketStatusDisp.config(fg='green')
-                elif self.msBool == False:
-                    self.estTimeVal.set('| 16:00:00 EST')
-                    self.asOf.config(text='At Close:')
-                    self.marketStatusVal.set('Markets Are Closed')
-                    self.marketStatusDisp.config(fg='red')
-            except Exception as e:
-                print(
-                    f'>> [{self.sym}]: time generator terminated - secondary switch triggered')
-                return
+            self._time_step()
             sleep(1)
 
         # debug print
-        print(
-            f'>> [{self.sym}]: time generator terminated - primary switch triggered')
+        TRACE.info('>> [%s]: time generator terminated - primary switch triggered', self.sym)
         return
 
+    async def _time_task(self):
+        """
+        Private instance coroutine _time_task() is _timeGen() of the async engine.
+        """
+        TRACE.info('>> [%s]: Starting time task', self.sym)
+        try:
+            while self.alive:
+                self._time_step()
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            TRACE.info('>> [%s]: time task cancelled', self.sym)
+            raise
+
     # DATA GENERATOR
     def _dataGen(self):
         """
@@ -105,7 +301,7 @@ class DataControl():
         The loop is controlled with multiple switches to fetch data only once when
             the market is closed to prevenet unnecessary requests.
         """
-        print(f'>> [{self.sym}]: Starting data generator')
+        TRACE.info('>> [%s]: Starting data generator', self.sym)
         self.update_status(status='Fetching Data..')
 
         first_run = True
@@ -115,69 +311,92 @@ class DataControl():
             if refetch == 1:
                 start_time = time()
                 self.update_status(status='Fetching Data..')
-                connected = False
-                # Attempt to make connection 3 times before deciding there's a connection error
-                # I am aware that the error here might not be a connection error due to other
-                # function calls made by called functions, so, fingers crossed.
-                for i in range(1, 4):
+                # retry until the fetch succeeds (or the engine is stopped), backing off between attempts,
+                # the shared circuit breaker fails fast while the provider is down and lets one request
+                # through once it may have recovered.
+                # a failed table sync is retried with the quote already received, the quote hub doesn't deliver
+                # another one while the market is closed.
+                quote = None
+                while self.alive:
                     try:
-                        # fetch company name and some other data (ask/bid)
-                        self.yahooQuote = fetch.data.get_quote_yahoo(
-                            self.sym)
-                        # on the first iteration, update name and write table
-                        if first_run:
-                            self.update_name()
-                            self.db.write_table()
-                        # on the remaining of the iterations, update last entry in the table
-                        else:
-                            self.db.update_last()
-
-                        # read table
-                        self.dbRead = self.db.read_table()
-
-                        # At this point we know a connection has been made
-                        # set connected to True and break from connection attempts loop
-                        connected = True
+                        # get company name and some other data (ask/bid) from the quote hub
+                        if quote is None:
+                            quote = self._wait_quote()
+                        self.yahooQuote = quote
+                        self._sync_table(first_run)
+                        self._backoff.reset()
                         break
-
                     except Exception as e:
-                        # On exception, update status.
-                        self.update_status(status='Error..')
-                        print(repr(e))
-                        sleep(0.5)
-
-                        self.update_status(status=f'Error.. Retrying..{i}')
-                        sleep(0.5)
-
-                # if a connection has been made, set Status and Interval updates
-                if connected:
-                    # The try except statements on data update act as secondary switches to kill the loop
-                    # in case the window is closed before a call to stop_engine() is made
-                    try:
-                        self.update_window(first_run)
-                        self.update_status(intervalUpdate=start_time, status='Data Fetched')
-                    except Exception as e:
-                        print(
-                            f'>> [{self.sym}]: data generator terminated - secondary switch triggered')
-                # if no connection, update status to Connection Error
+                        sleep(self._retry_delay(e))
                 else:
-                    self.update_status(
-                        status='Error: Unable to fetch data')
-                    print(
-                            f'>> [{self.sym}]: data generator terminated - secondary switch triggered')
-                    raise ConnectionError
+                    break
 
+                self._show_data(first_run, start_time)
                 first_run = False
-            # if market is closed, update status instead of refetching data.
+            # if market is closed, update status instead of refetching data,
+            # and sleep until the market opens (or the engine is stopped).
             else:
                 self.update_status(
                     intervalUpdate='Off', status='Market Closed, Auto Update Disabled')
+                self._marketOpen.wait()
 
             # set refetch to market status
             refetch = self.msBool
             sleep(1)
 
         # debug print
-        print(
-            f'>> [{self.sym}]: data generator terminated - primary switch triggered')
+        TRACE.info('>> [%s]: data generator terminated - primary switch triggered', self.sym)
         return
+
+    async def _data_task(self):
+        """
+        Private instance coroutine _data_task() is _dataGen() of the async engine, the blocking table sync
+            and window update run in the engine thread pool. The table sync is bounded as network work (its commit
+            goes through the DbWriter), and the window update, which only reads the history cache and posts to the
+            ui dispatcher, takes no slot.
+        """
+        TRACE.info('>> [%s]: Starting data task', self.sym)
+        # the asyncio events start from the state of their threading counterparts
+        self._quoteSignal, self._marketSignal = asyncio.Event(), asyncio.Event()
+        if self._quoteReady.is_set():
+            self._quoteSignal.set()
+        if self._marketOpen.is_set():
+            self._marketSignal.set()
+        self.update_status(status='Fetching Data..')
+
+        first_run = True
+        refetch = 1
+        self.latestClose = ''
+        try:
+            while self.alive:
+                if refetch == 1:
+                    start_time = time()
+                    self.update_status(status='Fetching Data..')
+                    quote = None
+                    while self.alive:
+                        try:
+                            if quote is None:
+                                quote = await self._await_quote()
+                            self.yahooQuote = quote
+                            await self.engine.run_blocking('net', self._sync_table, first_run)
+                            self._backoff.reset()
+                            break
+                        except Exception as e:
+                            await asyncio.sleep(self._retry_delay(e))
+                    else:
+                        break
+
+                    await self.engine.run_blocking(None, self._show_data, first_run, start_time)
+                    first_run = False
+                else:
+                    self.update_status(
+                        intervalUpdate='Off', status='Market Closed, Auto Update Disabled')
+                    await self._marketSignal.wait()
+
+                refetch = self.msBool
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            TRACE.info('>> [%s]: data task cancelled', self.sym)
+            raise
+
+        TRACE.info('>> [%s]: data task terminated - primary switch triggered', self.sym)
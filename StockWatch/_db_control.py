@@ -1,20 +1,70 @@
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from threading import Thread, local
+from time import sleep
 
-import pandas as pd
-from pandas_datareader import data as fetch
 from dateutil.relativedelta import relativedelta
-from pandas.tseries.offsets import BDay
-from sqlalchemy import (Column, MetaData, Sequence, Table,
-                        create_engine, inspect)
+from sqlalchemy import (Column, Index, MetaData, Table, bindparam,
+                        create_engine, delete, func, inspect, select, text)
 from sqlalchemy.dialects.sqlite import insert
-from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.sql.sqltypes import TIMESTAMP, DATETIME, String, Float
 from sqlalchemy import exc
-from time import sleep
 
-# override datareader API fetch
-import yfinance
-yfinance.pdr_override()
+from ._db_writer import DbWriter, enable_wal
+from ._history_cache import HistoryCache
+from ._lazy_module import LazyModule
+from ._metrics import METRICS
+from ._providers import YahooProvider
+from ._resilience import UPSTREAM, Backoff
+from ._symbol_index import SymbolIndex
+from ._trace import TRACE
+
+
+# heavy modules, imported on first use
+pd = LazyModule('pandas')
+
+# format of the dates sqlalchemy stores in DATETIME columns
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class CompiledSelect():
+    """
+    Class CompiledSelect represents a select statement compiled once, to its sql and the bind processors of
+        its parameters, so executing it again skips building, caching and compiling the statement.
+    Rows are returned as sqlite stores them, without result processing (e.g. dates are strings).
+    """
+
+    def __init__(self, stmt, dialect):
+        """
+        CompiledSelect object constructor.
+
+        Args:
+            stmt (Select): a sqlalchemy select statement, its literal values are kept as default parameters
+            dialect (Dialect): the dialect of the engine it's executed on
+        """
+        compiled = stmt.compile(dialect=dialect)
+        self.sql = str(compiled)
+        self.defaults = compiled.params
+        self.binds = [(key, compiled.binds[key].type.dialect_impl(dialect).bind_processor(dialect))
+                      for key in compiled.positiontup]
+
+    def execute(self, connection, **params):
+        """
+        Instance method execute() runs the statement with the given parameters over its defaults.
+
+        Args:
+            connection (Connection object): a sqlalchemy connection
+            **params: values of bound parameters (e.g. since=datetime)
+
+        Returns:
+            list: a list of row tuples
+        """
+        params = dict(self.defaults, **params)
+        values = tuple(process(params[key]) if process else params[key] for key, process in self.binds)
+        return connection.exec_driver_sql(self.sql, values).fetchall()
+
 
 # Set up of the engine to connect to the database
 class MainControl():
@@ -24,19 +74,51 @@ class MainControl():
         and another for 'logs' table control.
     The class is designed this way to maintain a single database connection
         over all tables, and unify the path taken through instances to log access to tables.
+    The database is in WAL mode, and all writes after startup go through its single DbWriter,
+        which has to be killed on exit to commit the queued writes. Reads go through connection(),
+        a connection per thread that stays open.
     """
 
-    def __init__(self):
-        print('>>>> [MAIN]: INITIALIZING MAIN DATABASE CONNECTION')
-        self.engine = create_engine('sqlite:///stocks.db', echo=False)
+    def __init__(self, db_path='stocks.db', provider=None):
+        """
+        MainControl object constructor.
+
+        Args:
+            db_path (String, optional): path of the sqlite database file. Defaults to 'stocks.db'.
+            provider (DataProvider object, optional): the source of symbols and bars. Defaults to YahooProvider().
+        """
+        TRACE.info('>>>> [MAIN]: INITIALIZING MAIN DATABASE CONNECTION')
+        self.db_path = db_path
+        # the history files of the symbol tables, next to the database file
+        self.history_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'history')
+        self.provider = provider if provider else YahooProvider()
+        # connections are kept by the thread that opened them, and closed by whichever thread collects them
+        self.engine = create_engine(f'sqlite:///{db_path}', echo=False, connect_args={'check_same_thread': False})
+        enable_wal(self.engine)
+        self._local = local()
+        self.writer = DbWriter(self.engine)
+        self.writer.start()
         self.inspector = inspect(self.engine)
-        self.db_connection = self.engine.connect()
-        self.create_session = sessionmaker(bind=self.engine)
 
         self.symbols = self.Symbols(self)
         self.logger = self.Logger(self)
+        self.bars = self.Bars(self)
+
+        self.logger.compact()
 
-        self.logger.get_log('symbols', 'write')
+    def connection(self):
+        """
+        Instance method connection() returns the database connection of the calling thread, opened on its
+            first call and kept open, so every read doesn't open and set up a new sqlite connection.
+        Reads outside a transaction don't hold a snapshot of the database, they see every committed write.
+
+        Returns:
+            Connection: a sqlalchemy connection, only to be used by the calling thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or connection.closed:
+            connection = self._local.connection = self.engine.connect()
+        return connection
 
     class Symbols():
         """
@@ -50,7 +132,11 @@ class MainControl():
         def __init__(self, control):
             self.__control = control
             self.table_name = 'symbols'
+            self.fts_name = 'symbols_fts'
             self.table = self._check_symbols()
+            self._check_fts()
+            self._is_symbol_stmt = text(f'SELECT 1 FROM {self.table_name} WHERE Symbol = :sym LIMIT 1')
+            self._read_stmt = select(self.table)
 
         def _check_symbols(self):
             """
@@ -68,7 +154,7 @@ class MainControl():
                     Column("Symbol", String, primary_key=True,),
                     Column("Security_Name", String),
                 )
-                metadata.create_all(self.__control.db_connection)
+                metadata.create_all(self.__control.engine)
             else:
                 metadata.reflect(self.__control.engine)
                 table = Table(self.table_name, metadata, autoload=True)
@@ -77,16 +163,149 @@ class MainControl():
 
         def _update_symbols(self):
             """
-            Private instance method _update_symbols() will complete the symbols table with
-                missing data, but it will NOT update or modify existing data, which needs to be changed
-                in the future.
+            Private instance method _update_symbols() downloads the list of listed symbols, compares it
+                to the symbols table, and applies only the difference (added, removed and renamed symbols)
+                to the symbols table and its full-text search table in a single transaction.
+            The snapshot is rebuilt only if something changed.
+
+            Returns:
+                SymbolIndex: the new prefix index of the symbols table, or None if nothing changed.
+            """
+            listed = self.__control.provider.listed()['Security Name'].fillna('').astype(str)
+            listed = listed[~listed.index.duplicated()]
+            existing = self._read_symbols().set_index('Symbol')['Security_Name'].fillna('')
+
+            added = listed.index.difference(existing.index)
+            removed = existing.index.difference(listed.index)
+            common = listed.index.intersection(existing.index)
+            renamed = common[listed[common].to_numpy() != existing[common].to_numpy()]
+            TRACE.info('> [MAIN]: symbols: %d added, %d removed, %d renamed', len(added), len(removed), len(renamed))
+
+            if not (len(added) or len(removed) or len(renamed)):
+                self.__control.logger.new_log('symbols', 'check')
+                return None
+
+            gone = [{'Symbol': sym} for sym in removed.union(renamed)]
+            new = [{'Symbol': sym, 'Security_Name': listed[sym]} for sym in added.union(renamed)]
+
+            def applyDiff(connection):
+                for table_name in (self.table_name, self.fts_name):
+                    if gone:
+                        connection.execute(text(f'DELETE FROM {table_name} WHERE Symbol = :Symbol'), gone)
+                    if new:
+                        connection.execute(text(
+                            f'INSERT INTO {table_name} (Symbol, Security_Name) VALUES (:Symbol, :Security_Name)'), new)
+
+            self.__control.writer.write(applyDiff)
+            written = self.__control.logger.new_log('symbols', 'write')
+            return self.write_snapshot(source=written)
+
+        def needs_refresh(self):
+            """
+            Instance method needs_refresh() checks -according to logs- if the symbols list was last
+                written or checked one or more weeks ago.
+
+            Returns:
+                Boolean: True if the symbols list should be refreshed
+            """
+            last = [log['Timestamp'] for log in (self.__control.logger.get_log('symbols', 'write'),
+                                                 self.__control.logger.get_log('symbols', 'check')) if log is not None]
+            return not last or max(last) <= datetime.now() - relativedelta(weeks=1)
+
+        def refresh_async(self, onUpdate=None):
+            """
+            Instance method refresh_async() refreshes the symbols list in a background thread, while the
+                existing table (and snapshot) stay in use.
+
+            Args:
+                onUpdate (callable, optional): a function called with the new SymbolIndex if the list changed.
             """
-            symbols = fetch.get_nasdaq_symbols().filter(
-                ['Symbol', 'Security Name'])
-            symbols.columns = symbols.columns.str.replace(' ', '_')
-            symbols.to_sql(name='symbols', con=self.__control.db_connection, if_exists='replace', index_label='Symbol')
+            def refresh():
+                TRACE.info('> [MAIN]: Refreshing symbols in the background')
+                try:
+                    index = self._update_symbols()
+                except Exception as e:
+                    TRACE.error('> [MAIN]: symbols refresh failed %r', e)
+                    return
+                if index is not None and onUpdate:
+                    onUpdate(index)
 
-            self.__control.logger.new_log('symbols', 'write')
+            Thread(target=refresh, daemon=True).start()
+
+        def _check_fts(self):
+            """
+            Private instance method _check_fts() checks for the existence of the full-text search table 'symbols_fts',
+                if the table does not exist, it will create one, and fill it if the symbols table has data.
+                The table uses a trigram tokenizer so any part of a ticker or name (3+ characters) can be matched.
+            """
+            with self.__control.engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_name} "
+                    f"USING fts5(Symbol, Security_Name, tokenize='trigram')"))
+                indexed = connection.execute(text(f'SELECT count(*) FROM {self.fts_name}')).scalar()
+                listed = connection.execute(text(f'SELECT count(*) FROM {self.table_name}')).scalar()
+            if indexed != listed:
+                self._rebuild_fts()
+
+        def _rebuild_fts(self):
+            """
+            Private instance method _rebuild_fts() refills the full-text search table from the symbols table.
+            """
+            with self.__control.engine.begin() as connection:
+                connection.execute(text(f'DELETE FROM {self.fts_name}'))
+                connection.execute(text(
+                    f'INSERT INTO {self.fts_name} (Symbol, Security_Name) '
+                    f'SELECT Symbol, Security_Name FROM {self.table_name}'))
+
+        def is_symbol(self, sym):
+            """
+            Instance method is_symbol() checks if a ticker is listed, with a single indexed lookup.
+
+            Args:
+                sym (String): a company symbol/ticker
+
+            Returns:
+                Boolean: True if the ticker is in the symbols table
+            """
+            return self.__control.connection().execute(self._is_symbol_stmt, {'sym': sym}).first() is not None
+
+        def search(self, query, limit=20):
+            """
+            Instance method search() runs a ranked search of tickers and security names in the database,
+                every word of the query must appear anywhere in the ticker or name ('soft' matches Microsoft,
+                'alphabet class c' matches Alphabet Inc. - Class C). An exact ticker match always comes first.
+
+            Args:
+                query (String): user input
+                limit (int, optional): maximum number of matches. Defaults to 20.
+
+            Returns:
+                list: a list of dicts {'Symbol': String, 'Security_Name': String}
+            """
+            words = query.split()
+            if not words:
+                return []
+            # words shorter than 3 characters can't be matched by the trigram index, they are filtered with LIKE
+            longWords = [word for word in words if len(word) >= 3]
+            params = {'exact': query.strip().upper(), 'limit': limit}
+            likes = []
+            for i, word in enumerate(word for word in words if len(word) < 3):
+                params[f'like{i}'] = '%' + word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                likes.append(f"(Symbol LIKE :like{i} ESCAPE '\\' OR Security_Name LIKE :like{i} ESCAPE '\\')")
+
+            if longWords:
+                params['match'] = ' AND '.join('"' + word.replace('"', '""') + '"' for word in longWords)
+                where = ' AND '.join([f'{self.fts_name} MATCH :match'] + likes)
+                # bm25 weights: a hit in the ticker counts 10 times a hit in the name
+                search_stmt = (f'SELECT Symbol, Security_Name FROM {self.fts_name} WHERE {where} '
+                               f'ORDER BY Symbol = :exact DESC, bm25({self.fts_name}, 10.0, 1.0) LIMIT :limit')
+            else:
+                where = ' AND '.join(likes)
+                search_stmt = (f'SELECT Symbol, Security_Name FROM {self.table_name} WHERE {where} '
+                               f'ORDER BY Symbol = :exact DESC, length(Symbol), Symbol LIMIT :limit')
+
+            return [{'Symbol': row.Symbol, 'Security_Name': row.Security_Name}
+                    for row in self.__control.connection().execute(text(search_stmt), params)]
 
         def _read_symbols(self):
             """
@@ -95,10 +314,7 @@ class MainControl():
             Returns:
                 Dataframe: a pandas Dataframe of the 'symbols' table.
             """
-            read_session = scoped_session(self.__control.create_session)
-            read_stmt = read_session.query(self.table).statement
-            symbols = pd.read_sql(read_stmt, read_session.bind)
-            read_session.remove()
+            symbols = pd.read_sql(self._read_stmt, self.__control.connection())
             self.__control.logger.new_log('symbols', 'read')
 
             return symbols
@@ -112,22 +328,63 @@ class MainControl():
                 Pandas Dataframe: a dataframe of the symbols table.
             """
             symbols = self._read_symbols()
-            last_write = self.__control.logger.get_log('symbols', 'write')
-            # if the table is empty, or -according to logs- the table was written one or more weeks ago,
-            # or there are no logs for previous writes, it will call __update_symbols() to complete the data.
-            if symbols.empty or last_write.empty or pd.to_datetime(last_write['Timestamp']) <= datetime.now() - relativedelta(weeks=1):
-                if symbols.empty or last_write.empty:
-                    print('> First run..')
-                print('> [MAIN]: Updating symbols, please wait')
-                try:
-                    self._update_symbols()
-                except Exception as e:
-                    raise e
-
+            # if the table is empty, it will call _update_symbols() to fill it,
+            # a stale table is refreshed in the background with refresh_async()
+            if symbols.empty:
+                TRACE.info('> First run..')
+                TRACE.info('> [MAIN]: Updating symbols, please wait')
+                self._update_symbols()
                 symbols = self._read_symbols()
 
             return symbols
 
+        @property
+        def snapshot_path(self):
+            """
+            String: path of the symbols snapshot file, next to the database file
+            """
+            return os.path.join(os.path.dirname(os.path.abspath(self.__control.db_path)), 'symbols.snapshot')
+
+        def write_snapshot(self, source):
+            """
+            Instance method write_snapshot() builds a prefix index of the symbols table and saves it to the snapshot file.
+
+            Args:
+                source (datetime): timestamp of the symbols write the snapshot is built from
+
+            Returns:
+                SymbolIndex: the prefix index of the symbols table
+            """
+            TRACE.info('> [MAIN]: Writing symbols snapshot')
+            index = SymbolIndex.from_frame(self._read_symbols())
+            index.save(self.snapshot_path, source=source.isoformat())
+            return index
+
+        def get_index(self):
+            """
+            Instance method get_index() returns a prefix index of company symbols and security names,
+                loaded memory-mapped from the snapshot file, so the symbols table is not read on startup.
+                The snapshot is rebuilt only if it was built from an older write of the symbols table.
+                Like get_symbols(), it fills the symbols table first if it was never written, a stale
+                table is used as is and refreshed in the background with refresh_async().
+
+            Returns:
+                SymbolIndex: the prefix index of the symbols table.
+            """
+            last_write = self.__control.logger.get_log('symbols', 'write')
+            index = SymbolIndex.load(self.snapshot_path)
+            if last_write is None:
+                TRACE.info('> First run..')
+                TRACE.info('> [MAIN]: Updating symbols, please wait')
+                index = self._update_symbols()
+                last_write = self.__control.logger.get_log('symbols', 'write')
+                if last_write is None:
+                    return SymbolIndex([], [])
+
+            if not index or index.source != last_write['Timestamp'].isoformat():
+                index = self.write_snapshot(source=last_write['Timestamp'])
+            return index
+
     class Logger():
         """
         Class Logger represents database table "logs", it is mainly created
@@ -135,17 +392,26 @@ class MainControl():
         It is intended to keep track of symbols table access, reads and writes.
             and is currently used to manage symbols update, and can be used for other
             purposes in the future (e.g deleting very old symbol tables for cleanup)
+        The table is indexed on (Table_name, Operation, Timestamp) so the last log of an operation
+            is a single index lookup, and old read logs are collapsed by compact() on startup.
         """
 
+        # read logs older than this are collapsed into the latest one per table
+        RETENTION = timedelta(days=7)
+
         def __init__(self, control):
             self.__control = control
             self.table_name = 'logs'
             self.table = self.__check_logger()
+            self._insert_stmt = insert(self.table)
+            self._last_stmt = select(self.table).where(
+                self.table.c.Table_name == bindparam('table_name'), self.table.c.Operation == bindparam('op')).order_by(
+                self.table.c.Timestamp.desc()).limit(1)
 
         def __check_logger(self):
             """
             Private instance method __check_logger() checks for the existence of the table 'logs',
-                if the table does not exist, it will create one.
+                if the table does not exist, it will create one, and creates its index if it's missing.
 
             Returns:
                 Sqlalchmey Table: a sqlalchemy table ('logs')
@@ -159,11 +425,15 @@ class MainControl():
                     Column("Table_name", String),
                     Column("Operation", String),
                 )
-                metadata.create_all(self.__control.db_connection)
+                metadata.create_all(self.__control.engine)
             else:
                 metadata.reflect(self.__control.engine)
                 table = Table(self.table_name, metadata, autoload=True)
 
+            # tables created by older versions have no index
+            index = Index('ix_logs_table_op_ts', table.c.Table_name, table.c.Operation, table.c.Timestamp)
+            index.create(self.__control.engine, checkfirst=True)
+
             return table
 
         def new_log(self, table_name, op):
@@ -174,109 +444,265 @@ class MainControl():
             Args:
                 table_name (String): name of the table
                 op (String): operation 'read' or 'write'
+
+            Returns:
+                datetime: the timestamp of the new entry
             """
             values = {'Timestamp': datetime.now(
             ), "Table_name": table_name, 'Operation': op}
-            write_session = scoped_session(self.__control.create_session)
-            insert_stmt = insert(self.table).values(values)
-            write_session.execute(insert_stmt)
-            write_session.commit()  # Commit changes
-            write_session.remove()  # Close session
+            self.__control.writer.write(self._insert_stmt, values)
+            return values['Timestamp']
 
         def get_log(self, table_name, op):
             """
             Instance method get_log() takes a table name: str() and an operation: str() (that is 'read'/'write')
-                and returns a pandas Dataframe of all table entries regarding the given table and operation, 
-                along with a timestamp for each.
+                and returns the latest table entry regarding the given table and operation, along with its timestamp.
+                Only that one row is read, using the (Table_name, Operation, Timestamp) index.
 
             Args:
                 table_name (String): name of the table
                 op (String): operation 'read' or 'write'
 
             Returns:
-                Dataframe: Dataframe of rows matching provided arguments
+                RowMapping: the latest row matching provided arguments, or None if there is none
             """
-            read_session = scoped_session(self.__control.create_session)
-            read_stmt = read_session.query(self.table).filter(self.table.c.get(
-                'Table_name') == table_name, self.table.c.get('Operation') == op).statement
-            log = pd.read_sql(read_stmt, read_session.bind)
-            read_session.remove()
-            if log.empty:
-                return log
-            return log.iloc[-1]
+            return self.__control.connection().execute(
+                self._last_stmt, {'table_name': table_name, 'op': op}).mappings().first()
+
+        def compact(self, retention=None):
+            """
+            Instance method compact() collapses read logs older than the retention period,
+                only the latest read log of each table is kept, so the table doesn't grow without bound.
+
+            Args:
+                retention (timedelta, optional): how long read logs are kept. Defaults to RETENTION.
+            """
+            cutoff = datetime.now() - (retention if retention else self.RETENTION)
+            reads = self.table.c.get('Operation') == 'read'
+            latest = select(func.max(self.table.c.get('Timestamp'))).where(
+                reads).group_by(self.table.c.get('Table_name'))
+            delete_stmt = delete(self.table).where(
+                reads, self.table.c.get('Timestamp') < cutoff, self.table.c.get('Timestamp').not_in(latest))
+            deleted = self.__control.writer.write(delete_stmt)
+            if deleted:
+                TRACE.info('>>>> [MAIN]: compacted %d old read logs', deleted)
+
+    class Bars():
+        """
+        Class Bars represents database table "bars", it is mainly created
+            and managed by the MainControl instance.
+        It holds the daily bars of all symbols in a single table keyed by (symbol, date),
+            so the data of a whole watchlist can be read in one query. On creation it moves
+            data from old per-symbol tables into it (one-shot migration).
+        """
+
+        # column names of symbol dataframes (as fetched from yahoo) -> column names in the bars table
+        COLUMNS = {'Date': 'date', 'High': 'high', 'Low': 'low', 'Open': 'open',
+                   'Close': 'close', 'Volume': 'volume', 'Adj_Close': 'adj_close'}
+
+        def __init__(self, control):
+            self.__control = control
+            self.table_name = 'bars'
+            self.table = self._check_bars()
+            self._migrate_tables()
+            # a single upsert statement of all symbols, values are bound per row on execution
+            self.upsert_stmt = insert(self.table)
+            self.upsert_stmt = self.upsert_stmt.on_conflict_do_update(
+                index_elements=self.table.primary_key,
+                set_={col.name: self.upsert_stmt.excluded[col.name] for col in self.table.columns if not col.primary_key})
+
+        def _check_bars(self):
+            """
+            Private instance method _check_bars() checks for the existence of the table 'bars',
+                if the table does not exist, it will create one along with its indexes.
+
+            Returns:
+                Sqlalchmey Table: a sqlalchemy table ('bars').
+            """
+            metadata = MetaData(bind=self.__control.engine)
+            table = Table(
+                self.table_name,
+                metadata,
+                Column("symbol", String, primary_key=True),
+                Column("date", DATETIME, primary_key=True),
+                Column("open", Float),
+                Column("high", Float),
+                Column("low", Float),
+                Column("close", Float),
+                Column("adj_close", Float),
+                Column("volume", Float),
+                Index('ix_bars_date_symbol', 'date', 'symbol'),
+                sqlite_with_rowid=False,
+            )
+            if self.table_name not in self.__control.inspector.get_table_names():
+                metadata.create_all(self.__control.engine)
+            return table
+
+        def _migrate_tables(self):
+            """
+            Private instance method _migrate_tables() copies every old per-symbol table into
+                the bars table in a single transaction, and drops it.
+            """
+            legacy_columns = set(self.COLUMNS)
+            legacy_tables = [name for name in self.__control.inspector.get_table_names()
+                             if name not in ('symbols', 'logs', self.table_name)
+                             and legacy_columns <= {col['name'] for col in self.__control.inspector.get_columns(name)}]
+            if not legacy_tables:
+                return
+
+            TRACE.info('>>>> [MAIN]: MIGRATING %d SYMBOL TABLES INTO "%s"', len(legacy_tables), self.table_name)
+            columns = ', '.join(self.COLUMNS.values())
+            legacy = ', '.join(f'"{col}"' for col in self.COLUMNS)
+            with self.__control.engine.begin() as connection:
+                for name in legacy_tables:
+                    connection.execute(text(
+                        f'INSERT OR REPLACE INTO {self.table_name} (symbol, {columns}) '
+                        f'SELECT :symbol, {legacy} FROM "{name}"'), {'symbol': name})
+                    connection.execute(text(f'DROP TABLE "{name}"'))
+            self.__control.inspector = inspect(self.__control.engine)
+            self.__control.logger.new_log(self.table_name, 'migrate')
+
+        def records(self, sym, rows):
+            """
+            Instance method records() converts rows of a symbol dataframe into rows of the bars table.
+
+            Args:
+                sym (String): a company symbol/ticker
+                rows (list): a list of row dicts with dataframe column names ('Date', 'Open', ...)
+
+            Returns:
+                list: a list of row dicts with bars table column names
+            """
+            return [dict({self.COLUMNS[key]: value for key, value in row.items() if key in self.COLUMNS}, symbol=sym)
+                    for row in rows]
+
+        def select_stmt(self, symbols, since=False):
+            """
+            Instance method select_stmt() builds a select statement of the bars of the given symbols,
+                with columns labeled as symbol dataframes are ('Date', 'Open', ...).
+
+            Args:
+                symbols (list): a list of company symbols/tickers
+                since (Boolean, optional): True to filter dates on or after a bound 'since' parameter. Defaults to False.
+
+            Returns:
+                Select: a sqlalchemy select statement
+            """
+            stmt = select(self.table.c.symbol, *[self.table.c[col].label(label) for label, col in self.COLUMNS.items()])
+            if len(symbols) == 1:
+                stmt = stmt.where(self.table.c.symbol == symbols[0])
+            else:
+                stmt = stmt.where(self.table.c.symbol.in_(symbols))
+            if since:
+                stmt = stmt.where(self.table.c.date >= bindparam('since'))
+            return stmt.order_by(self.table.c.symbol, self.table.c.date)
+
+        def compile(self, symbols, since=False):
+            """
+            Instance method compile() compiles the select statement of select_stmt() once, for reads repeated
+                many times (e.g. the refreshes of a symbol table), see frame().
+
+            Returns:
+                CompiledSelect: the compiled statement
+            """
+            return CompiledSelect(self.select_stmt(symbols, since=since), self.__control.engine.dialect)
+
+        def frame(self, rows):
+            """
+            Instance method frame() converts rows of a CompiledSelect of the bars into a symbol dataframe,
+                indexed by Date, the dates are parsed at once.
+
+            Args:
+                rows (list): a list of (symbol, date, high, low, open, close, volume, adj_close) tuples
+
+            Returns:
+                Dataframe: a pandas dataframe of the rows
+            """
+            columns = list(self.COLUMNS)[1:]
+            if not rows:
+                return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+            _, dates, *values = zip(*rows)
+            try:
+                dates = pd.to_datetime(dates, format=DATETIME_FORMAT)
+            except ValueError:
+                # rows migrated from old per-symbol tables may be stored in another format
+                dates = pd.to_datetime(dates)
+            return pd.DataFrame(dict(zip(columns, values)), index=pd.DatetimeIndex(dates, name='Date'), dtype=float)
+
+        def read_bars(self, symbols, since=None):
+            """
+            Instance method read_bars() reads bars of multiple symbols (e.g. a whole watchlist) in a single query.
+
+            Args:
+                symbols (list): a list of company symbols/tickers
+                since (datetime, optional): the date to read bars from. Defaults to None (all bars).
+
+            Returns:
+                dict: symbol -> a pandas dataframe of its bars indexed by Date
+            """
+            symbols = list(symbols)
+            read_stmt = self.select_stmt(symbols, since=since is not None)
+            params = {'since': since} if since is not None else {}
+            rows = self.__control.connection().execute(read_stmt, params).fetchall()
+            grouped = {sym: list(group) for sym, group in groupby(rows, key=itemgetter(0))}
+            return {sym: self.frame(grouped.get(sym, [])) for sym in symbols}
 
 
 class TableControl():
     """
-    Class TableControl represents a table of a given symbol.
+    Class TableControl represents the bars of a given symbol in the bars table.
         This class is intended to be created and controlled by
         the DataControl instance.
 
     Args:
         sym (String): a company symbol/ticker
         db_con (Object): Database connection object (MainControl object)
+        timeKeep (Object): a TimeKeep object
+        chunk_size (Integer, optional): rows per bulk upsert write. Defaults to COMMIT_CHUNK_SIZE.
     """
 
-    def __init__(self, sym, db_con, timeKeep):
-        print(f'>>> [{sym}]: INITIALIZING DATABASE CONTROL')
+    # rows upserted per write of the database writer in _commit_entry()
+    COMMIT_CHUNK_SIZE = 2000
+    # commits of an update retried on a database error, e.g. a lock held by another process for too long
+    COMMIT_RETRIES = 3
+
+    def __init__(self, sym, db_con, timeKeep, chunk_size=None):
+        TRACE.info('>>> [%s]: INITIALIZING DATABASE CONTROL', sym)
         self.sym = sym
         self.db_con = db_con
         self.timeKeep = timeKeep
-        self.table = self._check_table()
-
-    def _check_table(self):
-        """
-        Private instance method _check_table() checks for the existence of a table with name {sym},
-            if the table does not exist, it will create one.
-
-        Returns:
-            Sqlalchmey Table: a sqlalchemy table of the symbol
-        """
-        metadata = MetaData(bind=self.db_con.engine)
-        table_name = self.sym
-
-        if table_name not in self.db_con.inspector.get_table_names():
-            table_name = Table(
-                str(table_name),
-                metadata,
-                Column("Date", DATETIME, Sequence(
-                    'poi_id_seq'), primary_key=True),
-                Column("High", Float),
-                Column("Low", Float),
-                Column("Open", Float),
-                Column("Close", Float),
-                Column("Volume", Float),
-                Column("Adj_Close", Float)
-            )
-            metadata.create_all(self.db_con.db_connection)
-
-            print(f'> [{self.sym}]: Table created')
-            # print('Fetching data')
-        else:
-            metadata.reflect(self.db_con.engine)
-            print(f'> [{self.sym}]: Table exists')
-
-        return Table(table_name, metadata, autoload=True)
+        self.chunk_size = chunk_size if chunk_size else self.COMMIT_CHUNK_SIZE
+        self.bars = db_con.bars
+        self.table = self.bars.table
+        # the reads of the symbol, compiled once
+        self._read_all = self.bars.compile([sym])
+        self._read_since = self.bars.compile([sym], since=True)
+        self._count = CompiledSelect(select(func.count()).select_from(self.table).where(self.table.c.symbol == sym),
+                                     db_con.engine.dialect)
+        self.cache = HistoryCache(sym, self._load_table, self._load_since,
+                                  storePath=os.path.join(db_con.history_dir, f'{sym}.hist'), counter=self._count_rows)
 
     def _fetch_quote(self, start):
         """
         Private instance method _fetch_quote() fetches a quote on the symbol of the table
-            from the given start date to the last business day (from yahoo servers)
+            from the given start date to the last business day (from the data provider),
+            the request is made through the shared UPSTREAM rate limiter and circuit breaker.
 
         Args:
             start (datetime): a datetime string '%yyyy-%mm-%dd' or datetime python object to fetch data starting from.
 
         Raises:
             ConnectionError: if a connection to fetch the data could not be made.
+            CircuitOpenError: if the upstream circuit is open, no request is made.
 
         Returns:
             Dataframe: a pandas dataframe of the fetched data.
         """
-        print(f'> [{self.sym}]: fetching quote')
+        TRACE.debug('> [%s]: fetching quote', self.sym)
         try:
-            dataFetch = fetch.get_data_yahoo(self.sym, start)
+            dataFetch = UPSTREAM.call(self._history, start)
         except Exception as e:
-            print(repr(e))
+            TRACE.error('> [%s]: fetch failed %r', self.sym, e)
             raise e
 
         # modify columns to my liking (db's actually)
@@ -287,72 +713,108 @@ class TableControl():
         quote = dataFetch.to_dict(orient='records')
         return quote
 
+    def _history(self, start):
+        """
+        Private instance method _history() requests the bars of the symbol from the data provider, and times the request.
+        """
+        with METRICS.timed('history.fetch', self.sym):
+            return self.db_con.provider.history(self.sym, start)
+
     def _commit_entry(self, data, update):
         """
         Private instance variable _commit_entry() takes a fetched quote dataframe and
-           inserts it into the symbol table
+           inserts it into the symbol table.
+        The rows are upserted in bulk (executemany) through the database writer, one write per chunk of chunk_size
+            rows, it returns once they are committed. The writer commits the chunks queued together in the transaction
+            of a batch (of up to its batchRows rows), a failed chunk is committed again on its own.
 
         Args:
-            data (Dataframe): a dataframe of a fetched quote
+            data (list): a list of row dicts of a fetched quote
             update (Boolean): True if the provided data is an update of existing data
 
         Raises:
             DatabaseUpdateError: an error to indicate a failed attempt to insert and commit data
+
+        Returns:
+            int: the number of rows upserted
         """
 
-        print(f'> [{self.sym}]: committing data')
-        write_session = scoped_session(
-            self.db_con.create_session)  # Open session
+        TRACE.debug('> [%s]: committing data', self.sym)
         try:
-            # if update, insert data row by row with update on conflict clause
-            # if update:
-            for row in data:
-                insert_stmt = insert(self.table).values(row).on_conflict_do_update(index_elements=self.table.primary_key, set_=row)
-                write_session.execute(insert_stmt)
-            # if no update, insert all data in bulk
-            # else:
-            #     insert_stmt = insert(self.table).values(data)
-            #     write_session.execute(insert_stmt)
-            write_session.commit()  # Commit changes
-            write_session.remove()  # Close session
+            with METRICS.timed('db.commit', self.sym):
+                records = self.bars.records(self.sym, data)
+                writes = [self.db_con.writer.submit(self.bars.upsert_stmt, records[i:i + self.chunk_size])
+                          for i in range(0, len(records), self.chunk_size)]
+                for write in writes:
+                    write.result()
+            METRICS.count('rows', len(data), self.sym)
+            self.cache.apply_rows(data)
+            return len(data)
 
         # in case something catches fire
         except Exception as DatabaseUpdateError:
-            print(repr(DatabaseUpdateError))
+            TRACE.error('> [%s]: commit failed %r', self.sym, DatabaseUpdateError)
             raise DatabaseUpdateError
 
-    def read_table(self):
+    def _count_rows(self):
+        """
+        Private instance method _count_rows() returns the number of rows of the symbol table, an index range count.
+        """
+        return self._count.execute(self.db_con.connection())[0][0]
+
+    def _load_table(self):
         """
-        Instance method read_table() reads symbol table and returns a pandas DataFrame.
+        Private instance method _load_table() reads the whole symbol table from the database.
 
         Returns:
             Dataframe: a pandas dataframe of the existing data in the symbol table.
         """
-        print(f'> [{self.sym}]: reading table')
-        read_session = scoped_session(self.db_con.create_session)
-        read_stmt = read_session.query(self.table).statement
-        dbRead = pd.read_sql(read_stmt, read_session.bind, index_col='Date')
-        read_session.remove()
-        return dbRead
+        TRACE.debug('> [%s]: reading table', self.sym)
+        with METRICS.timed('db.read', self.sym):
+            return self.bars.frame(self._read_all.execute(self.db_con.connection()))
+
+    def _load_since(self, date):
+        """
+        Private instance method _load_since() reads rows of the symbol table dated on or after the given date.
+
+        Args:
+            date (datetime): the date to read rows from
+
+        Returns:
+            Dataframe: a pandas dataframe of the matching rows.
+        """
+        TRACE.debug('> [%s]: reading table since %s', self.sym, date)
+        with METRICS.timed('db.read', self.sym):
+            return self.bars.frame(self._read_since.execute(self.db_con.connection(), since=date))
+
+    def read_table(self, refresh=False):
+        """
+        Instance method read_table() returns a pandas DataFrame of the symbol table from the history cache,
+            the table is only read from the database on the first call.
+
+        Args:
+            refresh (Boolean, optional): True to also pick up rows written to the table by others,
+                newer than the last cached date. Defaults to False.
+
+        Returns:
+            Dataframe: a pandas dataframe of the existing data in the symbol table.
+        """
+        if refresh:
+            self.cache.refresh()
+        return self.cache.frame()
 
     def write_table(self):
         """
         Instance method write_table() calculates the last business day use it to either write missing data from the symbol table,
             or call update_last() if the table is complete to the last business day.
         If the table is empty, it will fetch all data and commit it to the table.
-        """
-        print(f'> [{self.sym}]: writing table')
-        currEstTime = self.timeKeep.estTime
-        currEstDate = pd.to_datetime(self.timeKeep.estDate)
 
-        # calculate last business EST date.
-        if bool(len(pd.bdate_range(currEstDate, currEstDate))):
-            if currEstTime > '09:30:00':
-                last_trading_date = currEstDate
-            else:
-                last_trading_date = currEstDate - BDay(1)
-        else:
-            last_trading_date = currEstDate - BDay(1)
+        Returns:
+            int: the number of rows written
+        """
+        TRACE.debug('> [%s]: writing table', self.sym)
+        # last trading date according to the market calendar (weekends, holidays, and today before the open)
+        last_trading_date = pd.Timestamp(self.timeKeep.calendar.last_trading_day())
 
         # check last entry date
         try:
@@ -360,39 +822,47 @@ class TableControl():
             lastEntryDate = existing_data.tail(1).index.item()
             # if the table contains data to the last business date, update last.
             if lastEntryDate == last_trading_date or lastEntryDate < last_trading_date:
-                self.update_last()
+                return self.update_last()
             # if the table contains incomplete data, fetch missing data to completion
             else:
-                print(
-                    f'> [{self.sym}]: table exists and contains data.. completing missing data..')
-                start = lastEntryDate + BDay(1)
+                TRACE.debug('> [%s]: table exists and contains data.. completing missing data..', self.sym)
+                start = lastEntryDate + pd.offsets.BDay(1)
                 quote = self._fetch_quote(start=start)
-                self._commit_entry(data=quote, update=0)
+                return self._commit_entry(data=quote, update=0)
         except ValueError:
             # if the table exists but empty, fetch and commit all the data
-            print(f'> [{self.sym}]: table exists but empty, filling..')
+            TRACE.debug('> [%s]: table exists but empty, filling..', self.sym)
             quote = self._fetch_quote(start=None)
-            self._commit_entry(data=quote, update=0)
+            return self._commit_entry(data=quote, update=0)
 
     def update_last(self):
         """
         Instance method update_last() reads last entry in the symbol table, and update it by fetching
             data starting from the date of the last entry, and committing it.
+        A failed commit is retried up to COMMIT_RETRIES times (with backoff), without fetching again.
 
         Raises:
-            e: caught error during fetching or committing
+            e: caught error during fetching, or the error of the last commit retry
+
+        Returns:
+            int: the number of rows written
         """
         existing_data = self.read_table()
         lastEntryDate = existing_data.tail(1).index.item().strftime("%Y-%m-%d")
-        print(f'> [{self.sym}]: updating last entry in table')
+        TRACE.debug('> [%s]: updating last entry in table', self.sym)
         try:
             quote = self._fetch_quote(start=lastEntryDate)
-            self._commit_entry(data=quote, update=1)
-        except exc.SQLAlchemyError as e:
-            print(repr(e))
-            print('Retrying..')
-            sleep(1)
-            self.update_last()
         except Exception as e:
-            print(repr(e))
+            TRACE.error('> [%s]: update failed %r', self.sym, e)
             raise e
+
+        backoff = Backoff()
+        while True:
+            try:
+                return self._commit_entry(data=quote, update=1)
+            except exc.SQLAlchemyError as e:
+                if backoff.attempt >= self.COMMIT_RETRIES:
+                    TRACE.error('> [%s]: update failed %r', self.sym, e)
+                    raise e
+                TRACE.warning('> [%s]: update failed %r, retrying..', self.sym, e)
+                sleep(backoff.next())
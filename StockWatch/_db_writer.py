@@ -0,0 +1,236 @@
+import queue
+from concurrent.futures import Future
+from threading import Lock, Thread
+from time import monotonic, perf_counter
+
+from sqlalchemy import event
+
+from ._metrics import METRICS
+from ._trace import TRACE
+
+# seconds writes are collected for after a flush, before the next one, only once writes were seen queued together
+# (a write of a single thread, or one queued while the writer is idle, is flushed at once)
+FLUSH_INTERVAL = 0.02
+# rows that end a batch before the interval does
+BATCH_ROWS = 50000
+# milliseconds a connection waits for a lock held by another process before failing
+BUSY_TIMEOUT = 5000
+
+
+def enable_wal(engine):
+    """
+    Function enable_wal() switches the database to write-ahead logging, so reads never wait for the writer
+        and the writer never waits for reads, and sets up every connection the engine opens: commits don't
+        wait for a disk sync (synchronous=NORMAL, safe in WAL mode), and a lock held by another process
+        is waited for up to BUSY_TIMEOUT instead of failing at once.
+
+    Args:
+        engine (Engine object): a sqlalchemy engine of a sqlite database file
+
+    Returns:
+        String: the journal mode of the database ('wal', or 'memory' for an in-memory database)
+    """
+    @event.listens_for(engine, 'connect')
+    def onConnect(dbapiConnection, connectionRecord):
+        cursor = dbapiConnection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT}')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.close()
+
+    # the journal mode is kept in the database file
+    with engine.connect() as connection:
+        return connection.exec_driver_sql('PRAGMA journal_mode = WAL').scalar()
+
+
+class DbWriter():
+    """
+    Class DbWriter represents the single path of all writes to the database: the writes of every thread
+        (the bars of every symbol, logs, the symbols list) are queued, and a single writer thread commits
+        the writes queued within a flush interval together, in one transaction. Threads never compete for
+        the sqlite write lock, and under load a write shares its commit with the others of its batch,
+        while a write that isn't competing with others is committed at once.
+    A write is a statement and its parameters (a list of row dicts is executed as an executemany),
+        or a function of a connection, and returns a Future of its row count.
+    If a batch fails, its writes are committed again one by one, so a failed write only fails its own Future.
+        If the writer itself fails (e.g. the database can't be opened), it stops, and fails the queued writes
+        and every later one.
+    The class is intended to be initialized and started only once by the MainControl object, on a database
+        in WAL mode (enable_wal()), so the tables are read while the writer writes.
+    """
+
+    def __init__(self, engine, interval=FLUSH_INTERVAL, batchRows=BATCH_ROWS):
+        """
+        DbWriter object constructor.
+
+        Args:
+            engine (Engine object): the sqlalchemy engine written through
+            interval (float, optional): seconds writes are collected for between two flushes. Defaults to FLUSH_INTERVAL.
+            batchRows (int, optional): rows that end a batch early. Defaults to BATCH_ROWS.
+        """
+        TRACE.info('>>>> [MAIN]: INITIALIZING DATABASE WRITER')
+        # primary switch
+        self.alive = True
+
+        self.engine = engine
+        self.interval = interval
+        self.batchRows = batchRows
+        # (write, params, future), None wakes the writer up to stop
+        self._queue = queue.SimpleQueue()
+        self._lastFlush = 0.0
+        self._lastBatch = 0
+        # the connection of the writer thread, open as long as it runs
+        self._connection = None
+        self._thread = None
+        # set once the writer takes its last writes, writes are queued and the flag set holding the lock
+        self._stopped = False
+        self._stopLock = Lock()
+
+        # counters of flushed batches and of the writes in them
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, write, params=None):
+        """
+        Instance method submit() queues a write, it can be called from any thread.
+
+        Args:
+            write: a sqlalchemy statement, or a function called with the connection of the batch transaction
+            params (optional): a dict of bound values, or a list of row dicts (an executemany). Defaults to None.
+
+        Raises:
+            RuntimeError: if the writer was killed, or stopped on a failure
+
+        Returns:
+            concurrent.futures.Future: the future of the number of rows written (or of the function result)
+        """
+        future = Future()
+        if isinstance(params, list) and not params and self.alive:
+            future.set_result(0)
+            return future
+        with self._stopLock:
+            if not self.alive or self._stopped or self._thread is not None and not self._thread.is_alive():
+                raise RuntimeError('database writer is not running')
+            self._queue.put((write, params, future))
+        return future
+
+    def write(self, write, params=None):
+        """
+        Instance method write() queues a write and waits for it to be committed, see submit().
+
+        Raises:
+            Exception: the error the write failed with
+        """
+        return self.submit(write, params).result()
+
+    def _write_loop(self):
+        """
+        Private instance method _write_loop() starts a loop that runs as long as
+            the primary switch == True, the loop body collects a batch of writes and flushes it.
+        Writes queued before the writer was killed are flushed before it stops. If the writer fails,
+            the primary switch is set to False, and the writes of the batch and the queued ones fail.
+        """
+        error = None
+        batch = []
+        try:
+            self._connection = self.engine.connect()
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                rows = len(item[1]) if isinstance(item[1], list) else 1
+                deadline = self._lastFlush + self.interval if self._lastBatch > 1 else 0.0
+                while rows < self.batchRows:
+                    try:
+                        remaining = deadline - monotonic()
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    rows += len(item[1]) if isinstance(item[1], list) else 1
+                self._lastFlush = monotonic()
+                self._lastBatch = len(batch)
+                self._flush(batch)
+                batch = []
+        except Exception as e:
+            error = e
+            self.alive = False
+            TRACE.error('>>>> [MAIN]: database writer failed %r', e)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        # writes that raced kill() (or the failure), no write is queued after this
+        with self._stopLock:
+            self._stopped = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                continue
+            if error is None:
+                self._flush([item])
+            else:
+                item[2].set_exception(error)
+        if self._connection is not None:
+            self._connection.close()
+        TRACE.info('>>>> [MAIN] database writer terminated - primary switch triggered')
+
+    @staticmethod
+    def _execute(connection, write, params):
+        if callable(write):
+            return write(connection)
+        result = connection.execute(write, params) if params is not None else connection.execute(write)
+        return result.rowcount if result.rowcount >= 0 else len(params) if isinstance(params, list) else 0
+
+    def _flush(self, batch):
+        """
+        Private instance method _flush() commits a batch of writes in a single transaction, and resolves
+            their futures. If the transaction fails, each write is committed again in its own.
+
+        Args:
+            batch (list): a list of (write, params, future)
+        """
+        start_time = perf_counter()
+        try:
+            with self._connection.begin():
+                results = [self._execute(self._connection, write, params) for write, params, _ in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            TRACE.warning('>>>> [MAIN]: database batch of %d writes failed %r, writing them one by one', len(batch), e)
+            for item in batch:
+                self._flush([item])
+            return
+        METRICS.observe('db.flush', perf_counter() - start_time)
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def start(self):
+        """
+        Instance method start() creates and starts a thread that runs _write_loop() in daemon mode
+        """
+        TRACE.info('>>>> [MAIN]: STARTING DATABASE WRITER')
+        self._thread = Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def kill(self):
+        """
+        Instance function kill() stops the writer by setting the primary switch to False,
+            and waits for the queued writes to be committed.
+        """
+        if not self.alive:
+            return
+        self.alive = False
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
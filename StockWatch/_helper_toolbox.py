@@ -6,6 +6,8 @@ from string import ascii_letters, digits
 from tkinter import LEFT, SOLID, Label, Listbox, Toplevel, Variable, font
 from tkinter.constants import END
 
+from ._symbol_index import SymbolIndex
+
 
 class Link(Label):
     """
@@ -121,20 +123,30 @@ class AutoComplete():
     """
     Class AutoComplete used in a tkinter Entry wiget to display an auto-complete list
         of symbols/companies starting with current user input in the entry field from
-        a provided symbols pandas dataframe.
+        a prefix index of the symbols, followed by ranked matches of a database search if one is provided.
+    Searches are debounced, so fast typing only searches for the input the user stopped at.
     """
 
-    def __init__(self, widget, symbols):
+    def __init__(self, widget, symbols, search=None, limit=20, debounce=120):
         """
         AutoComplete object constructor.
         Args:
             widget (Tkinter widget): a tkinter Entry widget
-            symbols (Dataframe): a pandas dataframe of the symbols in the database.
+            symbols (Dataframe or SymbolIndex): a pandas dataframe of the symbols in the database, or a prefix index of it.
+            search (callable, optional): a function that takes the input and a limit, and returns ranked matches
+                (e.g. MainControl.Symbols.search()). Defaults to None.
+            limit (int, optional): maximum number of suggestions. Defaults to 20.
+            debounce (int, optional): milliseconds to wait after the last key before searching. Defaults to 120.
         """
         self.widget = widget
-        self.symbols = symbols
+        self.index = symbols if isinstance(symbols, SymbolIndex) else SymbolIndex.from_frame(symbols)
+        self.search = search
+        self.limit = limit
+        self.debounce = debounce
         self.acBox = None
         self.boxIndexes = None
+        self.boxWords = None
+        self._pendingSearch = None
         widget.bind('<KeyRelease>', lambda event: self._auto_complete(event))
         widget.bind('<FocusOut>', lambda event: self._hide_auto_complete())
 
@@ -154,22 +166,18 @@ class AutoComplete():
 
         # if the entry is empty, do nothing
         if input == '':
+            self._cancel_search()
             self._hide_auto_complete()
             return
         # if the pressed key is Escape of a space, hide auto complete
         elif keysym in ['space', 'Escape']:
+            self._cancel_search()
             self._hide_auto_complete()
         # if the pressed key is alphanumerical or a Backspace or a Delete
         elif keysym in ascii_letters + digits or keysym in ['BackSpace', 'Delete']:
-            # get last part of the entry (chars after last space)
-            inputList = input.strip().split(" ")
-            lastInput = inputList[-1]
-            # get matching symbols/names
-            data = self.symbols.loc[self.symbols.Symbol.str.startswith(
-                lastInput) | self.symbols.Security_Name.str.upper().str.startswith(lastInput)].to_dict(orient='records')
-            self.boxIndexes = [i for i in range(len(data))]
-            # show auto complete list
-            self._show_auto_complete(data)
+            # search once the user stops typing, replacing any search still waiting
+            self._cancel_search()
+            self._pendingSearch = self.widget.after(self.debounce, self._search)
         # if the pressed key is Up or Down
         elif keysym in ['Up', 'Down']:
             # index of selection
@@ -196,6 +204,63 @@ class AutoComplete():
             # generate a ListboxSelect event to trigger __select_auto_complete() handler
             self.listbox.event_generate('<<ListboxSelect>>')
 
+    def _cancel_search(self):
+        """
+        Private instance method _cancel_search() cancels a debounced search that has not run yet.
+        """
+        if self._pendingSearch:
+            self.widget.after_cancel(self._pendingSearch)
+            self._pendingSearch = None
+
+    def _matches(self, input):
+        """
+        Private instance method _matches() returns the suggestions for the input: if it ends with a company name
+            of several words, its ranked matches come first (the longest run of last words with matches), then
+            tickers starting with the last part of the input, followed by ranked matches of the last part.
+
+        Args:
+            input (String): upper-cased entry input
+
+        Returns:
+            list: a list of dicts {'Symbol': String, 'Security_Name': String, 'Words': int}, where Words is
+                the number of words at the end of the input the suggestion replaces
+        """
+        words = input.split()
+        # get last part of the entry (chars after last space)
+        lastInput = words[-1]
+        data = []
+        if self.search:
+            # earlier words may be tickers of other windows ('MSFT ALPHABET CLASS C')
+            for first in range(len(words) - 1):
+                data = [dict(sym, Words=len(words) - first) for sym in self.search(' '.join(words[first:]), self.limit)]
+                if data:
+                    break
+        found = {sym['Symbol'] for sym in data}
+        data += [dict(sym, Words=1) for sym in self.index.lookup(lastInput, self.limit)
+                 if sym['Symbol'] not in found][:self.limit - len(data)]
+        # fill the rest of the list with ranked matches of any part of tickers and names
+        if self.search and len(data) < self.limit:
+            found = {sym['Symbol'] for sym in data}
+            data += [dict(sym, Words=1) for sym in self.search(lastInput, self.limit)
+                     if sym['Symbol'] not in found][:self.limit - len(data)]
+        return data
+
+    def _search(self):
+        """
+        Private instance method _search() runs a debounced search on the current entry input.
+        """
+        self._pendingSearch = None
+        input = self.widget.get().upper()
+        if input.strip() == '':
+            self._hide_auto_complete()
+            return
+        # get matching symbols/names
+        data = self._matches(input)
+        self.boxIndexes = [i for i in range(len(data))]
+        self.boxWords = [sym['Words'] for sym in data]
+        # show auto complete list
+        self._show_auto_complete(data)
+
     def _show_auto_complete(self, data):
         """
         Private instance method _show_auto_complete() displays a listbox of the data in the provided dataframe
@@ -254,10 +319,10 @@ class AutoComplete():
         # get symbol from selection text
         symbol = self.listbox.get(selectionIndex).split(':')[0]
 
-        # current input to list, add selection to list, list to string again
+        # current input to list, replace the words the selection matched with it, list to string again
         input = self.widget.get()
-        inputList = input.strip().split(" ")
-        newInput = " ".join(inputList[:-1] + [symbol + ' '])
+        inputList = input.strip().split()
+        newInput = " ".join(inputList[:-self.boxWords[selectionIndex[0]]] + [symbol + ' '])
 
         # replace current input with new input
         self.widget.delete(0, END)
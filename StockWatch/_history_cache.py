@@ -0,0 +1,239 @@
+import os
+from threading import RLock
+
+from ._history_store import HistoryStore
+from ._lazy_module import LazyModule
+from ._ohlc_pyramid import OHLCPyramid
+from ._rolling_stats import RollingStats
+from ._trace import TRACE
+
+pd = LazyModule('pandas')
+
+
+class HistoryCache():
+    """
+    Class HistoryCache represents an in-memory copy of a symbol table, it is created and
+        managed by a TableControl instance.
+    The table is loaded from the database only once, after that the cache is kept current
+        by applying deltas, either the rows that were just upserted, or the rows read from
+        the database that are newer than the last cached date, so the per-tick cost depends on
+        the number of changed rows and not on the length of the history.
+    The OHLC pyramid of the table is built on demand and kept until the table changes, and its rolling
+        statistics are built on demand and kept current with every applied delta.
+    Given a history file path, the copy is kept in a memory-mapped HistoryStore instead of memory: the file is
+        opened (not read) and caught up with the table, deltas are written to it, and the cached dataframe
+        is a view of it. The table is only read whole if the file is missing or its rows don't match the table.
+    """
+
+    def __init__(self, sym, loader, deltaLoader, storePath=None, counter=None):
+        """
+        HistoryCache object constructor.
+
+        Args:
+            sym (String): a company symbol/ticker
+            loader (callable): a function that returns the whole table as a dataframe indexed by Date
+            deltaLoader (callable): a function that takes a date and returns a dataframe of the rows
+                dated on or after that date
+            storePath (String, optional): path of the history file of the table. Defaults to None (kept in memory).
+            counter (callable, optional): a function that returns the number of rows in the table,
+                required with storePath. Defaults to None.
+        """
+        self.sym = sym
+        self._loader = loader
+        self._deltaLoader = deltaLoader
+        self.storePath = storePath
+        self._counter = counter
+        self._store = None
+        self._frame = None
+        self._pyramid = None
+        self._stats = None
+        self._lock = RLock()
+
+    @property
+    def loaded(self):
+        """
+        Boolean: True if the table has been loaded from the database
+        """
+        return self._frame is not None
+
+    @property
+    def stored(self):
+        """
+        Boolean: True if the table has a history file to be loaded from
+        """
+        return self.storePath is not None and os.path.exists(self.storePath)
+
+    def frame(self):
+        """
+        Instance method frame() returns the cached dataframe, loading it on first call.
+
+        Returns:
+            Dataframe: a pandas dataframe of the symbol table indexed by Date
+        """
+        with self._lock:
+            if self._frame is None:
+                self._frame = self._load()
+            return self._frame
+
+    def preload(self, table):
+        """
+        Instance method preload() fills the cache with the whole table read by the caller (e.g. with the tables
+            of a whole watchlist in a single query), unless it's loaded already.
+
+        Args:
+            table (Dataframe): a pandas dataframe of the whole symbol table indexed by Date
+        """
+        with self._lock:
+            if self._frame is None:
+                self._frame = self._load(table)
+
+    def _load(self, table=None):
+        """
+        Private instance method _load() returns the whole table, from its history file if there is one.
+
+        Args:
+            table (Dataframe, optional): the whole table, already read. Defaults to None (read when needed).
+        """
+        if table is not None:
+            loader, deltaLoader, counter = (lambda: table), (lambda date: table[table.index >= date]), table.__len__
+        else:
+            loader, deltaLoader, counter = self._loader, self._deltaLoader, self._counter
+        if self.storePath is None:
+            return loader()
+        store = HistoryStore.open(self.storePath)
+        try:
+            if store is None or len(store) != counter():
+                # missing, or written to by others in the middle (e.g. gaps filled by a daemon)
+                store = HistoryStore.create(self.storePath, loader())
+            elif len(store):
+                store.apply(deltaLoader(pd.Timestamp(store.dates[-1])))
+        except OSError as e:
+            TRACE.warning('> [%s]: history file failed %r, kept in memory', self.sym, e)
+            self.storePath = None
+            self._store = None
+            return loader()
+        self._store = store
+        return store.frame()
+
+    def pyramid(self):
+        """
+        Instance method pyramid() returns the multi-resolution bars of the cached dataframe, building them on first call
+            after a change.
+
+        Returns:
+            OHLCPyramid: daily, weekly, monthly and quarterly bars of the symbol table
+        """
+        with self._lock:
+            frame = self.frame()
+            if self._pyramid is None:
+                self._pyramid = OHLCPyramid(frame)
+            return self._pyramid
+
+    def stats(self):
+        """
+        Instance method stats() returns the rolling statistics of the cached dataframe, building them on first call.
+
+        Returns:
+            RollingStats: 52-week high/low and average volume of the symbol table
+        """
+        with self._lock:
+            frame = self.frame()
+            if self._stats is None:
+                self._stats = RollingStats.from_frame(frame)
+            return self._stats
+
+    def refresh(self):
+        """
+        Instance method refresh() reads the rows dated on or after the last cached date
+            (the last bar included, since it may have been revised) and applies them.
+        """
+        with self._lock:
+            if self._frame is None or self._frame.empty:
+                self._frame = self._load()
+                self._pyramid = None
+                self._stats = None
+                return
+            self._merge(self._deltaLoader(self._frame.index[-1]))
+
+    def apply_rows(self, rows):
+        """
+        Instance method apply_rows() applies upserted rows to the cached dataframe,
+            the rows are ignored if the table was never loaded, the first read will load them.
+
+        Args:
+            rows (list): a list of row dicts as committed to the symbol table
+        """
+        if not rows:
+            return
+        with self._lock:
+            if self._frame is None:
+                return
+            delta = pd.DataFrame(rows)
+            delta.index = pd.DatetimeIndex(pd.to_datetime(delta.pop('Date')), name='Date')
+            self._merge(delta)
+
+    def _merge(self, delta):
+        """
+        Private instance method _merge() updates existing dates in place, and appends new ones
+            (in the history file, if there is one).
+
+        Args:
+            delta (Dataframe): a dataframe of changed rows indexed by Date
+        """
+        if delta.empty:
+            return
+        self._pyramid = None
+        if self._store is not None:
+            wasEmpty = self._frame.empty
+            rows = len(self._frame)
+            try:
+                added = self._store.apply(delta)
+            except OSError as e:
+                TRACE.warning('> [%s]: history file failed %r, kept in memory', self.sym, e)
+                self.storePath = None
+                self._store = None
+                self._frame = self._frame.copy()
+            else:
+                self._frame = self._store.frame()
+                # rows another process wrote to the file (caught up by the store) are not in the statistics
+                if wasEmpty or len(self._frame) != rows + added:
+                    self._stats = None
+                else:
+                    self._update_stats(delta)
+                return
+        frame = self._frame
+        if frame.empty:
+            self._frame = delta.reindex(columns=frame.columns).sort_index()
+            self._stats = None
+            return
+
+        delta = delta.reindex(columns=frame.columns)
+        existing = frame.index.get_indexer(delta.index) >= 0
+        if existing.any():
+            revised = delta[existing]
+            frame.loc[revised.index, frame.columns] = revised.values
+        if not existing.all():
+            added = delta[~existing]
+            frame = pd.concat([frame, added])
+            # a gap fill may land before the last cached date
+            if added.index.min() < self._frame.index[-1]:
+                frame = frame.sort_index()
+            self._frame = frame
+        self._update_stats(delta)
+
+    def _update_stats(self, delta):
+        """
+        Private instance method _update_stats() applies merged rows to the rolling statistics, if they were built.
+
+        Args:
+            delta (Dataframe): a dataframe of changed rows indexed by Date
+        """
+        if self._stats is None:
+            return
+        delta = delta.sort_index()
+        try:
+            for date, high, low, volume in zip(delta.index, delta['High'], delta['Low'], delta['Volume']):
+                self._stats.update(date, high, low, volume)
+        except ValueError:
+            # a gap fill or a revision of an older bar, rebuilt from the table on the next read
+            self._stats = None
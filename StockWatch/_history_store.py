@@ -0,0 +1,279 @@
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory locks on windows, a single process writes the history files there
+    fcntl = None
+
+from ._lazy_module import LazyModule
+
+pd = LazyModule('pandas')
+
+# history file layout: a json header padded to HEADER_SIZE bytes, followed by one array per column,
+# each with room for 'capacity' rows of which the first 'rows' are used
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+
+# the columns of a symbol table, the dates are the index of its dataframe
+DATE = 'Date'
+COLUMNS = ('High', 'Low', 'Open', 'Close', 'Volume', 'Adj_Close')
+
+# free rows allocated at the end of every column (2 years of daily bars), so appends don't rewrite the file
+SPARE_ROWS = 512
+
+
+class HistoryStore():
+    """
+    Class HistoryStore represents the columnar history file of a symbol table: the dates and every column of its bars
+        are numpy arrays in a file next to the database, memory-mapped when the file is opened, so a history of any
+        length is opened without reading it, and dataframes of it are views of the file (nothing is copied).
+    Revised bars are written in place, and new bars are appended to the free rows at the end of every column,
+        the file is rewritten (to a temporary path first, then moved) only when the columns are full or a gap
+        is filled before the last date.
+    The file is a cache of the bars table, it's created and kept in sync by HistoryCache. Every process sharing
+        the database (the window and the ingest daemon) may hold a store of the same file, so writes take
+        the lock of the file, and catch up with the writes of the other stores (or their rewrites) first.
+    """
+
+    def __init__(self, path, header):
+        """
+        HistoryStore object constructor, use create() or open().
+
+        Args:
+            path (String): path of the history file
+            header (dict): the header of the file
+        """
+        self.path = path
+        self._map(header)
+
+    def _map(self, header):
+        """
+        Private instance method _map() memory-maps the columns of the file described by header, called with the lock held.
+        """
+        self.rows = header['rows']
+        self.capacity = header['capacity']
+        self._header = header
+        # the file mapped, a rewrite replaces the file at path with another one
+        self._inode = os.stat(self.path).st_ino
+        # column -> memory-mapped array of capacity rows
+        self._arrays = {}
+        for name, spec in header['columns'].items():
+            self._arrays[name] = np.memmap(self.path, dtype=np.dtype(spec['dtype']), mode='r+', offset=spec['offset'],
+                                           shape=(self.capacity,))
+
+    @classmethod
+    def create(cls, path, frame):
+        """
+        Class method create() writes a new history file of a symbol table, replacing the existing one.
+
+        Args:
+            path (String): path of the history file
+            frame (Dataframe): a dataframe of the symbol table indexed by Date
+
+        Returns:
+            HistoryStore: the store of the new file
+        """
+        with cls.locked(path):
+            return cls(path, cls._write(path, frame))
+
+    @staticmethod
+    @contextmanager
+    def locked(path):
+        """
+        Static method locked() holds the exclusive lock of a history file while its block runs, so stores of the file
+            (of any thread or process) write it one at a time. The lock is taken on a lock file next to it, as the
+            history file itself is replaced by rewrites.
+
+        Args:
+            path (String): path of the history file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f'{path}.lock', 'a') as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            # closing the lock file releases the lock
+            yield
+
+    @staticmethod
+    def _write(path, frame):
+        """
+        Private static method _write() writes a history file of a dataframe, to a temporary path first and then moved,
+            so readers never see a half written file (a reader that mapped the old file keeps reading it).
+
+        Returns:
+            dict: the header of the file
+        """
+        rows = len(frame)
+        capacity = rows + SPARE_ROWS
+        arrays = {DATE: frame.index.values.astype('datetime64[ns]')}
+        arrays.update((name, frame[name].to_numpy(dtype=np.float64) if name in frame
+                       else np.full(rows, np.nan)) for name in COLUMNS)
+
+        header = {'version': FORMAT_VERSION, 'rows': rows, 'capacity': capacity, 'columns': {}}
+        offset = HEADER_SIZE
+        for name, array in arrays.items():
+            header['columns'][name] = {'dtype': array.dtype.str, 'offset': offset}
+            offset += -(-array.itemsize * capacity // ALIGNMENT) * ALIGNMENT
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode().ljust(HEADER_SIZE, b' '))
+            for name, array in arrays.items():
+                f.seek(header['columns'][name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(offset)
+        os.replace(tmp_path, path)
+        return header
+
+    @classmethod
+    def open(cls, path):
+        """
+        Class method open() opens an existing history file, its columns are memory-mapped, not read.
+
+        Args:
+            path (String): path of the history file
+
+        Returns:
+            HistoryStore: the store of the file, or None if the file does not exist or has a different format version
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            # a header read with the lock is the header of the file mapped
+            with cls.locked(path):
+                header = cls._read_header(path)
+                if header.get('version') != FORMAT_VERSION or set(header['columns']) != {DATE, *COLUMNS}:
+                    return None
+                return cls(path, header)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def _read_header(path):
+        with open(path, 'rb') as f:
+            return json.loads(f.read(HEADER_SIZE))
+
+    def _catch_up(self):
+        """
+        Private instance method _catch_up() follows the writes of other stores of the file, called with the lock held:
+            the file is mapped again if it was rewritten (or its header changed), or only its row count is read
+            if rows were appended to it.
+
+        Raises:
+            OSError: if the file was removed
+        """
+        header = self._read_header(self.path)
+        if os.stat(self.path).st_ino != self._inode or header['columns'] != self._header['columns'] \
+                or header['capacity'] != self.capacity:
+            self._map(header)
+        else:
+            self.rows = header['rows']
+            self._header = header
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def dates(self):
+        """
+        ndarray: a read-only view of the dates of the bars (datetime64[ns])
+        """
+        return self._view(DATE)
+
+    def column(self, name):
+        """
+        Instance method column() returns a read-only view of a column of the bars.
+
+        Args:
+            name (String): a name in COLUMNS
+
+        Returns:
+            ndarray: a float64 array of the column
+        """
+        return self._view(name)
+
+    def _view(self, name):
+        # readers can't write to the file, only apply() does
+        view = self._arrays[name][:self.rows]
+        view.flags.writeable = False
+        return view
+
+    def frame(self):
+        """
+        Instance method frame() returns a dataframe of the bars indexed by Date, its index and columns are
+            views of the file (it's valid as long as the store is referenced, and stops following it on appends).
+
+        Returns:
+            Dataframe: a pandas dataframe of the symbol table
+        """
+        index = pd.DatetimeIndex(self.dates, name=DATE, copy=False)
+        return pd.DataFrame({name: self.column(name) for name in COLUMNS}, index=index, copy=False)
+
+    def _write_rows(self):
+        """
+        Private instance method _write_rows() writes the number of rows to the header, after the rows themselves,
+            so a reader of the file never sees rows that were not written yet.
+        """
+        self._header['rows'] = self.rows
+        with open(self.path, 'r+b') as f:
+            f.write(json.dumps(self._header).encode().ljust(HEADER_SIZE, b' '))
+
+    def apply(self, delta):
+        """
+        Instance method apply() applies changed bars to the file: bars of existing dates are revised in place,
+            and newer bars are appended. A gap filled before the last date, or more bars than free rows,
+            rewrite the file, the store then maps the new file.
+
+        Args:
+            delta (Dataframe): a dataframe of changed bars indexed by Date
+
+        Raises:
+            OSError: if the file was removed, or could not be written
+
+        Returns:
+            int: the number of bars added
+        """
+        if delta.empty:
+            return 0
+        with self.locked(self.path):
+            self._catch_up()
+            return self._apply(delta)
+
+    def _apply(self, delta):
+        """
+        Private instance method _apply() is the body of apply(), called with the lock held.
+        """
+        delta = delta[~delta.index.duplicated(keep='last')].sort_index()
+        dates = delta.index.values.astype('datetime64[ns]')
+        values = {name: delta[name].to_numpy(dtype=np.float64) if name in delta else np.full(len(delta), np.nan)
+                  for name in COLUMNS}
+
+        positions = np.searchsorted(self.dates, dates)
+        existing = positions < self.rows
+        existing[existing] = self.dates[positions[existing]] == dates[existing]
+        if existing.any():
+            for name in COLUMNS:
+                self._arrays[name][positions[existing]] = values[name][existing]
+        added = ~existing
+        if not added.any():
+            return 0
+
+        if self.rows and dates[added][0] <= self.dates[-1] or self.rows + added.sum() > self.capacity:
+            frame = pd.concat([self.frame(), delta.reindex(columns=COLUMNS)[added]]).sort_index()
+            self._map(self._write(self.path, frame))
+            return int(added.sum())
+
+        end = self.rows + int(added.sum())
+        self._arrays[DATE][self.rows:end] = dates[added]
+        for name in COLUMNS:
+            self._arrays[name][self.rows:end] = values[name][added]
+        self.rows = end
+        self._write_rows()
+        return int(added.sum())
@@ -0,0 +1,49 @@
+import sys
+from threading import Lock
+
+
+class LazyModule():
+    """
+    Class LazyModule represents a module that is imported on first attribute access,
+        it is used for heavy dependencies (pandas, matplotlib, mplfinance, pandas_datareader..)
+        so importing the StockWatch package, and drawing the main window, does not wait for them.
+
+    Example:
+        pd = LazyModule('pandas')  # nothing is imported yet
+        pd.DataFrame()  # pandas is imported here
+    """
+
+    def __init__(self, name, onLoad=None):
+        """
+        LazyModule object constructor.
+
+        Args:
+            name (String): the full name of the module (e.g. 'matplotlib.backends.backend_tkagg')
+            onLoad (callable, optional): a function called with the module once it's imported. Defaults to None.
+        """
+        self.__dict__['_name'] = name
+        self.__dict__['_onLoad'] = onLoad
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = Lock()
+
+    def _load(self):
+        """
+        Private instance method _load() imports the module if it's not imported yet, and returns it.
+        """
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    __import__(self._name)
+                    module = sys.modules[self._name]
+                    if self._onLoad:
+                        self._onLoad(module)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f'<LazyModule {self._name} ({"loaded" if self._module else "not loaded"})>'
@@ -0,0 +1,179 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from dateutil.easter import easter
+from dateutil.relativedelta import MO, TH, relativedelta
+from pytz import timezone
+
+# the exchange timezone, DST aware
+EXCHANGE_TZ = timezone('America/New_York')
+
+OPEN_TIME = time(9, 30)
+CLOSE_TIME = time(16, 0)
+EARLY_CLOSE_TIME = time(13, 0)
+
+
+def _observed(day):
+    """
+    Function _observed() moves a holiday falling on a weekend to the closest weekday.
+    """
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """
+    Function holidays() returns the dates the exchange (NYSE/NASDAQ) is closed for a full day in the given year.
+        The result is cached per year.
+
+    Args:
+        year (Integer): a calendar year
+
+    Returns:
+        frozenset: a set of datetime.date objects
+    """
+    days = {
+        relativedelta(month=1, day=1, weekday=MO(+3)) + date(year, 1, 1),  # Martin Luther King Jr. Day
+        relativedelta(month=2, day=1, weekday=MO(+3)) + date(year, 1, 1),  # Washington's Birthday
+        easter(year) - timedelta(days=2),  # Good Friday
+        relativedelta(month=5, day=31, weekday=MO(-1)) + date(year, 1, 1),  # Memorial Day
+        _observed(date(year, 7, 4)),  # Independence Day
+        relativedelta(month=9, day=1, weekday=MO(+1)) + date(year, 1, 1),  # Labor Day
+        relativedelta(month=11, day=1, weekday=TH(+4)) + date(year, 1, 1),  # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # New Year's Day is not observed on the Friday before when it falls on a Saturday
+    if date(year, 1, 1).weekday() != 5:
+        days.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(days)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """
+    Function early_closes() returns the dates the exchange closes at 13:00 in the given year.
+        The result is cached per year.
+
+    Args:
+        year (Integer): a calendar year
+
+    Returns:
+        frozenset: a set of datetime.date objects
+    """
+    thanksgiving = relativedelta(month=11, day=1, weekday=TH(+4)) + date(year, 1, 1)
+    days = {date(year, 7, 3), thanksgiving + timedelta(days=1), date(year, 12, 24)}
+    return frozenset(day for day in days if day.weekday() < 5 and day not in holidays(year))
+
+
+class MarketCalendar():
+    """
+    Class MarketCalendar represents the trading sessions of the exchange, it knows about weekends,
+        holidays and early closes, and computes session open and close transitions in the exchange timezone.
+    The class is used by the TimeKeep object to schedule wake ups on market open and close
+        instead of checking the market status continuously.
+    """
+
+    def __init__(self, tz=EXCHANGE_TZ):
+        """
+        MarketCalendar object constructor.
+
+        Args:
+            tz (pytz timezone, optional): the exchange timezone. Defaults to EXCHANGE_TZ.
+        """
+        self.tz = tz
+
+    def now(self):
+        """
+        Instance method now() returns the current datetime in the exchange timezone.
+        """
+        return datetime.now(self.tz)
+
+    def is_session(self, day):
+        """
+        Instance method is_session() returns True if the exchange trades on the given date.
+
+        Args:
+            day (date): a date
+        """
+        return day.weekday() < 5 and day not in holidays(day.year)
+
+    def session(self, day):
+        """
+        Instance method session() returns the open and close datetimes of the session on the given date.
+
+        Args:
+            day (date): a date
+
+        Returns:
+            tuple: (open, close) timezone aware datetimes, or None if the exchange does not trade on that date.
+        """
+        if not self.is_session(day):
+            return None
+        close = EARLY_CLOSE_TIME if day in early_closes(day.year) else CLOSE_TIME
+        # localize() picks the right UTC offset of that date, so DST changes are handled
+        return (self.tz.localize(datetime.combine(day, OPEN_TIME)),
+                self.tz.localize(datetime.combine(day, close)))
+
+    def status(self, now=None):
+        """
+        Instance method status() returns the market status and the time of the next transition.
+
+        Args:
+            now (datetime, optional): a timezone aware datetime. Defaults to now().
+
+        Returns:
+            tuple: (Boolean, datetime) True if the market is open, and the datetime it next opens or closes.
+        """
+        now = now.astimezone(self.tz) if now else self.now()
+        day = now.date()
+        session = self.session(day)
+        if session:
+            if now < session[0]:
+                return False, session[0]
+            if now < session[1]:
+                return True, session[1]
+        # closed, find the next session's open
+        while True:
+            day += timedelta(days=1)
+            session = self.session(day)
+            if session:
+                return False, session[0]
+
+    def last_session(self, now=None):
+        """
+        Instance method last_session() returns the most recent session that has already opened.
+
+        Args:
+            now (datetime, optional): a timezone aware datetime. Defaults to now().
+
+        Returns:
+            tuple: (open, close) timezone aware datetimes
+        """
+        now = now.astimezone(self.tz) if now else self.now()
+        day = now.date()
+        session = self.session(day)
+        if session and now >= session[0]:
+            return session
+        while True:
+            day -= timedelta(days=1)
+            session = self.session(day)
+            if session:
+                return session
+
+    def last_trading_day(self, now=None):
+        """
+        Instance method last_trading_day() returns the date of the most recent session that has already opened.
+
+        Args:
+            now (datetime, optional): a timezone aware datetime. Defaults to now().
+
+        Returns:
+            date: the date of the last trading day
+        """
+        return self.last_session(now)[0].date()
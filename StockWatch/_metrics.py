@@ -0,0 +1,263 @@
+import json
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Event, Lock, Thread
+from time import perf_counter
+
+from ._trace import TRACE
+
+# stage -> the kind of work it times, so network time can be told from database and render time
+STAGES = {
+    'quote.fetch': 'net',      # QuoteHub multi-symbol quote request
+    'history.fetch': 'net',    # TableControl._fetch_quote() bars request
+    'db.commit': 'db',         # TableControl._commit_entry(), until the writer committed it
+    'db.flush': 'db',          # DbWriter batch transaction, of the writes of all symbols
+    'db.read': 'db',           # TableControl table reads (a cold read_table(), or a refresh)
+    'ui.update': 'render',     # DisplayWindow.update_window()
+    'ui.drain': 'render',      # UIDispatcher.drain() on the tkinter thread
+    'plot.replot': 'render',   # PlotGraph._replot()
+    'tick': 'total',           # a whole data generator fetch, from the quote to the window update
+}
+
+# upper bounds (milliseconds) of the latency histogram buckets, the last bucket is unbounded
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# seconds between two snapshots dumped by MetricsDumper
+DUMP_INTERVAL = 10
+
+
+class Histogram():
+    """
+    Class Histogram represents the latency distribution of a stage, in fixed buckets of milliseconds,
+        so recording a latency costs the same however many were recorded.
+    Quantiles are estimated by interpolating inside the bucket they fall in.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """
+        Instance method quantile() estimates a latency quantile.
+
+        Args:
+            q (float): the quantile, 0.95 for p95
+
+        Returns:
+            float: milliseconds, 0.0 if nothing was recorded
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = BUCKETS[i - 1] if i else 0.0
+                high = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(low + (high - low) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def summary(self):
+        """
+        Instance method summary() returns the count and the milliseconds of the histogram.
+        """
+        return {'count': self.count, 'total_ms': round(self.total, 3),
+                'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+                'p50_ms': round(self.quantile(0.5), 3), 'p95_ms': round(self.quantile(0.95), 3),
+                'max_ms': round(self.max, 3)}
+
+
+class Metrics():
+    """
+    Class Metrics represents an in-process registry of counters and latency histograms, every stage of the
+        data path records its latency tagged with the symbol it worked for (None for shared work, e.g. a quote
+        request of all windows), and with the kind of the stage in STAGES (net, db, render, total).
+    It is thread safe, and intended to be used through the single METRICS instance, which the stats panel of the
+        main window and MetricsDumper read snapshots of.
+    """
+
+    def __init__(self):
+        self.start_time = perf_counter()
+        # (stage, symbol) -> Histogram
+        self._histograms = {}
+        # (name, symbol) -> int
+        self._counters = {}
+        self._lock = Lock()
+
+    def observe(self, stage, seconds, sym=None):
+        """
+        Instance method observe() records the latency of a stage.
+
+        Args:
+            stage (String): a stage in STAGES
+            seconds (float): the time the stage took
+            sym (String, optional): the symbol the stage worked for. Defaults to None.
+        """
+        with self._lock:
+            histogram = self._histograms.get((stage, sym))
+            if histogram is None:
+                histogram = self._histograms[(stage, sym)] = Histogram()
+            histogram.observe(seconds * 1000)
+
+    @contextmanager
+    def timed(self, stage, sym=None):
+        """
+        Instance method timed() is a context manager that records the latency of the stage it wraps,
+            failed stages included.
+        """
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, perf_counter() - start_time, sym)
+
+    def count(self, name, value=1, sym=None):
+        """
+        Instance method count() adds to a counter (e.g. 'rows', 'errors').
+
+        Args:
+            name (String): name of the counter
+            value (int, optional): the amount to add. Defaults to 1.
+            sym (String, optional): the symbol the counter is for. Defaults to None.
+        """
+        with self._lock:
+            self._counters[(name, sym)] = self._counters.get((name, sym), 0) + value
+
+    def reset(self):
+        """
+        Instance method reset() clears all counters and histograms.
+        """
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self.start_time = perf_counter()
+
+    def snapshot(self, sym=False):
+        """
+        Instance method snapshot() returns the counters and histogram summaries, per stage over all symbols,
+            and per stage and symbol.
+
+        Args:
+            sym (optional): only the stages and counters of this symbol, None for the shared ones.
+                Defaults to False (all of them).
+
+        Returns:
+            dict: {'at': String, 'uptime': float, 'stages': list, 'per_symbol': list, 'counters': list}
+        """
+        with self._lock:
+            histograms = {key: histogram for key, histogram in self._histograms.items()
+                          if sym is False or key[1] == sym}
+            totals = {}
+            for (stage, _), histogram in histograms.items():
+                totals.setdefault(stage, Histogram()).merge(histogram)
+            snapshot = {
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'uptime': round(perf_counter() - self.start_time, 3),
+                'stages': [dict(stage=stage, kind=STAGES.get(stage), **histogram.summary())
+                           for stage, histogram in totals.items()],
+                'per_symbol': [dict(stage=stage, kind=STAGES.get(stage), sym=key, **histogram.summary())
+                            for (stage, key), histogram in histograms.items()],
+                'counters': [{'name': name, 'sym': key, 'value': value} for (name, key), value in self._counters.items()
+                             if sym is False or key == sym],
+            }
+        order = list(STAGES)
+        snapshot['stages'].sort(key=lambda stats: order.index(stats['stage']) if stats['stage'] in order else len(order))
+        return snapshot
+
+    def symbols(self):
+        """
+        Instance method symbols() returns the symbols metrics were recorded for.
+        """
+        with self._lock:
+            return sorted({sym for _, sym in self._histograms if sym is not None})
+
+    def dump(self, path):
+        """
+        Instance method dump() appends a snapshot to a file, as a line of json.
+
+        Args:
+            path (String): path of the dump file
+        """
+        with open(path, 'a') as dump:
+            dump.write(json.dumps(self.snapshot()) + '\n')
+
+
+METRICS = Metrics()
+
+
+class MetricsDumper():
+    """
+    Class MetricsDumper appends a snapshot of METRICS to a file once every interval, and once more when killed,
+        so the stages of a run can be compared over time (one json snapshot per line).
+    """
+
+    def __init__(self, path, interval=DUMP_INTERVAL, metrics=None):
+        """
+        MetricsDumper object constructor.
+
+        Args:
+            path (String): path of the dump file, appended to if it exists
+            interval (float, optional): seconds between two snapshots. Defaults to DUMP_INTERVAL.
+            metrics (Metrics object, optional): the registry to dump. Defaults to METRICS.
+        """
+        TRACE.info('>>>> [MAIN]: DUMPING METRICS TO %s EVERY %ss', path, interval)
+        # primary switch
+        self.alive = True
+
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics if metrics else METRICS
+        self._wake = Event()
+        self._thread = None
+
+    def _dump_loop(self):
+        """
+        Private instance method _dump_loop() starts a loop that runs as long as
+            the primary switch == True, the loop body dumps a snapshot once every interval.
+        """
+        while not self._wake.wait(self.interval):
+            self._dump()
+        self._dump()
+        TRACE.info('>>>> [MAIN] metrics dumper terminated - primary switch triggered')
+
+    def _dump(self):
+        try:
+            self.metrics.dump(self.path)
+        except OSError as e:
+            TRACE.error('>>>> [MAIN]: metrics dump failed %r', e)
+
+    def start(self):
+        """
+        Instance method start() creates and starts a thread that runs _dump_loop() in daemon mode
+        """
+        self._thread = Thread(target=self._dump_loop, daemon=True)
+        self._thread.start()
+
+    def kill(self):
+        """
+        Instance function kill() stops the loop by setting the primary switch to False,
+            and waits for the last snapshot to be written.
+        """
+        if not self.alive:
+            return
+        self.alive = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
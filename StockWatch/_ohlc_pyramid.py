@@ -0,0 +1,77 @@
+from importlib.metadata import version
+
+import numpy as np
+
+from ._lazy_module import LazyModule
+
+pd = LazyModule('pandas')
+
+# month and quarter end rules, pandas 2.2 renamed them ('M' and 'Q' are deprecated), read without importing pandas
+if tuple(int(part) for part in version('pandas').split('.')[:2]) >= (2, 2):
+    MONTH_END, QUARTER_END = 'ME', 'QE'
+else:
+    MONTH_END, QUARTER_END = 'M', 'Q'
+
+# pyramid levels, finest first: (name, pandas resample rule)
+LEVELS = (('daily', None), ('weekly', 'W-FRI'), ('monthly', MONTH_END), ('quarterly', QUARTER_END))
+
+# how the bars of a period are aggregated, First and Last are the trading day positions of the period
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum',
+               'First': 'min', 'Last': 'max'}
+
+
+class OHLCPyramid():
+    """
+    Class OHLCPyramid represents a multi-resolution copy of the daily bars of a symbol: daily, weekly,
+        monthly and quarterly bars, aggregated once with vectorized resampling, so a chart of a long
+        period can draw about as many bars as it has pixels for.
+    Every level keeps its bars on the trading day positions of the daily level (a weekly bar is centered
+        on its days and as wide as they are), so levels can be swapped on the same axes while zooming.
+    """
+
+    def __init__(self, frame):
+        """
+        OHLCPyramid object constructor.
+
+        Args:
+            frame (Dataframe): a dataframe of daily bars indexed by Date, with Open, High, Low, Close and Volume columns
+        """
+        self.length = len(frame)
+        positions = np.arange(self.length, dtype=float)
+        daily = frame[['Open', 'High', 'Low', 'Close', 'Volume']].assign(First=positions, Last=positions)
+
+        # list of dicts of numpy arrays, one per level: x (center position), width and last (position of the close)
+        # in trading days, open, high, low, close and volume
+        self.levels = []
+        for name, rule in LEVELS:
+            # every level is aggregated from the daily bars, a week may overlap two months
+            bars = daily.resample(rule).agg(AGGREGATION).dropna(subset=['Close']) if rule else daily
+            self.levels.append({
+                'name': name,
+                'x': ((bars['First'] + bars['Last']) / 2).to_numpy(dtype=float),
+                'width': (bars['Last'] - bars['First'] + 1).to_numpy(dtype=float),
+                'last': bars['Last'].to_numpy(dtype=int),
+                'open': bars['Open'].to_numpy(dtype=float),
+                'high': bars['High'].to_numpy(dtype=float),
+                'low': bars['Low'].to_numpy(dtype=float),
+                'close': bars['Close'].to_numpy(dtype=float),
+                'volume': bars['Volume'].to_numpy(dtype=float),
+            })
+
+    def pick(self, span, maxBars):
+        """
+        Instance method pick() returns the index of the finest level that draws a span of days in at most maxBars bars,
+            or the coarsest level if none does.
+
+        Args:
+            span (float): number of trading days in the visible range
+            maxBars (float): the most bars the canvas has room for
+
+        Returns:
+            int: an index of levels
+        """
+        for i, level in enumerate(self.levels):
+            daysPerBar = self.length / len(level['x']) if len(level['x']) else 1
+            if span / daysPerBar <= maxBars:
+                return i
+        return len(self.levels) - 1
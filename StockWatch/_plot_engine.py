@@ -0,0 +1,395 @@
+import numpy as np
+
+from ._lazy_module import LazyModule
+from ._ohlc_pyramid import OHLCPyramid
+
+mfigure = LazyModule('matplotlib.figure')
+mcollections = LazyModule('matplotlib.collections')
+mstyle = LazyModule('matplotlib.style')
+mticker = LazyModule('matplotlib.ticker')
+
+# axes rects of the figure [left, bottom, width, height], the volume axes takes VOLUME_SHARE of the height
+PLOT_RECT = (0.1, 0.2, 0.87, 0.68)
+VOLUME_SHARE = 0.25
+AXES_GAP = 0.02
+# width of a candle body / volume bar in trading days
+BAR_WIDTH = 0.7
+# the narrowest a bar may get on the canvas before a coarser pyramid level is drawn
+MIN_BAR_PIXELS = 2
+MAV_COLOR = '#ff8c00'
+
+
+class PlotEngine():
+    """
+    Class PlotEngine represents a price/volume chart of a symbol, drawn on a matplotlib figure
+        with persistent artists (price, moving average and volume), that are updated in place
+        on new data, a new period, a new moving average, or volume toggle. Only the price artists
+        are rebuilt, and only when the chart type changes.
+    The whole history is kept in the artists on a trading day axis (no gaps on weekends and holidays,
+        as mplfinance draws it), so changing the period only changes the axes limits. The bars are drawn from
+        the level of an OHLCPyramid that fits the visible range into the canvas width, and the level is swapped
+        whenever the range changes, by a period change or by the toolbar pan/zoom. Only the bars of the level
+        around the visible range are given to the artists, so zooming into a long history stays cheap.
+    The moving average line is animated, it is drawn over a saved background of the price axes,
+        so a moving average change redraws only that line.
+    """
+
+    TYPES = ('line', 'candle', 'ohlc')
+
+    def __init__(self, title, style, figsize=(6, 3), chartType='line', mav=2, volume=True):
+        """
+        PlotEngine object constructor.
+
+        Args:
+            title (String): the figure title
+            style (dict): an mplfinance style, as returned by mplfinance.make_mpf_style()
+            figsize (tuple, optional): figure size in inches. Defaults to (6, 3).
+            chartType (String, optional): one of TYPES. Defaults to 'line'.
+            mav (int, optional): moving average window in trading days, or False for none. Defaults to 2.
+            volume (bool, optional): show the volume axes. Defaults to True.
+        """
+        self.style = style
+        self.colors = style['marketcolors']
+        self.chartType = chartType
+        self.mav = mav
+        self.volume = volume
+
+        # daily history arrays, the pyramid level drawn, and the plotted window as dates and as [start, end) positions
+        self.dates = np.array([], dtype='datetime64[ns]')
+        self.high = self.low = self.close = self._averages = np.array([], dtype=float)
+        self.pyramid = None
+        # the pyramid level shown and the range of positions its bars were sliced to
+        self.level = 0
+        self._shown = None
+        self.bars = {key: np.array([], dtype=float) for key in ('x', 'width', 'open', 'high', 'low', 'close', 'volume')}
+        self.bars['last'] = np.array([], dtype=int)
+        self.window = (None, None)
+        self._span = (0, 0)
+
+        with mstyle.context([style['base_mpl_style'], style['rc']]):
+            self.figure = mfigure.Figure(figsize=figsize)
+            self.priceAx = self.figure.add_axes(PLOT_RECT)
+            self.volumeAx = self.figure.add_axes(PLOT_RECT, sharex=self.priceAx)
+            self.figure.suptitle(title)
+            for ax in (self.priceAx, self.volumeAx):
+                ax.grid(True, linestyle=style['gridstyle'], color=style['gridcolor'])
+                ax.tick_params(axis='x', labelrotation=15)
+            self.priceAx.set_ylabel('Price')
+            self.volumeAx.set_ylabel('Volume')
+
+            # the axes share x, so they share the locator and formatter too
+            self.volumeAx.xaxis.set_major_locator(mticker.MaxNLocator(nbins=6, integer=True))
+            self.volumeAx.xaxis.set_major_formatter(mticker.FuncFormatter(self._format_date))
+            self.volumeAx.yaxis.set_major_formatter(mticker.EngFormatter())
+
+            self.priceArtists = []
+            self.mavLine, = self.priceAx.plot([], [], color=MAV_COLOR, linewidth=1, animated=True)
+            self.volumeBars = mcollections.PolyCollection([], alpha=self.colors['alpha'])
+            self.volumeAx.add_collection(self.volumeBars)
+            self._build_price()
+        self._layout()
+        self.priceAx.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+        # background of the price axes without the moving average, saved on every full draw
+        self._background = None
+        self.figure.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        """
+        Private instance method _on_draw() is called after every full draw, it saves the price axes background,
+            and draws the animated moving average line over it.
+        """
+        self._background = event.canvas.copy_from_bbox(self.priceAx.bbox)
+        if self.mavLine.get_visible():
+            self.priceAx.draw_artist(self.mavLine)
+
+    def _format_date(self, value, position=None):
+        """
+        Private instance method _format_date() formats a trading day position as its date.
+        """
+        i = int(round(value))
+        if not 0 <= i < len(self.dates):
+            return ''
+        low, high = self.priceAx.get_xlim()
+        # days are enough within a year, months after that
+        fmt = '%b %d' if high - low <= 260 else '%Y-%m'
+        return self.dates[i].astype('datetime64[s]').item().strftime(fmt)
+
+    def _layout(self):
+        """
+        Private instance method _layout() places the axes according to the volume switch.
+        """
+        left, bottom, width, height = PLOT_RECT
+        if self.volume:
+            volumeHeight = height * VOLUME_SHARE
+            self.volumeAx.set_position([left, bottom, width, volumeHeight])
+            self.priceAx.set_position([left, bottom + volumeHeight + AXES_GAP,
+                                       width, height - volumeHeight - AXES_GAP])
+        else:
+            self.priceAx.set_position(list(PLOT_RECT))
+        self.volumeAx.set_visible(self.volume)
+        self.priceAx.tick_params(axis='x', labelbottom=not self.volume)
+
+    def _up(self):
+        """
+        Private instance method _up() returns a boolean array, True on bars that closed at or above their open.
+        """
+        return self.bars['close'] >= self.bars['open']
+
+    def _build_price(self):
+        """
+        Private instance method _build_price() removes the price artists and creates them for the chart type.
+        """
+        for artist in self.priceArtists:
+            artist.remove()
+        if self.chartType == 'line':
+            line, = self.priceAx.plot([], [], color=self.colors['ohlc']['up'], linewidth=1)
+            self.priceArtists = [line]
+        elif self.chartType == 'candle':
+            wicks = mcollections.LineCollection([], linewidths=0.8)
+            bodies = mcollections.PolyCollection([], linewidths=0.5, alpha=self.colors['alpha'])
+            self.priceArtists = [wicks, bodies]
+        else:
+            self.priceArtists = [mcollections.LineCollection([], linewidths=1)]
+        for artist in self.priceArtists:
+            if not artist.axes:
+                self.priceAx.add_collection(artist)
+        self._update_price()
+
+    def _colors(self, key):
+        """
+        Private instance method _colors() returns a color per bar, up or down colors of the given marketcolors key.
+        """
+        return np.where(self._up(), self.colors[key]['up'], self.colors[key]['down'])
+
+    def _update_price(self):
+        """
+        Private instance method _update_price() sets the bars of the current level to the price artists.
+        """
+        bars = self.bars
+        x, half = bars['x'], bars['width'] * BAR_WIDTH / 2
+        opens, highs, lows, closes = bars['open'], bars['high'], bars['low'], bars['close']
+        if self.chartType == 'line':
+            # each close is placed on its own day
+            self.priceArtists[0].set_data(bars['last'], closes)
+        elif self.chartType == 'candle':
+            wicks, bodies = self.priceArtists
+            wicks.set_segments(np.stack([np.column_stack([x, lows]),
+                                         np.column_stack([x, highs])], axis=1))
+            wicks.set_color(self._colors('wick'))
+            bodies.set_verts(np.stack([np.column_stack([x - half, opens]),
+                                       np.column_stack([x - half, closes]),
+                                       np.column_stack([x + half, closes]),
+                                       np.column_stack([x + half, opens])], axis=1))
+            bodies.set_facecolor(self._colors('candle'))
+            bodies.set_edgecolor(self._colors('edge'))
+        else:
+            # a high-low bar with the open tick on the left and the close tick on the right
+            segments = np.concatenate([
+                np.stack([np.column_stack([x, lows]), np.column_stack([x, highs])], axis=1),
+                np.stack([np.column_stack([x - half, opens]), np.column_stack([x, opens])], axis=1),
+                np.stack([np.column_stack([x, closes]), np.column_stack([x + half, closes])], axis=1)])
+            self.priceArtists[0].set_segments(segments)
+            self.priceArtists[0].set_color(np.tile(self._colors('ohlc'), 3))
+
+    def _update_mav(self):
+        """
+        Private instance method _update_mav() sets the moving average line, or hides it if mav is False.
+        """
+        self.mavLine.set_visible(bool(self.mav))
+        if not self.mav:
+            return
+        mav = int(self.mav)
+        self._averages = np.full(len(self.close), np.nan)
+        if mav <= len(self.close):
+            sums = np.cumsum(np.insert(self.close, 0, 0.0))
+            self._averages[mav - 1:] = (sums[mav:] - sums[:-mav]) / mav
+        self._place_mav()
+
+    def _place_mav(self):
+        """
+        Private instance method _place_mav() sets the daily moving average on the closes of the current level.
+        """
+        if self.mav:
+            last = self.bars['last']
+            self.mavLine.set_data(last, self._averages[last])
+
+    def _update_volume(self):
+        """
+        Private instance method _update_volume() sets the volume bars of the current level.
+        """
+        x, half, volume = self.bars['x'], self.bars['width'] * BAR_WIDTH / 2, self.bars['volume']
+        zeros = np.zeros(len(x))
+        self.volumeBars.set_verts(np.stack([np.column_stack([x - half, zeros]),
+                                            np.column_stack([x - half, volume]),
+                                            np.column_stack([x + half, volume]),
+                                            np.column_stack([x + half, zeros])], axis=1))
+        self.volumeBars.set_facecolor(self._colors('volume'))
+
+    def _pick_level(self, span):
+        """
+        Private instance method _pick_level() returns the pyramid level for a visible span of trading days,
+            the finest level whose bars are at least MIN_BAR_PIXELS wide on the canvas.
+        """
+        return self.pyramid.pick(span, self.priceAx.bbox.width / MIN_BAR_PIXELS)
+
+    def _show(self, low, high):
+        """
+        Private instance method _show() sets the artists to the bars of the pyramid level that matches a visible range
+            of positions, sliced to the range and a range-wide margin on each side, so the artists never hold
+            many more bars than the canvas has room for, and short pans need no update.
+
+        Args:
+            low (float): first visible position
+            high (float): last visible position
+
+        Returns:
+            Boolean: True if the bars changed
+        """
+        level = self._pick_level(high - low)
+        if self._shown and self._shown[0] == level and self._shown[1] <= low and high <= self._shown[2]:
+            return False
+        span = high - low
+        self._shown = (level, low - span, high + span)
+        self.level = level
+        bars = self.pyramid.levels[level]
+        first, last = np.searchsorted(bars['x'], [low - span, high + span])
+        self.bars = {key: value[first:last + 1] if key != 'name' else value for key, value in bars.items()}
+        self._update_price()
+        self._place_mav()
+        self._update_volume()
+        return True
+
+    def _on_xlim_changed(self, ax):
+        """
+        Private instance method _on_xlim_changed() is called whenever the visible range changes,
+            including toolbar pan/zoom, it swaps to the level that matches the new range.
+        """
+        if self.pyramid is None:
+            return
+        low, high = ax.get_xlim()
+        if self._show(low, high):
+            self._fit_volume(low, high)
+
+    def _fit_volume(self, low, high):
+        """
+        Private instance method _fit_volume() fits the volume axes to the bars between two positions.
+        """
+        visible = self.bars['volume'][(self.bars['x'] >= low) & (self.bars['x'] <= high)]
+        top = np.nanmax(visible) if len(visible) else 0
+        self.volumeAx.set_ylim(0, (top or 1) * 1.1)
+
+    def _update_limits(self):
+        """
+        Private instance method _update_limits() fits the axes limits to the plotted window.
+        """
+        start, end = self._span
+        if end <= start:
+            return
+        self.priceAx.set_xlim(start - 0.5, end - 0.5)
+        if self.chartType == 'line':
+            low, high = np.nanmin(self.close[start:end]), np.nanmax(self.close[start:end])
+        else:
+            low, high = np.nanmin(self.low[start:end]), np.nanmax(self.high[start:end])
+        margin = (high - low) * 0.05 or abs(high) * 0.01 or 1
+        self.priceAx.set_ylim(low - margin, high + margin)
+        self._fit_volume(start - 0.5, end - 0.5)
+
+    def set_data(self, frame, pyramid=None):
+        """
+        Instance method set_data() replaces the history data of all artists in place,
+            and keeps the plotted window.
+
+        Args:
+            frame (Dataframe): a dataframe of bars indexed by Date, with High, Low, Open, Close and Volume columns
+            pyramid (OHLCPyramid, optional): the pyramid of frame, if it's cached. Defaults to None (built here).
+        """
+        if pyramid is not None and pyramid is self.pyramid:
+            # the cached pyramid is only replaced when the table changes
+            return
+        self.pyramid = pyramid if pyramid is not None else OHLCPyramid(frame)
+        self.dates = frame.index.values.astype('datetime64[ns]', copy=False)
+        self.high, self.low, self.close = (frame[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+        self._update_mav()
+        start, end = self._span if self._span[1] > self._span[0] else (0, len(frame))
+        self._shown = None
+        self._show(start - 0.5, end - 0.5)
+        if self.window[0] is not None:
+            self._span = (0, 0)
+            self.set_window(*self.window)
+
+    def set_window(self, start, end):
+        """
+        Instance method set_window() sets the plotted period, only the axes limits are changed.
+
+        Args:
+            start (datetime): first date of the period
+            end (datetime): last date of the period (included)
+
+        Returns:
+            Boolean: False if there is no data in the period, and the limits were kept
+        """
+        first = np.searchsorted(self.dates, np.datetime64(start, 'ns'), side='left')
+        last = np.searchsorted(self.dates, np.datetime64(end, 'ns'), side='right')
+        if last <= first:
+            return False
+        self.window = (start, end)
+        if (first, last) == self._span:
+            return True
+        self._span = (int(first), int(last))
+        self._update_limits()
+        return True
+
+    def set_type(self, chartType):
+        """
+        Instance method set_type() changes the chart type, rebuilding the price artists.
+
+        Args:
+            chartType (String): one of TYPES
+        """
+        if chartType == self.chartType:
+            return
+        self.chartType = chartType
+        self._build_price()
+        self._update_limits()
+
+    def set_mav(self, mav):
+        """
+        Instance method set_mav() changes the moving average window.
+
+        Args:
+            mav (int): moving average window in trading days, or False to hide it
+        """
+        self.mav = mav
+        self._update_mav()
+
+    def set_volume(self, volume):
+        """
+        Instance method set_volume() shows/hides the volume axes.
+
+        Args:
+            volume (bool): show the volume axes
+        """
+        self.volume = volume
+        self._layout()
+
+    def draw(self):
+        """
+        Instance method draw() requests a redraw of the figure canvas once the gui is idle,
+            so several updates in a row are drawn once.
+        """
+        self.figure.canvas.draw_idle()
+
+    def draw_mav(self):
+        """
+        Instance method draw_mav() redraws only the moving average line over the saved background,
+            or the whole figure if it was never drawn, or has other pending changes.
+        """
+        canvas = self.figure.canvas
+        if self._background is None or self.figure.stale:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        if self.mavLine.get_visible():
+            self.priceAx.draw_artist(self.mavLine)
+        canvas.blit(self.priceAx.bbox)
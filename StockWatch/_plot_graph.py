@@ -2,15 +2,27 @@
 from tkinter import (CENTER, LEFT, RIGHT, TOP, BooleanVar, Button, Checkbutton,
                      Entry, Frame, IntVar, Label, StringVar, ttk)
 
-import matplotlib
-import mplfinance as mpf
-import pandas as pd
 from dateutil.relativedelta import relativedelta
-from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg,
-                                               NavigationToolbar2Tk)
+
 from ._helper_toolbox import ToolTip
+from ._lazy_module import LazyModule
+from ._metrics import METRICS
+from ._plot_engine import PlotEngine
+from ._trace import TRACE
+
 
-matplotlib.use('agg')
+def _use_agg(module):
+    """
+    Function _use_agg() sets matplotlib's default backend once matplotlib is imported.
+    """
+    module.use('agg')
+
+
+# heavy modules, imported when the first PlotGraph is created
+matplotlib = LazyModule('matplotlib', onLoad=_use_agg)
+mpf = LazyModule('mplfinance')
+pd = LazyModule('pandas')
+backend_tkagg = LazyModule('matplotlib.backends.backend_tkagg')
 
 
 class PlotGraph():
@@ -28,9 +40,11 @@ class PlotGraph():
             control (DisplayWindow object): a tkinter DisplayWindow object that has a frame "graphFrame" declared and packed
         """
         # debug print
-        print(f'>> [{control.sym}]: Plotting data')
+        TRACE.info('>> [%s]: Plotting data', control.sym)
 
         self.control = control
+        # import matplotlib and set its backend before anything is plotted
+        matplotlib.get_backend()
 
         # plot style
         self.myStyle = mpf.make_mpf_style(base_mpf_style='starsandstripes', rc={'font.size': 8}, y_on_right=False,
@@ -63,62 +77,24 @@ class PlotGraph():
             'vol': True
         }
 
-        self.pkwargs = dict(returnfig=True, figsize=(6, 3), type=self.plotConf['type'], mav=self.plotConf['mav'],
-                            title=self.control.sym.upper(), xrotation=15, tight_layout=True, style=self.myStyle)
-
-        plotData = self.control.dbRead.loc[self.plotConf['startDate']
-            :self.plotConf['endDate']]
-        self.plotFig, axlist = mpf.plot(data=plotData, volume=True, returnfig=True, figsize=(6, 3), type=self.plotConf['type'], mav=self.plotConf['mav'],
-                                        title=self.control.sym.upper(), xrotation=15, tight_layout=True, style=self.myStyle)
-        self.ax1 = axlist[0]
-        self.ax2 = axlist[2]
+        # the chart engine keeps its artists, and updates them in place on every plot control change
+        self.engine = PlotEngine(self.control.sym.upper(), self.myStyle, figsize=(6, 3), chartType=self.plotConf['type'],
+                                 mav=self.plotConf['mav'], volume=self.plotConf['vol'])
+        self.engine.set_data(self.control.dbRead, self.control.dbPyramid)
+        self.engine.set_window(self.plotConf['startDate'], self.plotConf['endDate'])
+        self.plotFig = self.engine.figure
 
-    def _replot(self, *args):
+    def _replot(self):
         """
-        Private instance method _replot() replots data graph to the provided Dataframe
-
-        Args:
-            plotData (Dataframe, optional): timeseries dataframe to plot. Defaults to None.
+        Private instance method _replot() updates the graph with the latest data in the period of plotConf,
+            and redraws it, the time it takes is recorded in METRICS.
         """
-        plotData = self.control.dbRead.loc[self.plotConf['startDate']
-            :self.plotConf['endDate']]
-
-        if 'vol' in args:
-            self.canvas.get_tk_widget().destroy()
-            # for item in self.canvas.get_tk_widget().find_all():
-            #     self.canvas.get_tk_widget().delete(item)
-
-            plotFig, axlist = mpf.plot(plotData, volume=self.plotConf['vol'], returnfig=True, figsize=(6, 3), type=self.plotConf['type'], mav=self.plotConf['mav'],
-                                       title=self.control.sym.upper(), xrotation=15, tight_layout=True, style=self.myStyle)
-
-            self.ax1 = axlist[0]
-            self.ax2 = axlist[2] if self.plotConf['vol'] else None
-
-            self.canvas = FigureCanvasTkAgg(
-                plotFig, master=self.control.graphFrame)
-            self.canvas.draw()
-
-            toolbar = NavigationToolbar2Tk(
-                self.canvas, self.canvas.get_tk_widget().master, pack_toolbar=False)
-            toolbar.update()
-            self.canvas.get_tk_widget().pack(side=TOP, anchor='sw')
-            return
-
-        # clear axs
-        self.ax1.clear()
-        self.ax2.clear() if self.plotConf['vol'] else None
-
-        # replot with new data
-        # the following code is split into two branches because if mav is provided, it must be a valid value
-        # and cannot take None or False as values to ignore drawing a mav line
-        if not self.plotConf['mav']:
-            mpf.plot(plotData, ax=self.ax1, volume=self.ax2 if self.plotConf['vol'] else False, returnfig=True, type=self.plotConf['type'],
-                     xrotation=15, tight_layout=True, style=self.myStyle)
-        else:
-            mpf.plot(plotData, ax=self.ax1, volume=self.ax2 if self.plotConf['vol'] else False, returnfig=True, type=self.plotConf['type'], mav=self.plotConf['mav'],
-                     xrotation=15, tight_layout=True, style=self.myStyle)
-
-        self.canvas.draw()
+        with METRICS.timed('plot.replot', self.control.sym):
+            self.engine.set_data(self.control.dbRead, self.control.dbPyramid)
+            if not self.engine.set_window(self.plotConf['startDate'], self.plotConf['endDate']):
+                self.control.update_status(status='no data in period')
+                return
+            self.engine.draw()
 
     def _custom_replot(self):
         """
@@ -129,7 +105,7 @@ class PlotGraph():
             self.plotConf['endDate'] = pd.to_datetime(self.customEnd.get())
         except Exception as e:
             self.control.update_status(status='error with custom date')
-            print(repr(e))
+            TRACE.error('>> [%s]: custom period failed %r', self.control.sym, e)
             return
 
         self._replot()
@@ -154,8 +130,12 @@ class PlotGraph():
                 self.plotConf['startDate'] = self.periodsList[event.widget.current()]
 
         # if the event originated from a type box selection
+        # only a type change rebuilds the price artists
         elif event.widget._name == 'typeBox':
             self.plotConf['type'] = event.widget.get()
+            self.engine.set_type(self.plotConf['type'])
+            self.engine.draw()
+            return
 
         self._replot()
 
@@ -206,21 +186,16 @@ class PlotGraph():
             self.plotConf['mav'] = False
             self.mavInput.config(state='disabled')
 
-        self._replot()
+        self.engine.set_mav(self.plotConf['mav'])
+        self.engine.draw_mav()
 
     def _update_vol(self):
         """
         Private instance method _update_vol() handles events from volume widget, it shows/hides volume section of the plot
-
-        Args:
-            event (event, optional): a volume widget event. Defaults to None.
         """
-        # enable/disable update mav values in plotConf according to mav checkbox
-
         self.plotConf['vol'] = self.volCheck.get()
-        # self.ax2.set_visible(self.volCheck.get())
-
-        self._replot('vol')
+        self.engine.set_volume(self.plotConf['vol'])
+        self.engine.draw()
 
     def plot_graph(self):
         """
@@ -305,11 +280,11 @@ class PlotGraph():
         customPlotBtn.pack(side=LEFT)
 
         # draw initial data plot
-        self.canvas = FigureCanvasTkAgg(
+        self.canvas = backend_tkagg.FigureCanvasTkAgg(
             self.plotFig, master=self.control.graphFrame)
         self.canvas.draw()
 
-        toolbar = NavigationToolbar2Tk(
+        toolbar = backend_tkagg.NavigationToolbar2Tk(
             self.canvas, self.canvas.get_tk_widget().master, pack_toolbar=False)
         toolbar.update()
 
@@ -0,0 +1,386 @@
+import gzip
+import pickle
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from threading import Lock
+from time import monotonic, sleep, time
+
+from ._lazy_module import LazyModule
+from ._resilience import is_upstream_failure
+from ._trace import TRACE
+
+
+def _override_fetch(module):
+    """
+    Function _override_fetch() overrides datareader API fetch with yfinance, once datareader is imported.
+    """
+    import yfinance
+    yfinance.pdr_override()
+
+
+# heavy modules, imported on first use
+pd = LazyModule('pandas')
+fetch = LazyModule('pandas_datareader.data', onLoad=_override_fetch)
+
+
+class RecordedError(Exception):
+    """
+    Error raised by a replay in place of a recorded error that was not a failure of the provider (e.g. a symbol
+        without data), a recorded failure of the provider is raised as a ConnectionError, so both count
+        (or don't) towards opening the upstream circuit as they did when they were recorded.
+    """
+
+
+class DataProvider(ABC):
+    """
+    Class DataProvider is the interface of the source of all market data, the database controls and
+        the quote hub only get data through a provider, so the live source can be recorded, or replaced
+        by a replay of a recording (e.g. to load test the engine offline).
+    A provider implements all three methods, one that doesn't fails when it's created.
+    """
+
+    @abstractmethod
+    def history(self, sym, start=None):
+        """
+        Instance method history() returns the daily bars of a symbol.
+
+        Args:
+            sym (String): a company symbol/ticker
+            start (datetime, optional): the date to fetch bars from. Defaults to None (all bars).
+
+        Returns:
+            Dataframe: a pandas dataframe of High, Low, Open, Close, Volume, Adj Close indexed by Date
+        """
+
+    @abstractmethod
+    def quotes(self, symbols):
+        """
+        Instance method quotes() returns the current quotes of symbols.
+
+        Args:
+            symbols (list): a list of company symbols/tickers
+
+        Returns:
+            Dataframe: a pandas dataframe of the quotes indexed by symbol
+        """
+
+    @abstractmethod
+    def listed(self):
+        """
+        Instance method listed() returns the listed symbols.
+
+        Returns:
+            Dataframe: a pandas dataframe with a 'Security Name' column indexed by symbol
+        """
+
+
+class YahooProvider(DataProvider):
+    """
+    Class YahooProvider is the live provider, yahoo servers (through pandas_datareader and yfinance)
+        for bars and quotes, and nasdaq for the listed symbols.
+    """
+
+    def history(self, sym, start=None):
+        return fetch.get_data_yahoo(sym, start)
+
+    def quotes(self, symbols):
+        return fetch.get_quote_yahoo(symbols)
+
+    def listed(self):
+        return fetch.get_nasdaq_symbols()
+
+
+class RecordingProvider(DataProvider):
+    """
+    Class RecordingProvider passes every call through to another provider, and appends its response
+        (or error) to a recording file, with the time of the call since recording started and its latency.
+    An error is recorded as its repr and type, and whether it was a failure of the provider (is_upstream_failure()).
+    The file is a gzip stream of pickled records, one gzip member per record, so a recording cut short
+        (e.g. by a crash) is still readable up to its last record. Every recording starts with a session record,
+        a file recorded to again holds one session after another, and they are replayed in sequence.
+    """
+
+    def __init__(self, provider, path):
+        """
+        RecordingProvider object constructor.
+
+        Args:
+            provider (DataProvider object): the provider to record
+            path (String): path of the recording file, appended to (as a new session) if it exists
+        """
+        TRACE.info('>>>> [MAIN]: RECORDING PROVIDER TO %s', path)
+        self.provider = provider
+        self.path = path
+        self.records = 0
+        self._start = monotonic()
+        self._lock = Lock()
+        # the times of the records are relative to the start of their session
+        self._write({'kind': 'session', 'started': time()})
+
+    def _write(self, record):
+        """
+        Private instance method _write() appends a record to the recording file.
+        """
+        data = gzip.compress(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            with open(self.path, 'ab') as recording:
+                recording.write(data)
+
+    def _record(self, kind, key, function, *args):
+        """
+        Private instance method _record() makes a call to the provider and records it.
+
+        Args:
+            kind (String): 'history', 'quotes' or 'listed'
+            key: the symbol of a history call, the symbols of a quotes call, None for listed
+            function (callable): the provider method
+        """
+        at = monotonic() - self._start
+        record = {'kind': kind, 'key': key, 'at': at}
+        try:
+            record['frame'] = function(*args)
+            return record['frame']
+        except Exception as e:
+            record['error'] = repr(e)
+            record['errorType'] = type(e).__name__
+            record['upstream'] = is_upstream_failure(e)
+            raise
+        finally:
+            record['latency'] = monotonic() - self._start - at
+            self._write(record)
+            self.records += 1
+
+    def history(self, sym, start=None):
+        return self._record('history', sym, self.provider.history, sym, start)
+
+    def quotes(self, symbols):
+        return self._record('quotes', list(symbols), self.provider.quotes, symbols)
+
+    def listed(self):
+        return self._record('listed', None, self.provider.listed)
+
+
+class ReplayProvider(DataProvider):
+    """
+    Class ReplayProvider serves a recording made by RecordingProvider, no network is needed.
+    The replay clock starts on the first call and runs speed times as fast as the recording clock,
+        every call is answered with the last response recorded (for its symbol) at that point of the
+        recording, or the first one if none was recorded yet, and recorded errors are raised again
+        (a ConnectionError for a failure of the provider, a RecordedError for any other error).
+    The bars of a symbol are merged over the recording, so a history call gets all the bars known
+        at that point, from its start date.
+
+    Attributes:
+        speed (float): the replay clock speed, 2 replays a recording in half its time
+        latency (float): seconds every call takes, None to wait the recorded latency (divided by speed)
+        loop (Boolean): True to start the recording over once it ends, False to keep serving its end
+    """
+
+    def __init__(self, path, speed=1.0, latency=None, loop=False):
+        """
+        ReplayProvider object constructor.
+
+        Args:
+            path (String): path of the recording file
+            speed (float, optional): the replay clock speed. Defaults to 1.0.
+            latency (float, optional): seconds every call takes. Defaults to None (the recorded latency).
+            loop (Boolean, optional): True to loop the recording. Defaults to False.
+        """
+        TRACE.info('>>>> [MAIN]: REPLAYING PROVIDER FROM %s', path)
+        self.speed = speed
+        self.latency = latency
+        self.loop = loop
+        self.calls = 0
+        self._start = None
+        # (kind, symbol) -> ([recorded time..], [(latency, frame or error)..]), sorted by time
+        self._timelines = {}
+        # symbol -> (the position in its history timeline, the bars merged up to it)
+        self._bars = {}
+        self._lock = Lock()
+        self.duration = self._load(path)
+
+    def _add(self, kind, sym, at, latency, value):
+        times, entries = self._timelines.setdefault((kind, sym), ([], []))
+        times.append(at)
+        entries.append((latency, value))
+
+    def _load(self, path):
+        """
+        Private instance method _load() reads the records of a recording into timelines, quotes are split
+            by symbol, and bars are merged with the earlier bars of their symbol. The records of a session
+            are moved after the end of the sessions recorded before it.
+
+        Returns:
+            float: the recorded time of the last record
+        """
+        records = []
+        # the recorded time a session starts at, and the end of the calls recorded so far
+        offset = end = 0.0
+        with gzip.open(path, 'rb') as recording:
+            while True:
+                try:
+                    record = pickle.load(recording)
+                except EOFError:
+                    break
+                if record['kind'] == 'session':
+                    offset = end
+                    continue
+                record['at'] += offset
+                end = max(end, record['at'] + record['latency'])
+                records.append(record)
+        records.sort(key=lambda record: record['at'])
+
+        for record in records:
+            kind, key, at, latency = record['kind'], record['key'], record['at'], record['latency']
+            error = self._error(record) if 'error' in record else None
+            if kind == 'history':
+                self._add(kind, key, at, latency, error if error else record['frame'])
+            elif kind == 'quotes':
+                # a quote is kept as (the frame of its tick, its row), a replayed tick takes its rows at once
+                frame = None if error else record['frame']
+                rows = {} if error else {sym: row for row, sym in enumerate(frame.index)}
+                for sym in key:
+                    if error:
+                        self._add(kind, sym, at, latency, error)
+                    elif sym in rows:
+                        self._add(kind, sym, at, latency, (frame, rows[sym]))
+            else:
+                self._add(kind, None, at, latency, error if error else record['frame'])
+        TRACE.info('>>>> [MAIN]: loaded %d records, %d symbols', len(records),
+                   sum(kind == 'history' for kind, _ in self._timelines))
+        return records[-1]['at'] if records else 0.0
+
+    @staticmethod
+    def _error(record):
+        """
+        Private static method _error() returns the error to raise in place of a recorded one, classified
+            as the recorded error was (recordings without the classification replay every error as a failure).
+        """
+        if record.get('upstream', True):
+            return ConnectionError(f'recorded error: {record["error"]}')
+        return RecordedError(f'recorded {record.get("errorType", "error")}: {record["error"]}')
+
+    @staticmethod
+    def _merge(frames):
+        """
+        Private static method _merge() merges bars fetched one after another, the bars of a fetch
+            replace the bars of earlier fetches from its first date on.
+        """
+        pieces, cutoff = [], None
+        for frame in reversed(frames):
+            if frame is None or frame.empty:
+                continue
+            pieces.append(frame if cutoff is None else frame.iloc[:frame.index.searchsorted(cutoff)])
+            cutoff = frame.index[0] if cutoff is None else min(cutoff, frame.index[0])
+        if not pieces:
+            return frames[-1]
+        return pieces[0] if len(pieces) == 1 else pd.concat(pieces[::-1])
+
+    def _now(self):
+        """
+        Private instance method _now() returns the point of the recording the replay is at.
+        """
+        if self._start is None:
+            self._start = monotonic()
+        at = (monotonic() - self._start) * self.speed
+        if self.loop and self.duration:
+            at %= self.duration
+        return at
+
+    def _position(self, kind, sym, at):
+        """
+        Private instance method _position() returns the position in the timeline of a symbol at a point of the recording.
+
+        Raises:
+            LookupError: if nothing was recorded for the symbol.
+        """
+        if (kind, sym) not in self._timelines:
+            raise LookupError(f'no recorded {kind} of {sym}')
+        return max(bisect_right(self._timelines[(kind, sym)][0], at) - 1, 0)
+
+    def _entry(self, kind, sym, at):
+        """
+        Private instance method _entry() returns the (latency, frame or error) of a symbol at a point of the recording.
+        """
+        return self._timelines[(kind, sym)][1][self._position(kind, sym, at)]
+
+    def _merged(self, sym, position):
+        """
+        Private instance method _merged() returns the bars of a symbol merged up to a position of its timeline,
+            merging on from the last merged position (the replay clock only moves forward, unless it loops).
+        """
+        entries = self._timelines[('history', sym)][1]
+        with self._lock:
+            merged, bars = self._bars.get(sym, (-1, None))
+            if merged > position:
+                merged, bars = -1, None
+            if merged < position:
+                bars = self._merge([bars] + [value for _, value in entries[merged + 1:position + 1]
+                                             if not isinstance(value, Exception)])
+                self._bars[sym] = (position, bars)
+        return bars
+
+    def _wait(self, latency):
+        delay = self.latency if self.latency is not None else latency / self.speed
+        if delay:
+            sleep(delay)
+
+    def history(self, sym, start=None):
+        self.calls += 1
+        position = self._position('history', sym, self._now())
+        latency, value = self._timelines[('history', sym)][1][position]
+        self._wait(latency)
+        if isinstance(value, Exception):
+            raise value
+        bars = self._merged(sym, position)
+        # a copy, the caller may modify it (as TableControl does)
+        return (bars if start is None else bars.loc[pd.Timestamp(start):]).copy()
+
+    def quotes(self, symbols):
+        self.calls += 1
+        at = self._now()
+        entries = []
+        for sym in symbols:
+            try:
+                entries.append(self._entry('quotes', sym, at))
+            except LookupError:
+                # the quote hub reports the missing symbol to its subscribers
+                continue
+        self._wait(max((latency for latency, _ in entries), default=0))
+        # rows of the same recorded tick are taken together
+        ticks = {}
+        for _, value in entries:
+            if isinstance(value, Exception):
+                raise value
+            frame, row = value
+            ticks.setdefault(id(frame), (frame, []))[1].append(row)
+        frames = [frame.iloc[rows] for frame, rows in ticks.values()]
+        return pd.concat(frames) if len(frames) > 1 else frames[0] if frames else pd.DataFrame()
+
+    def listed(self):
+        self.calls += 1
+        latency, value = self._entry('listed', None, self._now())
+        self._wait(latency)
+        if isinstance(value, Exception):
+            raise value
+        return value.copy()
+
+
+def provider_from_args(record=None, replay=None, speed=1.0, latency=None):
+    """
+    Function provider_from_args() returns the provider selected on the command line.
+
+    Args:
+        record (String, optional): path to record the live provider to. Defaults to None.
+        replay (String, optional): path of a recording to replay instead. Defaults to None.
+        speed (float, optional): the replay clock speed. Defaults to 1.0.
+        latency (float, optional): seconds every replayed call takes. Defaults to None (the recorded latency).
+
+    Returns:
+        DataProvider: a ReplayProvider, a RecordingProvider of a YahooProvider, or a YahooProvider
+    """
+    if replay:
+        return ReplayProvider(replay, speed=speed, latency=latency, loop=True)
+    if record:
+        return RecordingProvider(YahooProvider(), record)
+    return YahooProvider()
@@ -0,0 +1,198 @@
+from threading import Event, Lock, Thread
+from time import sleep, time
+
+from ._metrics import METRICS
+from ._providers import YahooProvider
+from ._resilience import UPSTREAM, CircuitOpenError
+from ._trace import TRACE
+
+
+class QuoteHub():
+    """
+    Class QuoteHub represents a shared quote fetcher, it collects symbols of all open display windows
+        and fetches their quotes in one multi-symbol request per tick, then fans the results out
+        to the subscribers of each symbol.
+    The class is intended to be initialized and started only once by the Main window object, and passed down
+        to DisplayWindow objects, so the amount of upstream requests stays the same no matter how many
+        windows are open.
+    """
+
+    def __init__(self, timeKeep=None, fetcher=None, interval=1, coalesce=0.05, upstream=None):
+        """
+        QuoteHub object constructor.
+
+        Args:
+            timeKeep (TimeKeep object, optional): a TimeKeep object, used to skip fetching while the market is closed,
+                and to wake the hub up when it opens.
+            fetcher (callable, optional): a function that takes a list of symbols and returns a dataframe
+                of quotes indexed by symbol. Defaults to YahooProvider().quotes.
+            interval (int, optional): seconds between ticks. Defaults to 1.
+            coalesce (float, optional): seconds to wait after a new subscription so that windows
+                opened together are fetched together. Defaults to 0.05.
+            upstream (Upstream object, optional): the rate limiter and circuit breaker requests are made through.
+                Defaults to UPSTREAM, shared with the table controls.
+        """
+        TRACE.info('>>>> [MAIN]: INITIALIZING QUOTE HUB')
+        # primary switch
+        self.alive = True
+
+        self.timeKeep = timeKeep
+        self.fetcher = fetcher if fetcher else YahooProvider().quotes
+        self.interval = interval
+        self.coalesce = coalesce
+        self.upstream = upstream if upstream else UPSTREAM
+
+        # symbol -> list of callbacks, and symbols that never received a quote
+        self._subscribers = {}
+        self._fresh = set()
+        self._lock = Lock()
+        self._wake = Event()
+
+        # counters to keep track of upstream load
+        self.requestCount = 0
+        self.lastLatency = None
+
+    def subscribe(self, sym, callback):
+        """
+        Instance method subscribe() adds a callback to receive quotes on the given symbol,
+            the callback is called as callback(sym, quote, error) on every tick, where quote is
+            a single row dataframe, and error is the exception raised on a failed fetch (or None).
+
+        Args:
+            sym (String): a company symbol/ticker
+            callback (callable): a function to receive the quote
+        """
+        with self._lock:
+            self._subscribers.setdefault(sym, []).append(callback)
+            self._fresh.add(sym)
+        # wake the hub so the new subscriber does not wait for the next tick
+        self._wake.set()
+
+    def unsubscribe(self, sym, callback):
+        """
+        Instance method unsubscribe() removes a callback previously added with subscribe().
+
+        Args:
+            sym (String): a company symbol/ticker
+            callback (callable): the subscribed function
+        """
+        with self._lock:
+            callbacks = self._subscribers.get(sym, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(sym, None)
+                self._fresh.discard(sym)
+
+    def symbols(self):
+        """
+        Instance method symbols() returns the symbols that need a quote on this tick,
+            all subscribed symbols while the market is open, or only the ones that never
+            received a quote while it's closed.
+
+        Returns:
+            list: a list of symbols
+        """
+        with self._lock:
+            if self.timeKeep is None or self.timeKeep.msBool:
+                return list(self._subscribers)
+            return list(self._fresh)
+
+    def _request(self, symbols):
+        """
+        Private instance method _request() makes the upstream request of a tick, counts and times it.
+        """
+        self.requestCount += 1
+        with METRICS.timed('quote.fetch'):
+            return self.fetcher(symbols)
+
+    def tick(self):
+        """
+        Instance method tick() makes a single multi-symbol request for all needed symbols
+            and fans the result out to subscribers.
+
+        Returns:
+            float: the time in seconds the tick took, or None if there was nothing to fetch.
+        """
+        symbols = self.symbols()
+        if not symbols:
+            return None
+
+        start_time = time()
+        quotes, error = None, None
+        try:
+            quotes = self.upstream.call(self._request, symbols)
+        except CircuitOpenError as e:
+            # no request was made, the subscribers back off
+            error = e
+        except Exception as e:
+            TRACE.error('>>>> [MAIN]: quote hub fetch failed %r', e)
+            error = e
+
+        with self._lock:
+            targets = [(sym, list(self._subscribers.get(sym, []))) for sym in symbols]
+
+        for sym, callbacks in targets:
+            quote, symError = None, error
+            if error is None:
+                if sym in quotes.index:
+                    quote = quotes.loc[[sym]]
+                    with self._lock:
+                        self._fresh.discard(sym)
+                else:
+                    symError = KeyError(f'no quote returned for {sym}')
+            for callback in callbacks:
+                callback(sym, quote, symError)
+
+        self.lastLatency = time() - start_time
+        return self.lastLatency
+
+    def _market_transition(self, isOpen):
+        """
+        Private instance method _market_transition() is the callback subscribed to timeKeep,
+            the market opening wakes the hub up, all subscribed symbols need quotes again.
+
+        Args:
+            isOpen (Boolean): True if the market has just opened, False if it has just closed
+        """
+        if isOpen:
+            self._wake.set()
+
+    def _hub_loop(self):
+        """
+        Private instance method _hub_loop() starts a loop that runs as long as
+            the primary switch == True, the loop body calls tick() once every interval,
+            or sooner if a new subscription wakes it up.
+        While there is nothing to fetch (no subscribers, or the market is closed and every symbol has a quote)
+            the hub sleeps until a subscription or the market opening wakes it up.
+        """
+        while self.alive:
+            start_time = time()
+            if self.tick() is None:
+                woken = self._wake.wait()
+            else:
+                woken = self._wake.wait(
+                    timeout=max(0, self.interval - (time() - start_time)))
+            if woken:
+                self._wake.clear()
+                sleep(self.coalesce)
+        TRACE.info('>>>> [MAIN] quote hub terminated - primary switch triggered')
+
+    def start(self):
+        """
+        Instance method start() creates and starts a thread that runs _hub_loop() in daemon mode
+        """
+        if self.timeKeep is not None:
+            self.timeKeep.subscribe(self._market_transition)
+        hubThread = Thread(target=self._hub_loop, daemon=True)
+        hubThread.start()
+
+    def kill(self):
+        """
+        Instance function kill() kills the running thread by
+            setting the primary switch to False so the loop breaks.
+        """
+        self.alive = False
+        if self.timeKeep is not None:
+            self.timeKeep.unsubscribe(self._market_transition)
+        self._wake.set()
@@ -0,0 +1,255 @@
+import random
+import sys
+from threading import Lock
+from urllib.error import URLError
+from time import monotonic, sleep
+
+from ._trace import TRACE
+
+# upstream requests per second allowed to all windows together, and the burst allowed on top
+RATE = 5
+BURST = 10
+# consecutive failed requests that open the circuit, and seconds before a trial request is let through
+FAILURE_THRESHOLD = 5
+RECOVERY_TIME = 30
+# seconds of the first retry delay, and the longest one
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+# http status of a rate limited request, statuses at or above SERVER_ERROR are failures of the provider
+TOO_MANY_REQUESTS = 429
+SERVER_ERROR = 500
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Error raised instead of making a request while the circuit is open.
+
+    Attributes:
+        retryIn (float): seconds until the circuit lets a trial request through
+    """
+
+    def __init__(self, retryIn):
+        super().__init__(f'upstream circuit open, retry in {retryIn:.1f}s')
+        self.retryIn = retryIn
+
+
+def is_upstream_failure(error):
+    """
+    Function is_upstream_failure() tells a failure of the provider (a connection error, a timeout, an HTTP 429
+        or 5xx response) from an error of the request itself (a symbol without data, a response that didn't parse),
+        only the former count towards opening the circuit.
+
+    Args:
+        error (Exception): the error raised by a request
+
+    Returns:
+        Boolean: True if the error is a failure of the provider
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # requests (HTTPError.response.status_code) and urllib (HTTPError.code) errors
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    if isinstance(status, int):
+        return status == TOO_MANY_REQUESTS or status >= SERVER_ERROR
+    if isinstance(error, URLError):
+        return True
+    # connection errors and timeouts of requests don't derive from the builtin ones
+    requests = sys.modules.get('requests')
+    return requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class TokenBucket():
+    """
+    Class TokenBucket represents a rate limiter shared by all threads: tokens are added at a fixed rate
+        up to a capacity, and every request takes one.
+    """
+
+    def __init__(self, rate=RATE, capacity=BURST):
+        """
+        TokenBucket object constructor.
+
+        Args:
+            rate (float, optional): tokens added per second. Defaults to RATE.
+            capacity (int, optional): the most tokens the bucket holds. Defaults to BURST.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = monotonic()
+        self._lock = Lock()
+
+    def reserve(self):
+        """
+        Instance method reserve() takes a token, borrowing it from the future if the bucket is empty.
+
+        Returns:
+            float: seconds the caller has to wait before using the token
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        """
+        Instance method acquire() takes a token, sleeping until it can be used.
+        """
+        delay = self.reserve()
+        if delay:
+            sleep(delay)
+
+
+class Backoff():
+    """
+    Class Backoff represents the retry delays of a single caller, growing exponentially
+        with every failure, with full jitter so callers that failed together don't retry together.
+    """
+
+    def __init__(self, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+        """
+        Backoff object constructor.
+
+        Args:
+            base (float, optional): seconds of the first delay. Defaults to BACKOFF_BASE.
+            cap (float, optional): seconds of the longest delay. Defaults to BACKOFF_CAP.
+        """
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next(self):
+        """
+        Instance method next() returns the delay before the next retry, and counts the failure.
+
+        Returns:
+            float: seconds to wait
+        """
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** self.attempt))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        """
+        Instance method reset() starts over after a success.
+        """
+        self.attempt = 0
+
+
+class CircuitBreaker():
+    """
+    Class CircuitBreaker represents the health of the upstream provider shared by all threads:
+        after FAILURE_THRESHOLD failed requests in a row the circuit opens and requests fail fast,
+        once RECOVERY_TIME passes a single trial request is let through (half open), and its
+        success closes the circuit, or its failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half open'
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, recovery=RECOVERY_TIME):
+        """
+        CircuitBreaker object constructor.
+
+        Args:
+            threshold (int, optional): failures in a row that open the circuit. Defaults to FAILURE_THRESHOLD.
+            recovery (float, optional): seconds before a trial request. Defaults to RECOVERY_TIME.
+        """
+        self.threshold = threshold
+        self.recovery = recovery
+        self.state = self.CLOSED
+        self.failures = 0
+        self._openedAt = 0.0
+        self._lock = Lock()
+
+    def allow(self):
+        """
+        Instance method allow() checks whether a request can be made.
+
+        Raises:
+            CircuitOpenError: if the circuit is open, or half open with the trial request in flight.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            retryIn = self._openedAt + self.recovery - monotonic()
+            if self.state == self.OPEN and retryIn <= 0:
+                TRACE.warning('>>>> [MAIN]: upstream circuit half open, sending a trial request')
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError(max(retryIn, 0.0))
+
+    def success(self):
+        """
+        Instance method success() records a successful request, closing the circuit.
+        """
+        with self._lock:
+            if self.state != self.CLOSED:
+                TRACE.warning('>>>> [MAIN]: upstream circuit closed')
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        """
+        Instance method failure() records a failed request, opening the circuit on
+            the threshold, or on a failed trial request.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    TRACE.warning('>>>> [MAIN]: upstream circuit open after %d failures', self.failures)
+                self.state = self.OPEN
+                self._openedAt = monotonic()
+
+
+class Upstream():
+    """
+    Class Upstream puts every request to the provider behind a shared TokenBucket and CircuitBreaker.
+    Module variable UPSTREAM is the instance shared by the quote hub and all table controls.
+    """
+
+    def __init__(self, limiter=None, breaker=None):
+        """
+        Upstream object constructor.
+
+        Args:
+            limiter (TokenBucket object, optional): Defaults to a new TokenBucket().
+            breaker (CircuitBreaker object, optional): Defaults to a new CircuitBreaker().
+        """
+        self.limiter = limiter if limiter else TokenBucket()
+        self.breaker = breaker if breaker else CircuitBreaker()
+
+    def call(self, function, *args, **kwargs):
+        """
+        Instance method call() makes a request once the circuit and the rate limit allow it.
+
+        Args:
+            function (callable): the function making the request
+
+        Raises:
+            CircuitOpenError: if the circuit is open, the request is not made.
+            Exception: the error raised by function, counted as a failure if it's a failure
+                of the provider (is_upstream_failure()).
+
+        Returns:
+            the return value of function
+        """
+        self.breaker.allow()
+        self.limiter.acquire()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.breaker.failure()
+            else:
+                # the provider answered, an error of a single symbol says nothing of its health
+                self.breaker.success()
+            raise
+        self.breaker.success()
+        return result
+
+
+UPSTREAM = Upstream()
@@ -0,0 +1,133 @@
+from collections import deque
+from datetime import timedelta
+
+# the 52-week range covers bars dated after this long before the last bar
+RANGE_PERIOD = timedelta(weeks=52, days=1)
+# number of trading days in the average volume (about 3 months)
+VOLUME_DAYS = 63
+
+
+class RollingStats():
+    """
+    Class RollingStats represents the rolling statistics of a symbol table shown in the data table of
+        a symbol window: the 52-week high and low, and the N-day average volume.
+    The statistics are kept current bar by bar, with monotonic deques for the extrema and a running sum
+        for the volume, so an appended bar, or a revision of the last bar (the live bar during the session),
+        costs O(1) amortized no matter how long the history is.
+    The last bar is kept out of the deques until a newer bar is appended, so revising it never needs
+        to restore the bars it would have pushed out.
+    """
+
+    def __init__(self, volumeDays=VOLUME_DAYS, rangePeriod=RANGE_PERIOD):
+        """
+        RollingStats object constructor.
+
+        Args:
+            volumeDays (int, optional): number of trading days in the average volume. Defaults to VOLUME_DAYS.
+            rangePeriod (timedelta, optional): period of the high/low range. Defaults to RANGE_PERIOD.
+        """
+        self.volumeDays = volumeDays
+        self.rangePeriod = rangePeriod
+        # (date, high, low, volume) of the last bar
+        self.last = None
+        # (date, value) of past bars in the range, highs decreasing and lows increasing from the front
+        self._highs = deque()
+        self._lows = deque()
+        # volumes of the past volumeDays - 1 bars, and their sum
+        self._volumes = deque()
+        self._volumeSum = 0.0
+
+    @classmethod
+    def from_frame(cls, frame, **kwargs):
+        """
+        Class method from_frame() creates a RollingStats of a symbol table, only the bars of the longest window are read.
+
+        Args:
+            frame (Dataframe): a dataframe of bars indexed by Date, with High, Low and Volume columns
+
+        Returns:
+            RollingStats: the statistics as of the last bar of frame
+        """
+        stats = cls(**kwargs)
+        if frame.empty:
+            return stats
+        start = frame.index.searchsorted(frame.index[-1] - stats.rangePeriod, side='left')
+        start = min(start, max(len(frame) - stats.volumeDays, 0))
+        tail = frame.iloc[start:]
+        for date, high, low, volume in zip(tail.index, tail['High'], tail['Low'], tail['Volume']):
+            stats.update(date, high, low, volume)
+        return stats
+
+    def update(self, date, high, low, volume):
+        """
+        Instance method update() applies a bar, either a revision of the last bar (same date), or a new bar.
+
+        Args:
+            date (datetime): the bar date
+            high (float): the bar high
+            low (float): the bar low
+            volume (float): the bar volume
+
+        Raises:
+            ValueError: if the bar is older than the last bar, the statistics have to be rebuilt with from_frame()
+        """
+        if self.last is not None:
+            if date < self.last[0]:
+                raise ValueError(f'bar of {date} is older than the last bar of {self.last[0]}')
+            if date > self.last[0]:
+                self._push(*self.last)
+        self.last = (date, high, low, volume)
+        self._expire(date - self.rangePeriod)
+
+    def _push(self, date, high, low, volume):
+        """
+        Private instance method _push() adds a bar that is no longer the last bar to the deques and the volume sum.
+        """
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((date, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((date, low))
+
+        if self.volumeDays > 1:
+            self._volumes.append(volume)
+            self._volumeSum += volume
+            if len(self._volumes) > self.volumeDays - 1:
+                self._volumeSum -= self._volumes.popleft()
+
+    def _expire(self, cutoff):
+        """
+        Private instance method _expire() drops bars dated before the cutoff from the front of the deques.
+        """
+        while self._highs and self._highs[0][0] < cutoff:
+            self._highs.popleft()
+        while self._lows and self._lows[0][0] < cutoff:
+            self._lows.popleft()
+
+    @property
+    def high(self):
+        """
+        float: the 52-week high, None if there are no bars
+        """
+        if self.last is None:
+            return None
+        return max(self._highs[0][1], self.last[1]) if self._highs else self.last[1]
+
+    @property
+    def low(self):
+        """
+        float: the 52-week low, None if there are no bars
+        """
+        if self.last is None:
+            return None
+        return min(self._lows[0][1], self.last[2]) if self._lows else self.last[2]
+
+    @property
+    def avgVolume(self):
+        """
+        float: the average volume of the last volumeDays bars (or fewer if the history is shorter), None if there are no bars
+        """
+        if self.last is None:
+            return None
+        return (self._volumeSum + self.last[3]) / (len(self._volumes) + 1)
@@ -0,0 +1,133 @@
+import builtins
+import json
+import sys
+from contextlib import contextmanager
+from importlib.util import resolve_name
+from threading import local
+from time import perf_counter
+
+
+class StartupProfile():
+    """
+    Class StartupProfile represents a profile of the program startup, it records how long each module
+        takes to import (with and without the modules it imports), and how long each init phase of the
+        main window takes, then reports them along with the time to first window.
+    The class is intended to be used through the single PROFILE instance, which does nothing
+        unless enable() is called (by "__main__" with --startup-profile) before the package is imported.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start_time = None
+        # module name -> [cumulative seconds, self seconds]
+        self.imports = {}
+        # list of (phase label, seconds)
+        self.phases = []
+        self._local = local()
+        self._import = None
+
+    def enable(self):
+        """
+        Instance method enable() starts the clock and starts timing imports, by wrapping builtins.__import__.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.start_time = perf_counter()
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        """
+        Instance method disable() stops timing imports.
+        """
+        if self.enabled:
+            builtins.__import__ = self._import
+            self.enabled = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """
+        Private instance method _timed_import() replaces builtins.__import__ while enabled,
+            it times imports of modules that are not imported yet.
+        """
+        fullname = resolve_name('.' * level + name, (globals or {}).get('__package__')) if level else name
+        if fullname in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start_time = perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = perf_counter() - start_time
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            entry = self.imports.setdefault(fullname, [0.0, 0.0])
+            entry[0] += elapsed
+            entry[1] += elapsed - children
+
+    @contextmanager
+    def phase(self, label):
+        """
+        Instance method phase() is a context manager that times an init phase, it does nothing while disabled.
+
+        Args:
+            label (String): name of the phase (e.g. 'MainControl')
+        """
+        if not self.enabled:
+            yield
+            return
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((label, perf_counter() - start_time))
+
+    def snapshot(self):
+        """
+        Instance method snapshot() returns the profile as a dict of milliseconds.
+
+        Returns:
+            dict: {'first_window': float, 'phases': dict, 'imports': dict}
+        """
+        return {
+            'first_window': (perf_counter() - self.start_time) * 1000,
+            'phases': {label: elapsed * 1000 for label, elapsed in self.phases},
+            'imports': {name: {'cumulative': cumulative * 1000, 'self': own * 1000}
+                        for name, (cumulative, own) in self.imports.items()},
+        }
+
+    def report(self, path=None, top=20):
+        """
+        Instance method report() prints the profile to stderr (stdout might be silenced),
+            and optionally writes it as json, so startup regressions can be tracked.
+
+        Args:
+            path (String, optional): path of a json file to write. Defaults to None.
+            top (int, optional): number of slowest imports to print. Defaults to 20.
+        """
+        if not self.enabled:
+            return
+        profile = self.snapshot()
+        self.disable()
+
+        lines = [f'\n>>>> [STARTUP PROFILE]: time to first window {profile["first_window"]:.1f}ms',
+                 '  init phases:']
+        lines += [f'    {label:<28} {elapsed:>9.1f}ms' for label, elapsed in profile['phases'].items()]
+        lines.append('  slowest imports (cumulative / self):')
+        slowest = sorted(profile['imports'].items(), key=lambda item: item[1]['cumulative'], reverse=True)
+        lines += [f'    {name:<40} {times["cumulative"]:>9.1f}ms {times["self"]:>9.1f}ms'
+                  for name, times in slowest[:top]]
+        lines.append('  StockWatch modules (cumulative / self):')
+        lines += [f'    {name:<40} {times["cumulative"]:>9.1f}ms {times["self"]:>9.1f}ms'
+                  for name, times in slowest if name.startswith('StockWatch')]
+        print('\n'.join(lines), file=sys.stderr)
+
+        if path:
+            with open(path, 'w') as f:
+                json.dump(profile, f, indent=2)
+
+
+PROFILE = StartupProfile()
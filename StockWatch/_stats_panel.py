@@ -0,0 +1,150 @@
+from tkinter import BOTH, LEFT, RIGHT, Button, Frame, Label, StringVar, Toplevel, X, ttk
+
+from ._metrics import METRICS, STAGES
+from ._trace import TRACE
+
+# milliseconds between two refreshes of the panel
+REFRESH_MS = 1000
+
+# default file of the Dump button, if no dump file was given on the command line
+DUMP_PATH = 'metrics.jsonl'
+
+ALL = 'All symbols'
+SHARED = 'Shared'
+
+
+class StatsPanel(Toplevel):
+    """
+    Class StatsPanel represents the stats window opened from the main window, it shows the METRICS latency
+        histograms of every stage (count, rate, mean, p50, p95 and max milliseconds), tagged with their kind
+        (net, db, render) over all symbols, or for a single one, and the counters, refreshed every second.
+    Snapshots can be dumped to a file (one json snapshot per line), and the metrics reset.
+    The trace ring can be dumped too, e.g. right after a window reported a failure.
+    """
+
+    COLUMNS = ('stage', 'kind', 'count', 'per sec', 'mean ms', 'p50 ms', 'p95 ms', 'max ms')
+
+    def __init__(self, master, dumpPath=None, metrics=None):
+        """
+        StatsPanel object constructor.
+
+        Args:
+            master (Tkinter widget): the root window
+            dumpPath (String, optional): path of the file the Dump button appends to. Defaults to DUMP_PATH.
+            metrics (Metrics object, optional): the registry to show. Defaults to METRICS.
+        """
+        TRACE.info('>>>> [MAIN]: OPENING STATS PANEL')
+        Toplevel.__init__(self, master=master)
+        self.protocol("WM_DELETE_WINDOW", self._close_window)
+        self.title('PyStockWatch Stats')
+        # primary switch
+        self.alive = True
+
+        self.metrics = metrics if metrics else METRICS
+        self.dumpPath = dumpPath if dumpPath else DUMP_PATH
+        self._run_statsPanel()
+        self._refresh()
+
+    def _run_statsPanel(self):
+        """
+        Private instance method _run_statsPanel() creates the scope selection, the stages table,
+            the counters label and the buttons.
+        """
+        topFrame = Frame(self)
+        topFrame.pack(fill=X, padx=5, pady=5)
+        Label(topFrame, text='Scope: ').pack(side=LEFT)
+        self.scopeVar = StringVar(value=ALL)
+        self.scopeBox = ttk.Combobox(topFrame, textvariable=self.scopeVar, state='readonly', width=14,
+                                     values=(ALL, SHARED))
+        self.scopeBox.pack(side=LEFT)
+        self.scopeBox.bind('<<ComboboxSelected>>', lambda event: self._refresh(reschedule=False))
+        self.uptimeVar = StringVar()
+        Label(topFrame, textvariable=self.uptimeVar, fg='grey').pack(side=RIGHT)
+
+        self.table = ttk.Treeview(self, columns=self.COLUMNS, show='headings', height=len(STAGES))
+        for column in self.COLUMNS:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=90 if column == 'stage' else 64, anchor='w' if column == 'stage' else 'e')
+        self.table.pack(fill=BOTH, expand=1, padx=5)
+
+        self.countersVar = StringVar()
+        Label(self, textvariable=self.countersVar, justify=LEFT).pack(fill=X, padx=5, pady=2)
+
+        buttonFrame = Frame(self)
+        buttonFrame.pack(fill=X, padx=5, pady=5)
+        Button(buttonFrame, text='Dump', width=8, command=lambda: self._dump()).pack(side=LEFT)
+        Button(buttonFrame, text='Reset', width=8, command=lambda: self._reset()).pack(side=LEFT, padx=5)
+        Button(buttonFrame, text='Trace', width=8, command=lambda: self._dump_trace()).pack(side=LEFT)
+        Button(buttonFrame, text='Close', fg='red', width=8, command=lambda: self._close_window()).pack(side=RIGHT)
+        self.statusVar = StringVar()
+        Label(buttonFrame, textvariable=self.statusVar, fg='grey').pack(side=LEFT, padx=5)
+
+    def _scope(self):
+        """
+        Private instance method _scope() returns the symbol selected for snapshot(), False for all symbols.
+        """
+        scope = self.scopeVar.get()
+        return False if scope == ALL else None if scope == SHARED else scope
+
+    def _refresh(self, reschedule=True):
+        """
+        Private instance method _refresh() shows a new snapshot, and schedules the next refresh
+            as long as the primary switch == True.
+        """
+        if not self.alive:
+            return
+        self.scopeBox['values'] = (ALL, SHARED) + tuple(self.metrics.symbols())
+        snapshot = self.metrics.snapshot(self._scope())
+        uptime = snapshot['uptime'] if snapshot['uptime'] else float('nan')
+
+        self.table.delete(*self.table.get_children())
+        for stats in snapshot['stages']:
+            self.table.insert('', 'end', values=(
+                stats['stage'], stats['kind'], stats['count'], f'{stats["count"] / uptime:.2f}',
+                f'{stats["mean_ms"]:.1f}', f'{stats["p50_ms"]:.1f}', f'{stats["p95_ms"]:.1f}', f'{stats["max_ms"]:.1f}'))
+
+        counters = {}
+        for counter in snapshot['counters']:
+            counters[counter['name']] = counters.get(counter['name'], 0) + counter['value']
+        self.countersVar.set('   '.join(f'{name}: {value:,}' for name, value in sorted(counters.items())))
+        self.uptimeVar.set(f'over {snapshot["uptime"]:.0f}s')
+
+        if reschedule:
+            self.after(REFRESH_MS, self._refresh)
+
+    def _dump(self):
+        """
+        Private instance method _dump() appends a snapshot to the dump file.
+        """
+        try:
+            self.metrics.dump(self.dumpPath)
+            self.statusVar.set(f'dumped to {self.dumpPath}')
+        except OSError as e:
+            TRACE.error('>>>> [MAIN]: metrics dump failed %r', e)
+            self.statusVar.set('dump failed')
+
+    def _dump_trace(self):
+        """
+        Private instance method _dump_trace() appends the trace ring to the trace dump file.
+        """
+        try:
+            self.statusVar.set(f'trace dumped to {TRACE.dump(reason="stats panel")}')
+        except OSError as e:
+            TRACE.error('>>>> [MAIN]: trace dump failed %r', e)
+            self.statusVar.set('trace dump failed')
+
+    def _reset(self):
+        """
+        Private instance method _reset() clears the metrics, and refreshes the panel.
+        """
+        self.metrics.reset()
+        self.statusVar.set('')
+        self._refresh(reschedule=False)
+
+    def _close_window(self):
+        """
+        Private instance method _close_window() stops the refreshes by setting the primary switch to False,
+            and destroys the window.
+        """
+        self.alive = False
+        self.destroy()
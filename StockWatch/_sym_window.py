@@ -3,12 +3,12 @@ from time import sleep, time
 from tkinter import *
 from tkinter import ttk
 
-from dateutil.relativedelta import relativedelta
 from numerize import numerize
 
 from ._data_control import DataControl
 from ._helper_toolbox import ToolTip, diffCalc
 from ._plot_graph import PlotGraph
+from ._trace import TRACE
 
 
 GREENSHADES = ['green3', 'green2', 'green1', 'pale green']
@@ -27,7 +27,7 @@ class DisplayWindow(Toplevel, DataControl):
         # create a display window with geometry
         # the initialization is designed to take
         # xLeft and yTop as named optional arguments
-        print(f'>>> [{sym}]: INITIALIZING DISPLAY WINDOW')
+        TRACE.info('>>> [%s]: INITIALIZING DISPLAY WINDOW', sym)
         Toplevel.__init__(self, master=parent)
         self.protocol("WM_DELETE_WINDOW", self._close_window)
         self.sym = sym
@@ -41,7 +41,7 @@ class DisplayWindow(Toplevel, DataControl):
         self.resizable(False, False)
 
         # initialize data control
-        DataControl.__init__(self, parent.db_con, parent.timeKeep)
+        DataControl.__init__(self, parent.db_con, parent.timeKeep, parent.quoteHub, parent.ui, parent.engine)
 
         # # show window and start engine
         self._run_displayWindow()
@@ -346,19 +346,21 @@ class DisplayWindow(Toplevel, DataControl):
         """
         Instance method update_name() updates values of name and exchange
             besed on an attribute defined and controlled by the DataControl class
+        It is called from the data generator thread, so widgets are updated through the ui dispatcher.
         """
         compLongName = self.yahooQuote['longName'].to_string(
             index=False, header=False)
         compFullExch = self.yahooQuote['fullExchangeName'].to_string(
             index=False, header=False)
 
-        self._compVar.set(compLongName)
-        self._exchVar.set(f'({compFullExch}: ' + self.sym + ')')
+        self.ui.set(self._compVar, compLongName)
+        self.ui.set(self._exchVar, f'({compFullExch}: ' + self.sym + ')')
 
     def update_window(self, first_run):
         """
         Instance method update_window() updates values of fields in the data table
             besed on an attributes defined and controlled by the DataControl class
+        It is called from the data generator thread, so widgets are updated through the ui dispatcher.
         """
         # declare a variable for each data field value
         ask = self.yahooQuote['ask'].to_string(
@@ -377,14 +379,10 @@ class DisplayWindow(Toplevel, DataControl):
 
         lastEntryDate = lastEntry.index.item()
         lastEntryDateStr = lastEntryDate.strftime('%Y-%m-%d')
-        self.estDateVal.set(lastEntryDateStr)
+        self.ui.set(self.estDateVal, lastEntryDateStr)
 
-        FTWeeksDate = lastEntryDate - \
-            relativedelta(weeks=52) - relativedelta(days=1)
-        FTWeeksHigh = self.dbRead['High'].loc[FTWeeksDate:]
-        FTWeeksLow = self.dbRead['Low'].loc[FTWeeksDate:]
-        # VolumeAvgDate = lastEntryDate - relativedelta(months=3) - relativedelta(days=1)
-        VolumeAvgColumn = self.dbRead['Volume']
+        # 52-week range and 3-month average volume, kept current by the history cache
+        stats = self.dbStats
 
         Close = lastEntry['Close'].to_string(
             header=False, index=False)
@@ -398,8 +396,8 @@ class DisplayWindow(Toplevel, DataControl):
             header=False, index=False).replace('.0', '')
         prevclose = prevLastEntry['Close'].to_string(
             header=False, index=False)
-        FTWeeksMax = FTWeeksHigh.max()
-        FTWeeksMin = FTWeeksLow.min()
+        FTWeeksMax = stats.high
+        FTWeeksMin = stats.low
 
         # this mini function takes a value
         # and returns a USD formatted string
@@ -407,19 +405,19 @@ class DisplayWindow(Toplevel, DataControl):
 
         # set values of previously linked tkinter variables
         # to new values of variables declared above
-        self._closeVal.set(usd(Close))
-        self._dayRangeVal.set(f'{usd(Low)} - {usd(High)}')
-        self._openVal.set(usd(Open))
+        self.ui.set(self._closeVal, usd(Close))
+        self.ui.set(self._dayRangeVal, f'{usd(Low)} - {usd(High)}')
+        self.ui.set(self._openVal, usd(Open))
         vol = f'{int(Volume):,}'
-        self._volVal.set(vol)
-        self._prevcloseVal.set(usd(prevclose))
-        self._fiftyTwoVal.set(f'{usd(FTWeeksMin)} - {usd(FTWeeksMax)}')
-        volAvg = f'{sum(VolumeAvgColumn) / len(VolumeAvgColumn):,.0f}'
-        self._avgVolVal.set(volAvg)
-        self._askVal.set(f'{usd(ask)} x {askSize}00')
-        self._bidVal.set(f'{usd(bid)} x {bidSize}00')
+        self.ui.set(self._volVal, vol)
+        self.ui.set(self._prevcloseVal, usd(prevclose))
+        self.ui.set(self._fiftyTwoVal, f'{usd(FTWeeksMin)} - {usd(FTWeeksMax)}')
+        volAvg = f'{stats.avgVolume:,.0f}'
+        self.ui.set(self._avgVolVal, volAvg)
+        self.ui.set(self._askVal, f'{usd(ask)} x {askSize}00')
+        self.ui.set(self._bidVal, f'{usd(bid)} x {bidSize}00')
         # self.__marketCapVal.set(f'$ {format(int(marketCap), ",")}')
-        self._marketCapVal.set(f'$ {numerize.numerize(int(marketCap), 3)}')
+        self.ui.set(self._marketCapVal, f'$ {numerize.numerize(int(marketCap), 3)}')
 
 
         # set difference to value returned from call to diffCalc
@@ -429,51 +427,48 @@ class DisplayWindow(Toplevel, DataControl):
         # depending on whether the difference is incremental
         # or decremental respectively
         if '+' in diff:
-            self.diffLabel.config(fg='green')
+            self.ui.config(self.diffLabel, fg='green')
         elif '-' in diff:
-            self.diffLabel.config(fg='red')
-        self._diffVal.set(diff)
+            self.ui.config(self.diffLabel, fg='red')
+        self.ui.set(self._diffVal, diff)
 
         # while the market is open
         # apply a flashing effect on the price label
         # according to the change from last update
         if Close > self.latestClose:
-            self.flash_diff('green')
+            self.ui.call(self.flash_diff, 'green')
         elif Close < self.latestClose:
-            self.flash_diff('red')
+            self.ui.call(self.flash_diff, 'red')
 
         # this variable holds the close value of this iteration (update)
         # it is used in the next iteration for the flash effect
         self.latestClose = Close
 
         # if this is the first time the function is called
-        # create a PlotGraph object and draw it
+        # create a PlotGraph object, and draw it on the tkinter thread
         if first_run:
             plot = PlotGraph(self)
-            try:
-                plot.plot_graph()
-            except Exception as e:
-                print(repr(e))
-                raise e
+            self.ui.call(plot.plot_graph)
 
     def update_status(self, **kwargs):
         """
         Instance method update_status() updates status fields based on
             provided named arguments ('interval: float()' or 'status: str()').
+        It can be called from any thread, widgets are updated through the ui dispatcher.
         """
         if 'intervalUpdate' in kwargs:
             interval = kwargs['intervalUpdate']
             if isinstance(interval, str):
-                self._intervalVal.set('0')
+                self.ui.set(self._intervalVal, '0')
             elif isinstance(interval, float):
                 end_time = time()
                 time_lapsed = end_time - interval
                 sec = time_lapsed % 60
-                self._intervalVal.set(
-                    str('Update Interval: {:.2f}s'.format(sec)))
+                self.ui.set(self._intervalVal,
+                            str('Update Interval: {:.2f}s'.format(sec)))
 
         if 'status' in kwargs:
-            self._statusVal.set(kwargs['status'])
+            self.ui.set(self._statusVal, kwargs['status'])
     
     def bg_colorfade(self, widget, colors):
         """
@@ -508,3 +503,4 @@ class DisplayWindow(Toplevel, DataControl):
         """
         self.stop_engine()
         self.destroy()
+        self.ui.forget(self)
@@ -0,0 +1,176 @@
+import json
+import os
+
+import numpy as np
+
+# the highest byte (never found in utf-8), appended to a prefix to get the end of its range in a sorted array
+_MAX_BYTE = b'\xff'
+
+# snapshot file layout: a json header padded to HEADER_SIZE bytes, followed by the raw arrays
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+
+
+class SymbolIndex():
+    """
+    Class SymbolIndex represents a prefix index over company symbols and security names,
+        built once from the symbols table, and used by AutoComplete to find matches of user input.
+    Tickers and upper-cased names are kept utf-8 encoded in sorted arrays, so a lookup is two binary searches
+        and a slice of at most 'limit' rows, no matter how many symbols there are.
+    The arrays can be saved to a versioned snapshot file, and loaded back memory-mapped, so the index
+        is available at startup without reading the symbols table.
+    """
+
+    # names of the arrays that make up the index, in snapshot order
+    ARRAYS = ('symbols', 'names', 'symOrder', 'symKeys', 'nameOrder', 'nameKeys')
+
+    def __init__(self, symbols, names):
+        """
+        SymbolIndex object constructor.
+
+        Args:
+            symbols (list): a list of company symbols/tickers
+            names (list): a list of security names, in the same order as symbols
+        """
+        self.source = None
+        nameKeys = np.array([name.upper().encode() for name in names], dtype=bytes)
+        symbols = np.array([sym.encode() for sym in symbols], dtype=bytes)
+        names = np.array([name.encode() for name in names], dtype=bytes)
+
+        symOrder = np.argsort(symbols, kind='stable').astype(np.int32)
+        nameOrder = np.argsort(nameKeys, kind='stable').astype(np.int32)
+        self._set_arrays({'symbols': symbols, 'names': names,
+                          'symOrder': symOrder, 'symKeys': symbols[symOrder],
+                          'nameOrder': nameOrder, 'nameKeys': nameKeys[nameOrder]})
+
+    def _set_arrays(self, arrays):
+        """
+        Private instance method _set_arrays() sets the index arrays as instance attributes.
+        """
+        for name in self.ARRAYS:
+            setattr(self, name if name in ('symbols', 'names') else '_' + name, arrays[name])
+
+    def _get_arrays(self):
+        """
+        Private instance method _get_arrays() returns a dict of the index arrays.
+        """
+        return {name: getattr(self, name if name in ('symbols', 'names') else '_' + name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_frame(cls, symbols):
+        """
+        Class method from_frame() builds an index from a symbols dataframe.
+
+        Args:
+            symbols (Dataframe): a pandas dataframe with 'Symbol' and 'Security_Name' columns
+
+        Returns:
+            SymbolIndex: an index of the dataframe
+        """
+        return cls(symbols['Symbol'].fillna('').astype(str).tolist(),
+                   symbols['Security_Name'].fillna('').astype(str).tolist())
+
+    def save(self, path, source=None):
+        """
+        Instance method save() writes the index to a snapshot file, the file is written to a temporary
+            path first and then moved, so readers never see a half written snapshot.
+
+        Args:
+            path (String): path of the snapshot file
+            source (String, optional): a tag of the data the index was built from (e.g. the symbols write timestamp)
+        """
+        arrays = self._get_arrays()
+        header = {'version': FORMAT_VERSION, 'rows': len(self), 'source': source, 'arrays': {}}
+        offset = HEADER_SIZE
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode().ljust(HEADER_SIZE, b' '))
+            for name, array in arrays.items():
+                f.seek(header['arrays'][name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(offset)
+        os.replace(tmp_path, path)
+        self.source = source
+
+    @classmethod
+    def load(cls, path):
+        """
+        Class method load() loads an index from a snapshot file, the arrays are memory-mapped, not read.
+
+        Args:
+            path (String): path of the snapshot file
+
+        Returns:
+            SymbolIndex: the loaded index, or None if the file does not exist or has a different format version
+        """
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.read(HEADER_SIZE))
+        except (OSError, ValueError):
+            return None
+        if header.get('version') != FORMAT_VERSION:
+            return None
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            if header['rows']:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=spec['offset'], shape=shape)
+            else:
+                arrays[name] = np.empty(shape, dtype=dtype)
+
+        index = cls.__new__(cls)
+        index._set_arrays(arrays)
+        index.source = header['source']
+        return index
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, sym):
+        sym = sym.encode()
+        i = np.searchsorted(self._symKeys, sym)
+        return i < len(self._symKeys) and self._symKeys[i] == sym
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        """
+        Private static method _prefix_range() returns the start and end positions of the keys
+            starting with the given prefix in a sorted array.
+        """
+        return (np.searchsorted(keys, prefix, side='left'),
+                np.searchsorted(keys, prefix + _MAX_BYTE, side='left'))
+
+    def lookup(self, prefix, limit=20):
+        """
+        Instance method lookup() returns up to 'limit' symbols whose ticker or security name starts with
+            the given prefix, ticker matches come first.
+
+        Args:
+            prefix (String): upper-cased user input
+            limit (int, optional): maximum number of matches. Defaults to 20.
+
+        Returns:
+            list: a list of dicts {'Symbol': String, 'Security_Name': String}
+        """
+        if not prefix or not len(self):
+            return []
+        prefix = prefix.encode()
+        start, end = self._prefix_range(self._symKeys, prefix)
+        rows = [int(row) for row in self._symOrder[start:min(end, start + limit)]]
+
+        if len(rows) < limit:
+            seen = set(rows)
+            start, end = self._prefix_range(self._nameKeys, prefix)
+            for row in self._nameOrder[start:end]:
+                if int(row) not in seen:
+                    rows.append(int(row))
+                    if len(rows) == limit:
+                        break
+
+        return [{'Symbol': self.symbols[row].decode(), 'Security_Name': self.names[row].decode()} for row in rows]
@@ -1,52 +1,137 @@
 from datetime import date, datetime
-from threading import Thread
-from time import sleep
+from threading import Event, Lock, Thread
 
-from pandas import bdate_range
-from pytz import timezone
+from ._market_calendar import MarketCalendar
+from ._trace import TRACE
+
+# longest time in seconds the scheduler sleeps before checking the clock again,
+# so wall clock changes (e.g. system suspend) are picked up
+MAX_SLEEP = 300
 
 
 class TimeKeep():
     """
-    Class TimeKeep represents a time generator object, it keeps track of local and EST timezone dates and times
-        as instance attributes that can be accessed from outside.
+    Class TimeKeep represents a time keeper object, it provides local and exchange timezone dates and times
+        as instance attributes that can be accessed from outside, and keeps track of the market status.
+    The market status is driven by a scheduler that precomputes the next session open/close transition
+        from the market calendar and sleeps until then, subscribers are notified on every transition.
     The class is intended to be initialized and started only once by the Main window object, and passed down
         as a shared source of time data program-wide.
     """
 
-    def __init__(self):
-        print('>>>> [MAIN]: INITIALIZING MAIN TIME GENERATOR')
+    def __init__(self, calendar=None):
+        """
+        TimeKeep object constructor.
+
+        Args:
+            calendar (MarketCalendar object, optional): the market calendar. Defaults to MarketCalendar().
+        """
+        TRACE.info('>>>> [MAIN]: INITIALIZING MAIN TIME GENERATOR')
         # primary switch
         self.alive = True
 
-        # time and date attributes
-        self.localTime = None
-        self.localDate = None
-        self.estTime = None
-        self.estDate = None
+        self.calendar = calendar if calendar else MarketCalendar()
+
+        # market status, and the time it changes next
         self.msBool = None
+        self.nextTransition = None
+
+        self._subscribers = []
+        self._lock = Lock()
+        self._wake = Event()
+
+    # time and date attributes, computed on access
+    @property
+    def localTime(self):
+        return datetime.now().strftime("%H:%M:%S")
+
+    @property
+    def localDate(self):
+        return date.today()
+
+    @property
+    def estTime(self):
+        return self.calendar.now().strftime("%H:%M:%S")
+
+    @property
+    def estDate(self):
+        return self.calendar.now().strftime("%Y-%m-%d")
+
+    @property
+    def estZone(self):
+        """
+        String: the abbreviation of the exchange timezone in effect (EST/EDT)
+        """
+        return self.calendar.now().strftime("%Z")
+
+    @property
+    def closeTime(self):
+        """
+        String: the closing time of the last session, '16:00:00' or '13:00:00' on early close days
+        """
+        return self.calendar.last_session()[1].strftime("%H:%M:%S")
+
+    def subscribe(self, callback):
+        """
+        Instance method subscribe() adds a callback to be called as callback(isOpen) on every
+            market open/close transition, the callback is called immediately with the current status.
+
+        Args:
+            callback (callable): a function that takes a Boolean
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            msBool = self.msBool
+        if msBool is not None:
+            callback(msBool)
+
+    def unsubscribe(self, callback):
+        """
+        Instance method unsubscribe() removes a callback previously added with subscribe().
 
-    def _time_update(self):
+        Args:
+            callback (callable): the subscribed function
         """
-        Private instance function _time_update() starts a loop that runs as long as
-            the primary switch == True, the loop body keeps updating time and date attributes
-            once every 0.1 second.
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _update_status(self):
+        """
+        Private instance method _update_status() sets the market status from the calendar,
+            and notifies subscribers if it changed.
+
+        Returns:
+            float: seconds until the next transition
+        """
+        msBool, self.nextTransition = self.calendar.status()
+        if msBool != self.msBool:
+            with self._lock:
+                self.msBool = msBool
+                subscribers = list(self._subscribers)
+            TRACE.info('>>>> [MAIN]: market %s, next transition at %s', 'opened' if msBool else 'closed', self.nextTransition)
+            for callback in subscribers:
+                callback(msBool)
+        return (self.nextTransition - self.calendar.now()).total_seconds()
+
+    def _schedule(self):
+        """
+        Private instance function _schedule() starts a loop that runs as long as
+            the primary switch == True, the loop body sleeps until the next session transition
+            and updates the market status.
         """
         while self.alive:
-            self.localTime = next(localTimeFunc())
-            self.localDate = next(localDateFunc())
-            self.estTime = next(estTimeFunc())
-            self.estDate = next(estDateFunc())
-            self.msBool = marketStatusCheck()
-            sleep(0.1)
-            continue
-        print('>>>> [MAIN] time generator terminated - primary switch triggered')
+            remaining = self._update_status()
+            self._wake.wait(timeout=min(max(remaining, 0), MAX_SLEEP))
+        TRACE.info('>>>> [MAIN] time generator terminated - primary switch triggered')
 
     def start(self):
         """
-        Instance method start() creates and starts a thread that runs __time_update() in daemon mode
+        Instance method start() sets the current market status, then creates and starts
+            a thread that runs _schedule() in daemon mode
         """
-        timeThread = Thread(target=self._time_update, daemon=True)
+        self._update_status()
+        timeThread = Thread(target=self._schedule, daemon=True)
         timeThread.start()
 
     def kill(self):
@@ -56,51 +141,4 @@ class TimeKeep():
         """
 
         self.alive = False
-
-
-est = timezone('EST')
-
-
-# iterator functions for different times and dates
-def localTimeFunc():
-    while True:
-        yield datetime.now().strftime("%H:%M:%S")
-
-
-def localDateFunc():
-    while True:
-        yield date.today()
-
-
-def estTimeFunc():
-    while True:
-        yield datetime.now(est).strftime("%H:%M:%S")
-
-
-def estDateFunc():
-    while True:
-        yield datetime.now(est).strftime("%Y-%m-%d")
-
-
-def timestamp():
-    while True:
-        yield datetime.now()
-
-
-def marketStatusCheck():
-    """
-    Function marketStatusCheck() checks if the market is open based on current EST date and time
-
-    Returns:
-        Boolean: True if market is open, False if otherwise
-    """
-    currEstDate = next(estDateFunc())
-
-    b_day = bool(len(bdate_range(currEstDate, currEstDate)))
-    if b_day:
-        if not '09:30:00' <= next(estTimeFunc()) <= '16:00:00':
-            return False
-        else:
-            return b_day
-    else:
-        return b_day
+        self._wake.set()
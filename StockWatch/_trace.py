@@ -0,0 +1,219 @@
+import numbers
+import sys
+import threading
+from collections import deque
+from datetime import date, datetime, time as daytime, timedelta
+from time import time
+
+# trace levels, an event is recorded if its level is at or above the trace level
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+NAMES = {level: name.upper() for name, level in LEVELS.items()}
+
+# events kept in the ring, the oldest are dropped first
+RING_SIZE = 4096
+
+# file the ring is dumped to after a failure, if no other path was given
+DUMP_PATH = 'trace.log'
+
+# args of events kept as they are (numbers.Number is there for numpy scalars), any other arg
+# (an exception, a list) is kept as its text
+IMMUTABLE = (str, bytes, numbers.Number, date, daytime, timedelta, type(None))
+# the exact types of the common args, looked up before the slower isinstance() check
+PLAIN = frozenset((str, int, float, bool, date, datetime, type(None)))
+
+
+class Snapshot(str):
+    """
+    Class Snapshot represents an arg of an event reduced to its text when the event is recorded, so the ring
+        doesn't keep the arg alive (an exception keeps its traceback, and every frame of it), nor formats it
+        as it is when the event is read. %s formats it as str() of the arg, and %r as repr() of it.
+    """
+
+    def __new__(cls, value):
+        snapshot = super().__new__(cls, str(value))
+        snapshot._repr = repr(value)
+        return snapshot
+
+    def __repr__(self):
+        return self._repr
+
+
+class Trace():
+    """
+    Class Trace represents a fixed-size in-memory ring buffer of trace events (the debug output of every layer),
+        each event is kept as (time, level, thread id, format, args), and only formatted when it's echoed
+        or dumped, so an event of a level that is off costs a comparison, and one that is on, a tuple append.
+        Args other than strings, numbers and dates are kept as a Snapshot of their text.
+    Events are echoed to stdout as they happen (as the debug prints were), unless echo is off ('silent').
+    The class is intended to be used through the single TRACE instance, the ring can be dumped to a file
+        at any time, and is dumped automatically on an uncaught exception once install_dump() is called.
+
+    Attributes:
+        level (int): the lowest level recorded (DEBUG, INFO, WARNING or ERROR)
+        echo (Boolean): True to also print every recorded event to stdout
+    """
+
+    def __init__(self, size=RING_SIZE, level=DEBUG, echo=True):
+        """
+        Trace object constructor.
+
+        Args:
+            size (int, optional): number of events kept. Defaults to RING_SIZE.
+            level (int, optional): the lowest level recorded. Defaults to DEBUG.
+            echo (Boolean, optional): True to print events as they are recorded. Defaults to True.
+        """
+        self.level = level
+        self.echo = echo
+        self.dumpPath = DUMP_PATH
+        # deque appends are atomic, so threads record without a lock
+        self._ring = deque(maxlen=size)
+        # thread id -> name, looked up once per thread rather than once per event
+        self._threads = {}
+
+    def event(self, level, msg, *args):
+        """
+        Instance method event() records an event, msg is %-formatted with args only when the event is read.
+
+        Args:
+            level (int): the level of the event
+            msg (String): the message, or a %-format of it
+            *args: the values of the format
+        """
+        if level >= self.level:
+            self._record(level, msg, args)
+
+    def _record(self, level, msg, args):
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+        for arg in args:
+            if type(arg) not in PLAIN and not isinstance(arg, IMMUTABLE):
+                args = tuple(arg if isinstance(arg, IMMUTABLE) else Snapshot(arg) for arg in args)
+                break
+        record = (time(), level, ident, msg, args)
+        self._ring.append(record)
+        if self.echo:
+            print(self._message(record))
+
+    def debug(self, msg, *args):
+        if DEBUG >= self.level:
+            self._record(DEBUG, msg, args)
+
+    def info(self, msg, *args):
+        if INFO >= self.level:
+            self._record(INFO, msg, args)
+
+    def warning(self, msg, *args):
+        if WARNING >= self.level:
+            self._record(WARNING, msg, args)
+
+    def error(self, msg, *args):
+        if ERROR >= self.level:
+            self._record(ERROR, msg, args)
+
+    def enabled(self, level):
+        """
+        Instance method enabled() returns True if events of the level are recorded, to skip computing
+            the args of an event that would be dropped.
+        """
+        return level >= self.level
+
+    @staticmethod
+    def _message(record):
+        msg, args = record[3], record[4]
+        if not args:
+            return msg
+        try:
+            return msg % args
+        except (TypeError, ValueError) as e:
+            return f'{msg} {args!r} (format failed: {e!r})'
+
+    def format(self, record, threads=None):
+        """
+        Instance method format() returns a line of an event: time, level, thread and message.
+
+        Args:
+            record (tuple): an event of the ring
+            threads (dict, optional): thread id -> name. Defaults to None (ids).
+        """
+        at = datetime.fromtimestamp(record[0]).strftime('%H:%M:%S.%f')[:-3]
+        thread = threads.get(record[2], record[2]) if threads else record[2]
+        return f'{at} {NAMES.get(record[1], record[1]):<7} {thread:<24} {self._message(record)}'
+
+    def events(self, level=DEBUG):
+        """
+        Instance method events() returns the formatted events in the ring, oldest first.
+
+        Args:
+            level (int, optional): the lowest level returned. Defaults to DEBUG.
+
+        Returns:
+            list: a list of event lines
+        """
+        threads = self._threads.copy()
+        return [self.format(record, threads) for record in self._ring.copy() if record[1] >= level]
+
+    def dump(self, path=None, reason=None):
+        """
+        Instance method dump() appends the events in the ring to a file.
+
+        Args:
+            path (String, optional): path of the dump file. Defaults to dumpPath.
+            reason (String, optional): a header line of the dump (e.g. the failure). Defaults to None.
+
+        Returns:
+            String: the path of the dump file
+        """
+        path = path if path else self.dumpPath
+        with open(path, 'a') as dump:
+            dump.write(f'==== trace dump {datetime.now().isoformat(timespec="seconds")}'
+                       f'{": " + reason if reason else ""} ====\n')
+            dump.writelines(line + '\n' for line in self.events())
+        return path
+
+    def dump_failure(self, error):
+        """
+        Instance method dump_failure() records an uncaught exception, and dumps the ring, a dump failure is reported
+            on stderr only.
+
+        Args:
+            error (BaseException): the exception
+        """
+        self.error('uncaught %r', error)
+        try:
+            path = self.dump(reason=repr(error))
+            print(f'>>>> [MAIN]: trace dumped to {path}', file=sys.stderr)
+        except OSError as e:
+            print(f'>>>> [MAIN]: trace dump failed {repr(e)}', file=sys.stderr)
+
+    def install_dump(self, path=None):
+        """
+        Instance method install_dump() dumps the ring when an exception is not caught, in the main thread
+            or in any other thread (tkinter callbacks are hooked by the main window, they don't reach these hooks).
+
+        Args:
+            path (String, optional): path of the dump file. Defaults to DUMP_PATH.
+        """
+        if path:
+            self.dumpPath = path
+        excepthook, threadExcepthook = sys.excepthook, threading.excepthook
+
+        def onException(excType, value, traceback):
+            if not issubclass(excType, KeyboardInterrupt):
+                self.dump_failure(value)
+            excepthook(excType, value, traceback)
+
+        def onThreadException(args):
+            if args.exc_type is not SystemExit:
+                self.dump_failure(args.exc_value)
+            threadExcepthook(args)
+
+        sys.excepthook = onException
+        threading.excepthook = onThreadException
+
+
+TRACE = Trace()
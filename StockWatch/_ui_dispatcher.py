@@ -0,0 +1,176 @@
+from threading import Lock
+from time import perf_counter
+from tkinter import TclError, Variable
+
+from ._metrics import METRICS
+from ._trace import TRACE
+
+# milliseconds between two pumps of the dispatcher (20 frames per second)
+FRAME_MS = 50
+
+# marks a target that was never set by the dispatcher
+_UNSET = object()
+
+
+class UIDispatcher():
+    """
+    Class UIDispatcher represents the single path from engine threads to tkinter widgets, tkinter is not
+        thread safe so engine threads never touch widgets directly, they post updates to the dispatcher instead.
+    Posted updates are kept in a pending dict keyed by their target (a variable, or a widget option),
+        so repeated updates of the same target between two frames are coalesced into the latest one,
+        and a pump driven by after() on the tkinter thread drains it once every frame, skipping
+        values that are already displayed (so a target set through the dispatcher should only be set through it).
+    The class is intended to be initialized and started only once by the Main window object, and passed down
+        to DisplayWindow objects, so all windows are updated by the same pump.
+    """
+
+    def __init__(self, root, interval=FRAME_MS):
+        """
+        UIDispatcher object constructor.
+
+        Args:
+            root (Tk object): the tkinter root window, the pump is scheduled on its event loop
+            interval (int, optional): milliseconds between two pumps. Defaults to FRAME_MS.
+        """
+        TRACE.info('>>>> [MAIN]: INITIALIZING UI DISPATCHER')
+        # primary switch
+        self.alive = True
+
+        self.root = root
+        self.interval = interval
+
+        # target key -> (apply function, value), and one-off calls in posting order
+        self._pending = {}
+        self._calls = []
+        self._lock = Lock()
+        # target key -> the last value applied
+        self._applied = {}
+
+        # counters of posted, coalesced (replaced before a pump), skipped (unchanged) and applied updates
+        self.posted = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.applied = 0
+
+    def _post(self, key, apply, value):
+        """
+        Private instance method _post() adds an update to the pending dict, replacing a pending update of the same target.
+        """
+        with self._lock:
+            self.posted += 1
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (apply, value)
+
+    def set(self, variable, value):
+        """
+        Instance method set() posts a new value of a tkinter variable, it can be called from any thread.
+
+        Args:
+            variable (Variable object): a tkinter StringVar/IntVar.. object
+            value: the new value
+        """
+        self._post(str(variable), variable.set, value)
+
+    def config(self, widget, **options):
+        """
+        Instance method config() posts new options of a widget, it can be called from any thread,
+            every option is a separate target.
+
+        Args:
+            widget (Widget object): a tkinter widget
+            **options: widget options (e.g. fg='green')
+        """
+        for option, value in options.items():
+            self._post(f'{widget}.{option}', lambda value, option=option: widget.config(**{option: value}), value)
+
+    def call(self, function, *args, **kwargs):
+        """
+        Instance method call() posts a function to be called on the tkinter thread on the next pump,
+            after the pending updates, calls are never coalesced.
+
+        Args:
+            function (callable): the function to call
+        """
+        with self._lock:
+            self.posted += 1
+            self._calls.append((function, args, kwargs))
+
+    def forget(self, window):
+        """
+        Instance method forget() drops the targets of a closed window, so the values last applied to them aren't kept
+            for the life of the application: the options of its widgets, and its variables (the tkinter variables
+            of its attributes). Their pending updates are dropped too. It must run on the tkinter thread.
+
+        Args:
+            window (Toplevel object): the closed window
+        """
+        prefix = f'{window}.'
+        variables = {str(value) for value in vars(window).values() if isinstance(value, Variable)}
+        with self._lock:
+            for targets in (self._pending, self._applied):
+                for key in [key for key in targets if key in variables or key.startswith(prefix)]:
+                    del targets[key]
+
+    def drain(self):
+        """
+        Instance method drain() applies all pending updates and calls, it must run on the tkinter thread.
+        A target of a destroyed widget raises TclError, it's dropped.
+        Drains that had anything to apply are recorded in METRICS.
+
+        Returns:
+            int: the number of updates applied and functions called
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            calls, self._calls = self._calls, []
+        if not (pending or calls):
+            return 0
+        start_time = perf_counter()
+
+        count = 0
+        for key, (apply, value) in pending.items():
+            if self._applied.get(key, _UNSET) == value:
+                self.skipped += 1
+                continue
+            try:
+                apply(value)
+            except TclError:
+                self._applied.pop(key, None)
+                continue
+            self._applied[key] = value
+            count += 1
+
+        for function, args, kwargs in calls:
+            try:
+                function(*args, **kwargs)
+            except Exception as e:
+                TRACE.error('>>>> [MAIN]: ui dispatcher call failed %r', e)
+            count += 1
+
+        self.applied += count
+        METRICS.observe('ui.drain', perf_counter() - start_time)
+        return count
+
+    def _pump(self):
+        """
+        Private instance method _pump() drains the dispatcher and schedules itself again
+            as long as the primary switch == True.
+        """
+        if not self.alive:
+            TRACE.info('>>>> [MAIN] ui dispatcher terminated - primary switch triggered')
+            return
+        self.drain()
+        self.root.after(self.interval, self._pump)
+
+    def start(self):
+        """
+        Instance method start() schedules the first pump on the tkinter event loop.
+        """
+        self.root.after(self.interval, self._pump)
+
+    def kill(self):
+        """
+        Instance function kill() stops the pump by setting the primary switch to False.
+        """
+        self.alive = False
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for PyStockWatch hot paths, run from the repository root as
+    $ python3 -m benchmarks.<module>
+"""
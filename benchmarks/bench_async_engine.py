@@ -0,0 +1,150 @@
+"""
+Benchmark of the symbol window engines of N windows: the thread model (a time thread and a data thread
+    per window) against the async model (two tasks per window on one AsyncEngine). Every model runs
+    in its own subprocess, the windows are headless DataControl objects fed by a QuoteHub with a fake
+    provider, the table sync sleeps like a network round trip, and the ui dispatcher is drained by the
+    main thread as the tkinter pump would, so no display, network or database is needed.
+    The table reports the threads and the memory (RSS) the windows added, the CPU time spent per second,
+    and the table syncs done per second (the async model caps them at NET_LIMIT concurrent syncs).
+
+    $ python3 -m benchmarks.bench_async_engine
+"""
+import json
+import subprocess
+import sys
+import threading
+from time import perf_counter, process_time, sleep
+
+from benchmarks.bench_quote_hub import FakeProvider
+from benchmarks.bench_ui_dispatcher import FakeRoot, FakeVariable, FakeWidget
+from StockWatch import _data_control
+from StockWatch._async_engine import AsyncEngine
+from StockWatch._data_control import DataControl
+from StockWatch._quote_hub import QuoteHub
+from StockWatch._ui_dispatcher import FRAME_MS, UIDispatcher
+
+WINDOWS = (10, 100, 500)
+MODELS = ('thread', 'async')
+SECONDS = 10
+SYNC_TIME = 0.05  # seconds per table sync, a yahoo history round trip
+
+
+class FakeTimeKeep():
+    """
+    A stand-in for TimeKeep with the market open.
+    """
+    msBool = True
+    localTime, localDate = '12:00:00 PM', '2026-10-16'
+    estTime, estZone, closeTime = '12:00:00 PM', 'EDT', '04:00:00 PM'
+
+    def subscribe(self, callback):
+        callback(True)
+
+    def unsubscribe(self, callback):
+        pass
+
+
+class FakeTable():
+    """
+    A stand-in for TableControl, the table is never read.
+    """
+
+    def __init__(self, sym, db_con, timeKeep):
+        pass
+
+    def read_table(self):
+        pass
+
+
+class HeadlessWindow(DataControl):
+    """
+    A DataControl without a window: fake variables and widgets, a table sync that sleeps,
+        and a window update that only posts the status.
+    """
+    syncs = 0
+
+    def __init__(self, sym, timeKeep, quoteHub, ui, engine):
+        self.sym = sym
+        for name in ('localTimeVal', 'localDateVal', 'estTimeVal', 'marketStatusVal', '_statusVal'):
+            setattr(self, name, FakeVariable())
+        self.marketStatusDisp, self.asOf = FakeWidget(), FakeWidget()
+        DataControl.__init__(self, None, timeKeep, quoteHub, ui, engine)
+
+    def _sync_table(self, first_run):
+        sleep(SYNC_TIME)
+        HeadlessWindow.syncs += 1
+
+    def _show_data(self, first_run, start_time):
+        self.update_status(status='Data Fetched')
+
+    def update_status(self, **kwargs):
+        self.ui.set(self._statusVal, kwargs['status'])
+
+
+def rss_kb():
+    """
+    Function rss_kb() returns the resident memory of this process in kB.
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(model, windows):
+    """
+    Function measure() runs the windows of a model for SECONDS, and returns the threads and memory
+        the windows added, the CPU seconds spent per second, and the table syncs per second.
+    """
+    _data_control.TableControl = FakeTable
+    timeKeep = FakeTimeKeep()
+    hub = QuoteHub(fetcher=FakeProvider())
+    ui = UIDispatcher(FakeRoot())
+    engine = AsyncEngine() if model == 'async' else None
+    hub.start()
+    if engine is not None:
+        engine.start()
+
+    threadsBefore, rssBefore = threading.active_count(), rss_kb()
+    allWindows = [HeadlessWindow(f'SYM{i}', timeKeep, hub, ui, engine) for i in range(windows)]
+    for window in allWindows:
+        window.start_engine()
+
+    HeadlessWindow.syncs = 0
+    cpuStart, wallStart = process_time(), perf_counter()
+    while perf_counter() - wallStart < SECONDS:
+        ui.drain()
+        sleep(FRAME_MS / 1000)
+    cpu = (process_time() - cpuStart) / SECONDS
+    result = {'threads': threading.active_count() - threadsBefore, 'rss': rss_kb() - rssBefore,
+              'cpu': cpu, 'syncs': HeadlessWindow.syncs / SECONDS}
+
+    for window in allWindows:
+        window.stop_engine()
+    hub.kill()
+    if engine is not None:
+        engine.kill()
+    return result
+
+
+def main():
+    print(f'\nengines of N windows, {SECONDS}s each, {SYNC_TIME * 1000:.0f}ms per table sync')
+    print(f'{"windows":>8} | {"model":>6} | {"threads":>7} | {"RSS MB":>7} | {"CPU ms/s":>8} | {"syncs/s":>7}')
+    for windows in WINDOWS:
+        for model in MODELS:
+            # a subprocess per run, so threads and memory of a run don't leak into the next
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_async_engine', model, str(windows)],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                    text=True, check=True).stderr
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f'{windows:>8} | {model:>6} | {result["threads"]:>7} | {result["rss"] / 1024:>7.1f} | '
+                  f'{result["cpu"] * 1000:>8.1f} | {result["syncs"]:>7.1f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        # the engines print to stdout, the result goes to stderr
+        print(json.dumps(measure(sys.argv[1], int(sys.argv[2]))), file=sys.stderr)
+    else:
+        main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of per-keystroke auto-complete lookup latency on a synthetic 10k symbols table:
+    the old pandas scan over the whole dataframe, against the SymbolIndex prefix lookup.
+
+    $ python3 -m benchmarks.bench_autocomplete
+"""
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from StockWatch._symbol_index import SymbolIndex
+
+SYMBOLS = 10000
+INPUTS = ['A', 'AP', 'APP', 'APPL', 'M', 'MI', 'MIC', 'MICRO', 'Z', 'QQ']
+REPEAT = 50
+
+
+def synthetic_symbols(count=SYMBOLS):
+    """
+    Function synthetic_symbols() returns a dataframe shaped like the symbols table.
+    """
+    rng = np.random.default_rng(0)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    symbols = sorted({''.join(rng.choice(letters, rng.integers(1, 6))) for _ in range(count * 2)})[:count]
+    words = ['Apple', 'Micro', 'Systems', 'Holdings', 'Global', 'Energy', 'Bank', 'Capital', 'Tech', 'Pharma']
+    names = [f'{rng.choice(words)} {rng.choice(words)} Inc. - Common Stock' for _ in symbols]
+    return pd.DataFrame({'Symbol': symbols, 'Security_Name': names})
+
+
+def pandas_scan(symbols, lastInput):
+    """
+    The pre-index lookup from AutoComplete._auto_complete().
+    """
+    return symbols.loc[symbols.Symbol.str.startswith(lastInput) |
+                       symbols.Security_Name.str.upper().str.startswith(lastInput)].to_dict(orient='records')
+
+
+def latency(func, *args):
+    """
+    Function latency() returns mean and p95 latency in microseconds over all INPUTS.
+    """
+    samples = []
+    for _ in range(REPEAT):
+        for lastInput in INPUTS:
+            start_time = perf_counter()
+            func(*args, lastInput)
+            samples.append((perf_counter() - start_time) * 1e6)
+    return np.mean(samples), np.percentile(samples, 95)
+
+
+def main():
+    symbols = synthetic_symbols()
+
+    start_time = perf_counter()
+    index = SymbolIndex.from_frame(symbols)
+    buildTime = (perf_counter() - start_time) * 1000
+
+    scanMean, scanP95 = latency(pandas_scan, symbols)
+    indexMean, indexP95 = latency(index.lookup)
+
+    print(f'\n{len(symbols)} symbols, index built in {buildTime:.1f}ms')
+    print(f'{"lookup":>12} | {"mean":>10} | {"p95":>10}')
+    print(f'{"pandas scan":>12} | {scanMean:>8.0f}us | {scanP95:>8.0f}us')
+    print(f'{"prefix index":>12} | {indexMean:>8.0f}us | {indexP95:>8.0f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of cold startup (a fresh interpreter per run) up to a ready auto-complete index,
+    reading the whole symbols table into a dataframe, against loading the memory-mapped snapshot.
+
+    $ python3 -m benchmarks.bench_cold_start
+"""
+import json
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+
+from benchmarks.bench_autocomplete import synthetic_symbols
+
+RUNS = 5
+
+# code run in a fresh interpreter, prints timings in milliseconds as json
+COLD_START = '''
+import json, sys
+from time import perf_counter
+start_time = perf_counter()
+from StockWatch._db_control import MainControl
+from StockWatch._symbol_index import SymbolIndex
+imported = perf_counter()
+db_con = MainControl(sys.argv[2])
+connected = perf_counter()
+if sys.argv[1] == 'table':
+    index = SymbolIndex.from_frame(db_con.symbols.get_symbols())
+else:
+    index = db_con.symbols.get_index()
+loaded = perf_counter()
+index.lookup('MIC')
+looked_up = perf_counter()
+print(json.dumps({'import': imported - start_time, 'db init': connected - imported,
+                  'symbols': loaded - connected, 'first lookup': looked_up - loaded}))
+'''
+
+
+def seed_database(db_path):
+    """
+    Function seed_database() fills a new database with synthetic symbols, as _update_symbols() would.
+    """
+    from StockWatch._db_control import MainControl
+
+    db_con = MainControl(db_path)
+    symbols = synthetic_symbols().set_index('Symbol')
+    symbols.to_sql(name='symbols', con=db_con.engine, if_exists='replace', index_label='Symbol')
+    db_con.symbols._rebuild_fts()
+    db_con.symbols.write_snapshot(source=db_con.logger.new_log('symbols', 'write'))
+    db_con.writer.kill()
+    db_con.engine.dispose()
+
+
+def cold_start(mode, db_path):
+    """
+    Function cold_start() returns the median timings in milliseconds of RUNS fresh interpreters.
+    """
+    runs = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', COLD_START, mode, db_path], capture_output=True,
+                                text=True, check=True, cwd=os.getcwd()).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: sorted(run[key] for run in runs)[RUNS // 2] * 1000 for key in runs[0]}
+
+
+def main():
+    with TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed_database(db_path)
+        results = {'table read': cold_start('table', db_path), 'snapshot': cold_start('snapshot', db_path)}
+
+    stages = list(results['snapshot'])
+    print(f'\nmedian of {RUNS} cold starts (ms)')
+    print(f'{"":>10} | ' + ' | '.join(f'{stage:>12}' for stage in stages) + f' | {"after import":>12}')
+    for mode, timings in results.items():
+        print(f'{mode:>10} | ' + ' | '.join(f'{timings[stage]:>12.1f}' for stage in stages) +
+              f' | {sum(timings.values()) - timings["import"]:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
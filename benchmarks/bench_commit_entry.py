@@ -0,0 +1,84 @@
+"""
+Benchmark of TableControl._commit_entry() on synthetic daily history: the old row by row
+    upsert (one statement per row) against the bulk executemany path.
+
+    $ python3 -m benchmarks.bench_commit_entry
+"""
+import os
+from functools import lru_cache
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from StockWatch._db_control import MainControl, TableControl
+
+YEARS = 32
+
+
+def synthetic_history(years=YEARS, start='1990-01-02'):
+    """
+    Function synthetic_history() returns a list of row dicts shaped like TableControl._fetch_quote() output.
+    """
+    dates = pd.bdate_range(start, periods=years * 252)
+    rng = np.random.default_rng(0)
+    close = 50 + np.cumsum(rng.normal(0, 1, len(dates)))
+    frame = pd.DataFrame({'High': close + 1, 'Low': close - 1, 'Open': close, 'Close': close,
+                          'Volume': rng.integers(1e5, 1e7, len(dates)).astype(float), 'Adj_Close': close})
+    frame['Date'] = dates.date
+    return frame.to_dict(orient='records')
+
+
+@lru_cache(maxsize=None)
+def session_factory(engine):
+    """
+    Function session_factory() returns the session factory of the engine, made once per engine as
+        MainControl used to make it, for the old calls that open a scoped session.
+    """
+    return sessionmaker(bind=engine)
+
+
+def row_by_row(tableControl, data):
+    """
+    The pre-bulk _commit_entry(): one insert ... on conflict do update per row.
+    """
+    write_session = scoped_session(session_factory(tableControl.db_con.engine))
+    for row in tableControl.bars.records(tableControl.sym, data):
+        insert_stmt = insert(tableControl.table).values(row).on_conflict_do_update(
+            index_elements=tableControl.table.primary_key, set_=row)
+        write_session.execute(insert_stmt)
+    write_session.commit()
+    write_session.remove()
+
+
+def timed(func, *args):
+    start_time = perf_counter()
+    func(*args)
+    return perf_counter() - start_time
+
+
+def main():
+    data = synthetic_history()
+    with TemporaryDirectory() as tmp:
+        db_con = MainControl(os.path.join(tmp, 'bench.db'))
+        legacy = TableControl('LEGACY', db_con, None)
+        bulk = TableControl('BULK', db_con, None)
+
+        results = [
+            ('first fill', timed(row_by_row, legacy, data), timed(bulk._commit_entry, data, 0)),
+            ('update last 5', timed(row_by_row, legacy, data[-5:]), timed(bulk._commit_entry, data[-5:], 1)),
+        ]
+        db_con.writer.kill()
+        db_con.engine.dispose()
+
+    print(f'\n{len(data)} rows ({YEARS} years of daily bars)')
+    print(f'{"case":>14} | {"row by row":>11} | {"bulk":>9} | {"speedup":>7}')
+    for case, legacyTime, bulkTime in results:
+        print(f'{case:>14} | {legacyTime * 1000:>9.1f}ms | {bulkTime * 1000:>7.1f}ms | {legacyTime / bulkTime:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of IngestDaemon throughput, to size it: a backfill cycle and an update cycle of N symbols
+    into a temporary database, with a fake yahoo fetch of a fixed round-trip latency.
+    The shared UPSTREAM rate limit is lifted to measure what the engine and the database sustain,
+    with it a cycle can't sync more than RATE symbols per second.
+
+    $ python3 -m benchmarks.bench_daemon
+"""
+import contextlib
+import os
+from tempfile import TemporaryDirectory
+from time import sleep
+
+import numpy as np
+import pandas as pd
+
+from StockWatch import _resilience
+from StockWatch._async_engine import AsyncEngine
+from StockWatch._daemon import IngestDaemon
+from StockWatch._db_control import MainControl
+from StockWatch._providers import DataProvider
+from StockWatch._time_control import TimeKeep
+
+WATCHLISTS = (50, 200)
+YEARS = 5
+ROUND_TRIP = 0.1
+END = '2026-10-16'
+
+
+class FakeProvider(DataProvider):
+    """
+    A provider of synthetic daily bars shaped like yahoo ones (and quotes), after a fixed latency, listing no symbols.
+    """
+
+    def history(self, sym, start=None):
+        sleep(ROUND_TRIP)
+        dates = pd.bdate_range(start if start is not None else pd.Timestamp(END) - pd.DateOffset(years=YEARS),
+                               END, name='Date')
+        close = 50 + np.cumsum(np.random.default_rng(len(sym)).normal(0, 1, len(dates)))
+        return pd.DataFrame({'High': close + 1, 'Low': close - 1, 'Open': close, 'Close': close,
+                             'Volume': 1e6, 'Adj Close': close}, index=dates)
+
+    def quotes(self, symbols):
+        sleep(ROUND_TRIP)
+        return pd.DataFrame({'longName': symbols, 'fullExchangeName': 'NasdaqGS', 'ask': 50.0, 'askSize': 1,
+                             'bid': 50.0, 'bidSize': 1, 'marketCap': 1e9}, index=symbols)
+
+    def listed(self):
+        return pd.DataFrame({'Security Name': pd.Series(dtype=str)}, index=pd.Index([], name='Symbol'))
+
+
+def run(symbols):
+    """
+    Function run() returns the (symbols/s, rows/s) of a backfill cycle and of an update cycle.
+    """
+    with TemporaryDirectory() as tmp:
+        db_con = MainControl(os.path.join(tmp, 'bench.db'), FakeProvider())
+        engine = AsyncEngine()
+        engine.start()
+        daemon = IngestDaemon([f'SYM{i}' for i in range(symbols)], db_con, TimeKeep(), engine)
+        results = []
+        pending = set(daemon.tables)
+        for _ in range(2):
+            seconds, synced, rows = daemon.seconds, daemon.synced, daemon.rows
+            pending = engine.submit(daemon._cycle(pending)).result()
+            seconds = daemon.seconds - seconds
+            results.append(((daemon.synced - synced) / seconds, (daemon.rows - rows) / seconds))
+        engine.kill()
+        db_con.writer.kill()
+        db_con.engine.dispose()
+    return results
+
+
+def main():
+    _resilience.UPSTREAM.limiter = _resilience.TokenBucket(rate=1e6, capacity=1e6)
+    print(f'\ndaemon cycles, {YEARS} years of daily bars per symbol, {ROUND_TRIP * 1000:.0f}ms per fetch')
+    print(f'{"symbols":>8} | {"backfill sym/s":>14} | {"rows/s":>8} | {"update sym/s":>12} | {"rows/s":>6}')
+    for symbols in WATCHLISTS:
+        with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+            (backfillSyms, backfillRows), (updateSyms, updateRows) = run(symbols)
+        print(f'{symbols:>8} | {backfillSyms:>14.1f} | {backfillRows:>8.0f} | {updateSyms:>12.1f} | {updateRows:>6.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark of the per-call overhead of the database layer, the calls every window makes several times per tick:
+    the old calls (a scoped session, or a new connection, and a statement built on every call) against
+    the per-thread connections and statements built (and compiled) once.
+
+    $ python3 -m benchmarks.bench_db_calls
+"""
+import contextlib
+import os
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import scoped_session
+
+from benchmarks.bench_commit_entry import session_factory, synthetic_history
+from StockWatch._db_control import MainControl, TableControl
+
+YEARS = 10
+CALLS = 200
+
+
+def legacy_load_table(tableControl):
+    read_session = scoped_session(session_factory(tableControl.db_con.engine))
+    read_stmt = tableControl.bars.select_stmt([tableControl.sym])
+    dbRead = pd.read_sql(read_stmt, read_session.bind, index_col='Date', parse_dates=['Date'])
+    read_session.remove()
+    return dbRead.drop(columns='symbol')
+
+
+def legacy_load_since(tableControl, date):
+    read_session = scoped_session(session_factory(tableControl.db_con.engine))
+    read_stmt = tableControl.bars.select_stmt([tableControl.sym], since=True)
+    dbRead = pd.read_sql(read_stmt, read_session.bind, params={'since': date}, index_col='Date', parse_dates=['Date'])
+    read_session.remove()
+    return dbRead.drop(columns='symbol')
+
+
+def legacy_commit_entry(tableControl, data):
+    write_session = scoped_session(session_factory(tableControl.db_con.engine))
+    insert_stmt = insert(tableControl.table)
+    insert_stmt = insert_stmt.on_conflict_do_update(
+        index_elements=tableControl.table.primary_key,
+        set_={col.name: insert_stmt.excluded[col.name] for col in tableControl.table.columns if not col.primary_key})
+    write_session.execute(insert_stmt, tableControl.bars.records(tableControl.sym, data))
+    write_session.commit()
+    write_session.remove()
+
+
+def legacy_new_log(db_con, table_name, op):
+    write_session = scoped_session(session_factory(db_con.engine))
+    write_session.execute(insert(db_con.logger.table).values(
+        {'Timestamp': datetime.now(), 'Table_name': table_name, 'Operation': op}))
+    write_session.commit()
+    write_session.remove()
+
+
+def legacy_get_log(db_con, table_name, op):
+    table = db_con.logger.table
+    read_session = scoped_session(session_factory(db_con.engine))
+    read_stmt = read_session.query(table).filter(table.c.get('Table_name') == table_name, table.c.get(
+        'Operation') == op).order_by(table.c.get('Timestamp').desc()).limit(1).statement
+    log = read_session.execute(read_stmt).mappings().first()
+    read_session.remove()
+    return log
+
+
+def legacy_is_symbol(db_con, sym):
+    with db_con.engine.connect() as connection:
+        return connection.execute(text('SELECT 1 FROM symbols WHERE Symbol = :sym LIMIT 1'), {'sym': sym}).first()
+
+
+def per_call(function, *args, calls=CALLS):
+    """
+    Function per_call() returns the median microseconds of a call, of the given number of calls.
+    """
+    samples = []
+    for _ in range(calls):
+        start_time = perf_counter()
+        function(*args)
+        samples.append(perf_counter() - start_time)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6
+
+
+def main():
+    data = synthetic_history(YEARS)
+    with TemporaryDirectory() as tmp, open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        db_con = MainControl(os.path.join(tmp, 'bench.db'))
+        tableControl = TableControl('BENCH', db_con, None)
+        tableControl._commit_entry(data, 0)
+        db_con.logger.new_log('symbols', 'read')
+        since = pd.Timestamp(data[-2]['Date'])
+
+        assert legacy_load_table(tableControl).equals(tableControl._load_table())
+        assert legacy_load_since(tableControl, since).equals(tableControl._load_since(since))
+        results = [
+            ('read table', per_call(legacy_load_table, tableControl, calls=20),
+             per_call(tableControl._load_table, calls=20)),
+            ('read since', per_call(legacy_load_since, tableControl, since),
+             per_call(tableControl._load_since, since)),
+            ('commit 5', per_call(legacy_commit_entry, tableControl, data[-5:]),
+             per_call(tableControl._commit_entry, data[-5:], 1)),
+            ('get log', per_call(legacy_get_log, db_con, 'symbols', 'read'),
+             per_call(db_con.logger.get_log, 'symbols', 'read')),
+            ('new log', per_call(legacy_new_log, db_con, 'bench', 'read'),
+             per_call(db_con.logger.new_log, 'bench', 'read')),
+            ('is symbol', per_call(legacy_is_symbol, db_con, 'BENCH'),
+             per_call(db_con.symbols.is_symbol, 'BENCH')),
+        ]
+        db_con.writer.kill()
+        db_con.engine.dispose()
+
+    print(f'\nmedian microseconds per call, {len(data)} rows in the table ({YEARS} years of daily bars)')
+    print(f'{"call":>11} | {"per call":>10} | {"reused":>10} | {"speedup":>7}')
+    for call, legacyTime, reusedTime in results:
+        print(f'{call:>11} | {legacyTime:>8.0f}us | {reusedTime:>8.0f}us | {legacyTime / reusedTime:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
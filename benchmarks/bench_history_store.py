@@ -0,0 +1,87 @@
+"""
+Benchmark of opening the history of a window on a long symbol table: the table read from the database into
+    a dataframe held in memory, against the memory-mapped history file (built on the first open, then only
+    opened and caught up with the table), in time and in memory allocated (tracemalloc peak, mapped pages
+    of the file aren't allocations). Also the cost of a tick (a revised last bar) applied to either.
+
+    $ python3 -m benchmarks.bench_history_store
+"""
+import contextlib
+import os
+import tracemalloc
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.bench_commit_entry import synthetic_history
+from StockWatch._db_control import MainControl, TableControl
+from StockWatch._history_cache import HistoryCache
+
+YEARS = 30
+RUNS = 5
+
+
+def open_memory(tableControl):
+    cache = HistoryCache(tableControl.sym, tableControl._load_table, tableControl._load_since)
+    cache.frame()
+    return cache
+
+
+def open_store(tableControl):
+    cache = HistoryCache(tableControl.sym, tableControl._load_table, tableControl._load_since,
+                         storePath=tableControl.cache.storePath, counter=tableControl._count_rows)
+    cache.frame()
+    return cache
+
+
+def measure(function, *args):
+    """
+    Function measure() returns the median milliseconds of RUNS calls, and the allocated peak megabytes of one.
+    """
+    samples = []
+    for _ in range(RUNS):
+        start_time = perf_counter()
+        function(*args)
+        samples.append(perf_counter() - start_time)
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return sorted(samples)[RUNS // 2] * 1000, peak / 2 ** 20
+
+
+def tick(cache, rows):
+    cache.apply_rows(rows)
+
+
+def main():
+    data = synthetic_history(YEARS)
+    revised = [dict(data[-1], Close=data[-1]['Close'] + 1)]
+    with TemporaryDirectory() as tmp, open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        db_con = MainControl(os.path.join(tmp, 'bench.db'))
+        tableControl = TableControl('BENCH', db_con, None)
+        tableControl._commit_entry(data, 0)
+
+        def cold():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tableControl.cache.storePath)
+            open_store(tableControl)
+
+        opened = [('read into memory', *measure(open_memory, tableControl)),
+                  ('history file, cold', *measure(cold)),
+                  ('history file, warm', *measure(open_store, tableControl))]
+        assert open_store(tableControl).frame().equals(open_memory(tableControl).frame())
+        ticks = [('memory', *measure(tick, open_memory(tableControl), revised)),
+                 ('history file', *measure(tick, open_store(tableControl), revised))]
+        db_con.writer.kill()
+
+    print(f'\nopening the history of {len(data)} bars ({YEARS} years of daily bars)')
+    print(f'{"case":>19} | {"time":>9} | {"allocated":>9}')
+    for case, ms, mb in opened:
+        print(f'{case:>19} | {ms:>7.1f}ms | {mb:>7.2f}MB')
+    print('\na tick (revised last bar)')
+    for case, ms, mb in ticks:
+        print(f'{case:>19} | {ms:>7.2f}ms | {mb:>7.2f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark of interactive replot latency of the symbol graph (mav keystrokes, period and type changes)
+    on 10 years of synthetic history: the old clear-and-mpf.plot() replot, against the PlotEngine
+    in-place artist updates. Then toolbar pan/zoom of a 'Max' candle chart of 40 years of history:
+    mplfinance drawing every daily candle, against the engine drawing the matching OHLC pyramid level.
+    Rendering uses the Agg backend, so no display is needed.
+
+    $ python3 -m benchmarks.bench_plot_graph
+"""
+from time import perf_counter
+
+import matplotlib
+matplotlib.use('agg')
+
+import mplfinance as mpf
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from benchmarks.bench_commit_entry import synthetic_history
+from StockWatch._plot_engine import PlotEngine
+
+YEARS = 10
+MAX_YEARS = 40
+REPEAT = 10
+STYLE = mpf.make_mpf_style(base_mpf_style='starsandstripes', rc={'font.size': 8}, y_on_right=False,
+                           gridstyle=':', gridcolor='grey')
+
+
+def history_frame(years=YEARS):
+    """
+    Function history_frame() returns synthetic history shaped like TableControl.read_table() output.
+    """
+    frame = pd.DataFrame(synthetic_history(years))
+    frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('Date')), name='Date')
+    return frame
+
+
+def scenarios(frame):
+    """
+    Function scenarios() returns the (name, list of plot configurations) replayed by both paths,
+        each configuration is what PlotGraph.plotConf holds after a user action.
+    """
+    last = frame.index[-1]
+    base = {'startDate': last - relativedelta(years=1), 'endDate': last, 'type': 'candle', 'mav': 2, 'vol': True}
+    periods = [last - relativedelta(months=months) for months in (1, 3, 6, 12, 36)] + [frame.index[0]]
+    return [
+        ('mav keystroke', [dict(base, mav=mav) for mav in range(3, 3 + REPEAT)]),
+        ('period change', [dict(base, startDate=periods[i % len(periods)]) for i in range(REPEAT)]),
+        ('type change', [dict(base, type=PlotEngine.TYPES[i % 3]) for i in range(REPEAT)]),
+    ]
+
+
+def legacy_replot(frame, confs):
+    """
+    The pre-engine PlotGraph._replot(): clear both axes and run mpf.plot() on the sliced dataframe.
+    """
+    fig, axlist = mpf.plot(frame.loc[confs[0]['startDate']:confs[0]['endDate']], volume=True, returnfig=True,
+                           figsize=(6, 3), type='line', mav=2, style=STYLE)
+    ax1, ax2 = axlist[0], axlist[2]
+    samples = []
+    for conf in confs:
+        start_time = perf_counter()
+        ax1.clear()
+        ax2.clear()
+        mpf.plot(frame.loc[conf['startDate']:conf['endDate']], ax=ax1, volume=ax2, type=conf['type'],
+                 mav=conf['mav'], xrotation=15, style=STYLE)
+        replotted = perf_counter()
+        fig.canvas.draw()
+        samples.append((replotted - start_time, perf_counter() - start_time))
+    return samples
+
+
+def engine_replot(frame, confs):
+    """
+    The PlotGraph path: update the persistent artists, then draw, only the moving average is drawn
+        if nothing else changed.
+    """
+    engine = PlotEngine('BENCH', STYLE, chartType='line', mav=2)
+    FigureCanvasAgg(engine.figure)
+    engine.set_data(frame)
+    engine.set_window(confs[0]['startDate'], confs[0]['endDate'])
+    engine.figure.canvas.draw()
+    samples = []
+    for conf in confs:
+        start_time = perf_counter()
+        engine.set_type(conf['type'])
+        engine.set_mav(conf['mav'])
+        engine.set_window(conf['startDate'], conf['endDate'])
+        replotted = perf_counter()
+        if engine.figure.stale:
+            engine.figure.canvas.draw()
+        else:
+            engine.draw_mav()
+        samples.append((replotted - start_time, perf_counter() - start_time))
+    return samples
+
+
+def zoom_ranges(length):
+    """
+    Function zoom_ranges() returns the x limits (trading day positions) of a zoom in from the whole history
+        to a month, followed by a pan back through the last year.
+    """
+    zoom = [(length * (1 - 1 / 2 ** i), length) for i in range(REPEAT)]
+    pan = [(length - 21 * (i + 1), length - 21 * i) for i in range(REPEAT)]
+    return [(low - 0.5, high - 0.5) for low, high in zoom + pan]
+
+
+def legacy_zoom(frame):
+    """
+    Toolbar pan/zoom of the pre-engine 'Max' chart: every daily candle is in the axes.
+    """
+    fig, axlist = mpf.plot(frame, volume=True, returnfig=True, figsize=(6, 3), type='candle', mav=2, style=STYLE,
+                           warn_too_much_data=len(frame) + 1)
+    fig.canvas.draw()
+    samples = []
+    for low, high in zoom_ranges(len(frame)):
+        start_time = perf_counter()
+        axlist[0].set_xlim(low, high)
+        fig.canvas.draw()
+        samples.append(perf_counter() - start_time)
+    return samples
+
+
+def engine_zoom(frame):
+    """
+    Toolbar pan/zoom of the PlotEngine 'Max' chart: the level is swapped on every x limits change.
+    """
+    engine = PlotEngine('BENCH', STYLE, chartType='candle', mav=2)
+    FigureCanvasAgg(engine.figure)
+    engine.set_data(frame)
+    engine.set_window(frame.index[0], frame.index[-1])
+    engine.figure.canvas.draw()
+    samples = []
+    for low, high in zoom_ranges(len(frame)):
+        start_time = perf_counter()
+        engine.priceAx.set_xlim(low, high)
+        engine.figure.canvas.draw()
+        samples.append(perf_counter() - start_time)
+    return samples
+
+
+def main():
+    frame = history_frame()
+    print(f'\n{len(frame)} bars, mean of {REPEAT} replots (ms): artists updated / artists updated and drawn')
+    print(f'{"":>14} | {"mpf.plot":>19} | {"PlotEngine":>19}')
+    for name, confs in scenarios(frame):
+        legacy = np.mean(legacy_replot(frame, confs), axis=0) * 1000
+        engine = np.mean(engine_replot(frame, confs), axis=0) * 1000
+        print(f'{name:>14} | {legacy[0]:>8.1f} / {legacy[1]:>8.1f} | {engine[0]:>8.1f} / {engine[1]:>8.1f}')
+
+    frame = history_frame(MAX_YEARS)
+    print(f'\n{len(frame)} bars \'Max\' candle chart, toolbar pan/zoom (ms per redraw)')
+    print(f'{"":>14} | {"mean":>8} | {"max":>8}')
+    for name, zoom in (('mpf.plot', legacy_zoom), ('PlotEngine', engine_zoom)):
+        samples = np.array(zoom(frame)) * 1000
+        print(f'{name:>14} | {samples.mean():>8.1f} | {samples.max():>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of upstream quote requests: one get_quote_yahoo call per window per tick,
+    against a single QuoteHub tick for the whole watchlist, using a fake provider
+    with a fixed round-trip latency.
+
+    $ python3 -m benchmarks.bench_quote_hub
+"""
+from threading import Lock, Thread
+from time import sleep, time
+
+import pandas as pd
+
+from StockWatch._quote_hub import QuoteHub
+
+ROUND_TRIP = 0.05  # seconds per upstream request
+PER_SYMBOL = 0.0001  # extra seconds per symbol in a request
+WATCHLISTS = [1, 10, 40, 100]
+
+
+class FakeProvider():
+    """
+    Class FakeProvider mimics get_quote_yahoo() with a fixed latency and counts requests.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self._lock = Lock()
+
+    def __call__(self, symbols):
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        with self._lock:
+            self.requests += 1
+        sleep(ROUND_TRIP + PER_SYMBOL * len(symbols))
+        return pd.DataFrame({'longName': symbols, 'fullExchangeName': 'NasdaqGS',
+                             'ask': 1.0, 'askSize': 1, 'bid': 1.0, 'bidSize': 1,
+                             'marketCap': 1000}, index=symbols)
+
+
+def per_window_tick(symbols):
+    """
+    One thread per window, each making its own request, as DataControl._dataGen used to.
+    """
+    provider = FakeProvider()
+    threads = [Thread(target=provider, args=(sym,)) for sym in symbols]
+    start_time = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time() - start_time, provider.requests
+
+
+def hub_tick(symbols):
+    """
+    A single QuoteHub tick fanning out to one subscriber per window.
+    """
+    provider = FakeProvider()
+    hub = QuoteHub(fetcher=provider)
+    for sym in symbols:
+        hub.subscribe(sym, lambda sym, quote, error: None)
+    latency = hub.tick()
+    return latency, provider.requests
+
+
+def main():
+    print(f'{"windows":>8} | {"per-window reqs":>15} {"latency":>9} | {"hub reqs":>8} {"latency":>9}')
+    for count in WATCHLISTS:
+        symbols = [f'SYM{i}' for i in range(count)]
+        windowLatency, windowRequests = per_window_tick(symbols)
+        hubLatency, hubRequests = hub_tick(symbols)
+        print(f'{count:>8} | {windowRequests:>15} {windowLatency * 1000:>7.1f}ms | '
+              f'{hubRequests:>8} {hubLatency * 1000:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark of provider recordings: a session of N symbols (a backfill, then a minute of quote ticks
+    and last bar updates) is recorded from a synthetic provider, and replayed without latency.
+    The table reports the size of the recording, the time it takes to load, and the calls per second
+    a replay serves, so a load test knows the replay is not its bottleneck.
+
+    $ python3 -m benchmarks.bench_replay
+"""
+import os
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from StockWatch._providers import DataProvider, RecordingProvider, ReplayProvider
+
+WATCHLISTS = (50, 200)
+YEARS = 10
+TICKS = 60
+END = '2026-10-16'
+
+
+class SyntheticProvider(DataProvider):
+    """
+    A provider of synthetic daily bars and quotes, without latency, listing no symbols.
+    """
+
+    def __init__(self):
+        self.rng = np.random.default_rng(0)
+
+    def history(self, sym, start=None):
+        dates = pd.bdate_range(start if start is not None else pd.Timestamp(END) - pd.DateOffset(years=YEARS),
+                               END, name='Date')
+        close = 50 + np.cumsum(self.rng.normal(0, 1, len(dates)))
+        return pd.DataFrame({'High': close + 1, 'Low': close - 1, 'Open': close, 'Close': close,
+                             'Volume': 1e6, 'Adj Close': close}, index=dates)
+
+    def quotes(self, symbols):
+        price = 50 + self.rng.normal(0, 1, len(symbols))
+        return pd.DataFrame({'longName': symbols, 'fullExchangeName': 'NasdaqGS', 'ask': price, 'askSize': 1,
+                             'bid': price, 'bidSize': 1, 'marketCap': 1e9}, index=symbols)
+
+    def listed(self):
+        return pd.DataFrame({'Security Name': pd.Series(dtype=str)}, index=pd.Index([], name='Symbol'))
+
+
+def record(path, symbols):
+    """
+    Function record() records a session, and returns the seconds it took.
+    """
+    recorder = RecordingProvider(SyntheticProvider(), path)
+    start_time = perf_counter()
+    for sym in symbols:
+        recorder.history(sym)
+    for _ in range(TICKS):
+        recorder.quotes(symbols)
+        for sym in symbols:
+            recorder.history(sym, END)
+    return perf_counter() - start_time, recorder.records
+
+
+def replay(path, symbols):
+    """
+    Function replay() replays a session, and returns (load seconds, history calls/s catching up
+        to the end of the session, history calls/s once merged, quotes calls/s).
+    """
+    start_time = perf_counter()
+    replayer = ReplayProvider(path, speed=1e6, latency=0)
+    load = perf_counter() - start_time
+
+    history = []
+    for _ in range(2):
+        start_time = perf_counter()
+        for sym in symbols:
+            replayer.history(sym, END)
+        history.append(len(symbols) / (perf_counter() - start_time))
+
+    start_time = perf_counter()
+    for _ in range(TICKS):
+        replayer.quotes(symbols)
+    quotes = TICKS / (perf_counter() - start_time)
+    return (load, *history, quotes)
+
+
+def main():
+    print(f'\nrecorded sessions: {YEARS} years backfill and {TICKS} ticks of N symbols')
+    print(f'{"symbols":>8} | {"records":>7} | {"record s":>8} | {"size MB":>7} | {"B/record":>8} | '
+          f'{"load s":>6} | {"history/s":>9} | {"merged/s":>8} | {"quotes/s":>8}')
+    for windows in WATCHLISTS:
+        symbols = [f'SYM{i}' for i in range(windows)]
+        with TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'session.rec')
+            recordTime, records = record(path, symbols)
+            size = os.path.getsize(path)
+            load, history, merged, quotes = replay(path, symbols)
+        print(f'{windows:>8} | {records:>7} | {recordTime:>8.1f} | {size / 2 ** 20:>7.1f} | {size / records:>8.0f} | '
+              f'{load:>6.1f} | {history:>9.0f} | {merged:>8.0f} | {quotes:>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
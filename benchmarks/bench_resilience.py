@@ -0,0 +1,116 @@
+"""
+Benchmark of N windows fetching once a second through a provider outage: the old retry loop
+    (3 attempts 1s apart, then the window's thread dies with ConnectionError) against retries
+    through the shared Upstream (token bucket, circuit breaker) with jittered exponential backoff.
+    The table reports the requests the provider took during the outage, the busiest second,
+    the windows still fetching at the end, and the seconds from the end of the outage until
+    every live window fetched again.
+
+    $ python3 -m benchmarks.bench_resilience
+"""
+from threading import Lock, Thread
+from time import monotonic, sleep
+
+from StockWatch._resilience import Backoff, CircuitBreaker, TokenBucket, Upstream
+
+WINDOWS = (10, 50, 200)
+OUTAGE = (2, 8)  # seconds the provider is down, from the start of the run
+SECONDS = 14
+ROUND_TRIP = 0.05
+# circuit recovery and longest backoff, shortened from 30s to fit the run
+RECOVERY = 2
+
+
+class FlakyProvider():
+    """
+    A provider that fails during the outage, and records when each request was made.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.requests = []
+        self._lock = Lock()
+
+    def __call__(self):
+        now = monotonic() - self.start
+        with self._lock:
+            self.requests.append(now)
+        sleep(ROUND_TRIP)
+        if OUTAGE[0] <= now < OUTAGE[1]:
+            raise ConnectionError('provider down')
+
+
+def legacy_window(provider, fetched, index, stop):
+    """
+    The pre-Upstream DataControl._dataGen() retry loop.
+    """
+    while not stop():
+        for _ in range(3):
+            try:
+                provider()
+                fetched[index].append(monotonic())
+                break
+            except Exception:
+                sleep(0.5)
+                sleep(0.5)
+        else:
+            return
+        sleep(1)
+
+
+def resilient_window(provider, fetched, index, stop, upstream):
+    """
+    The DataControl._dataGen() retry loop, through the shared Upstream with backoff.
+    """
+    backoff = Backoff(cap=RECOVERY)
+    while not stop():
+        try:
+            upstream.call(provider)
+        except Exception as e:
+            sleep(max(backoff.next(), getattr(e, 'retryIn', 0)))
+            continue
+        backoff.reset()
+        fetched[index].append(monotonic())
+        sleep(1)
+
+
+def run(windows, resilient):
+    """
+    Function run() runs the windows for SECONDS, and returns (requests during the outage, the most requests
+        in a second of the outage, windows fetching at the end, seconds until every live window fetched again).
+    """
+    start = monotonic()
+    provider = FlakyProvider(start)
+    fetched = [[] for _ in range(windows)]
+    # the rate fits every window fetching once a second
+    upstream = Upstream(TokenBucket(rate=windows * 1.2, capacity=windows), CircuitBreaker(recovery=RECOVERY))
+    stop = lambda: monotonic() - start > SECONDS
+    threads = [Thread(target=resilient_window if resilient else legacy_window, daemon=True,
+                      args=(provider, fetched, i, stop) + ((upstream,) if resilient else ()))
+               for i in range(windows)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    during = [t for t in provider.requests if OUTAGE[0] <= t < OUTAGE[1]]
+    perSecond = [sum(int(t) == second for t in during) for second in range(*OUTAGE)]
+    outageEnd = start + OUTAGE[1]
+    firstFetches = [min(t for t in times if t >= outageEnd) for times in fetched
+                    if times and times[-1] >= outageEnd]
+    recovery = max(firstFetches) - outageEnd if firstFetches else float('nan')
+    return len(during), max(perSecond), len(firstFetches), recovery
+
+
+def main():
+    print(f'\nwindows fetching once a second, provider down from {OUTAGE[0]}s to {OUTAGE[1]}s of {SECONDS}s')
+    print(f'{"windows":>8} | {"model":>9} | {"outage requests":>15} | {"peak/s":>6} | {"live":>5} | {"recovery s":>10}')
+    for windows in WINDOWS:
+        for resilient in (False, True):
+            during, peak, live, recovery = run(windows, resilient)
+            print(f'{windows:>8} | {"upstream" if resilient else "legacy":>9} | {during:>15} | {peak:>6} | '
+                  f'{live:>5} | {recovery:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
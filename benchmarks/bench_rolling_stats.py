@@ -0,0 +1,60 @@
+"""
+Benchmark of the per-tick data table statistics (52-week high/low and average volume) against history length:
+    the old DisplayWindow.update_window() computation over the dataframe, against a RollingStats update
+    with a revision of the last bar.
+
+    $ python3 -m benchmarks.bench_rolling_stats
+"""
+from time import perf_counter
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from benchmarks.bench_plot_graph import history_frame
+from StockWatch._rolling_stats import RollingStats
+
+HISTORY_YEARS = (1, 10, 40)
+TICKS = 200
+
+
+def dataframe_tick(frame):
+    """
+    The pre-RollingStats update_window(): a .loc slice for the 52-week range, and a python sum over all volumes.
+    """
+    lastEntryDate = frame.tail(1).index.item()
+    FTWeeksDate = lastEntryDate - relativedelta(weeks=52) - relativedelta(days=1)
+    FTWeeksMax = frame['High'].loc[FTWeeksDate:].max()
+    FTWeeksMin = frame['Low'].loc[FTWeeksDate:].min()
+    VolumeAvgColumn = frame['Volume']
+    return FTWeeksMax, FTWeeksMin, sum(VolumeAvgColumn) / len(VolumeAvgColumn)
+
+
+def main():
+    print(f'\nmean per tick (us) of {TICKS} ticks, each revising the last bar')
+    print(f'{"bars":>8} | {"dataframe":>10} | {"RollingStats":>12} | {"from_frame":>10}')
+    rng = np.random.default_rng(0)
+    for years in HISTORY_YEARS:
+        frame = history_frame(years)
+        date, high, low, volume = frame.index[-1], frame['High'].iloc[-1], frame['Low'].iloc[-1], frame['Volume'].iloc[-1]
+        revisions = [(high * factor, low / factor, volume * factor) for factor in rng.uniform(1, 1.05, TICKS)]
+
+        start_time = perf_counter()
+        for _ in range(TICKS):
+            dataframe_tick(frame)
+        legacy = (perf_counter() - start_time) / TICKS * 1e6
+
+        start_time = perf_counter()
+        stats = RollingStats.from_frame(frame)
+        build = (perf_counter() - start_time) * 1e6
+
+        start_time = perf_counter()
+        for revHigh, revLow, revVolume in revisions:
+            stats.update(date, revHigh, revLow, revVolume)
+            stats.high, stats.low, stats.avgVolume
+        rolling = (perf_counter() - start_time) / TICKS * 1e6
+
+        print(f'{len(frame):>8} | {legacy:>10.1f} | {rolling:>12.2f} | {build:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
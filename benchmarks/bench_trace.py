@@ -0,0 +1,59 @@
+"""
+Benchmark of the per-event cost of debug output, an event like TableControl's "> [SYM]: reading table since DATE":
+    the old f-string print (silent mode redirects it to devnull), against TRACE events with echo on (to devnull),
+    with echo off (silent mode, recorded in the ring), and with the debug level off.
+
+    $ python3 -m benchmarks.bench_trace
+"""
+import contextlib
+import os
+from datetime import date
+from time import perf_counter
+
+from StockWatch._trace import DEBUG, INFO, Trace
+
+EVENTS = 200000
+SYM = 'MSFT'
+DATE = date(2026, 10, 16)
+
+
+def legacy(events):
+    for _ in range(events):
+        print(f'> [{SYM}]: reading table since {DATE}')
+
+
+def traced(trace, events):
+    for _ in range(events):
+        trace.debug('> [%s]: reading table since %s', SYM, DATE)
+
+
+def per_event(function, *args):
+    """
+    Function per_event() returns the nanoseconds per event of a run of EVENTS events, stdout to devnull.
+    """
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        start_time = perf_counter()
+        function(*args, EVENTS)
+        return (perf_counter() - start_time) / EVENTS * 1e9
+
+
+def main():
+    cases = [
+        ('print (silent)', legacy),
+        ('trace, echo on', traced, Trace(level=DEBUG, echo=True)),
+        ('trace, echo off', traced, Trace(level=DEBUG, echo=False)),
+        ('trace, debug off', traced, Trace(level=INFO, echo=False)),
+    ]
+    print(f'\n{EVENTS} debug events, nanoseconds per event')
+    print(f'{"case":>18} | {"ns/event":>8}')
+    for name, function, *args in cases:
+        print(f'{name:>18} | {per_event(function, *args):>8.0f}')
+
+    trace = cases[2][2]
+    start_time = perf_counter()
+    lines = trace.events()
+    print(f'\ndump of the ring ({len(lines)} events) formatted in {(perf_counter() - start_time) * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark of widget updates of N symbol windows over a simulated market session: every window posts
+    the updates of its time and data generators once a second, as DataControl does. Without the dispatcher
+    every update is a tkinter call made from an engine thread, with it the updates are coalesced and
+    unchanged values are skipped, and the remaining calls are made by the pump on the tkinter thread.
+    Fake variables and widgets stand in for tkinter ones, so no display is needed.
+
+    $ python3 -m benchmarks.bench_ui_dispatcher
+"""
+from itertools import count
+from time import perf_counter
+
+import numpy as np
+
+from StockWatch._ui_dispatcher import FRAME_MS, UIDispatcher
+
+WINDOWS = (1, 10, 100, 300)
+SECONDS = 30
+# fields of the data table (DisplayWindow.update_window) and the chance their value changed on a tick
+DATA_FIELDS = {'close': 0.5, 'dayRange': 0.2, 'open': 0.0, 'vol': 0.9, 'prevclose': 0.0, 'fiftyTwo': 0.01,
+               'avgVol': 0.9, 'ask': 0.5, 'bid': 0.5, 'marketCap': 0.5, 'diff': 0.5, 'estDate': 0.0}
+
+_names = count()
+
+
+class FakeVariable():
+    """
+    A stand-in for a tkinter variable, counts the calls made into it.
+    """
+    calls = 0
+
+    def __init__(self):
+        self.name = f'PY_VAR{next(_names)}'
+        self.value = None
+
+    def __str__(self):
+        return self.name
+
+    def set(self, value):
+        FakeVariable.calls += 1
+        self.value = value
+
+
+class FakeWidget(FakeVariable):
+    """
+    A stand-in for a tkinter widget, counts the calls made into it.
+    """
+
+    def config(self, **options):
+        FakeVariable.calls += 1
+
+
+class FakeRoot():
+    def after(self, ms, function):
+        pass
+
+
+def window_updates(window, second, rng):
+    """
+    Function window_updates() returns the (kind, target, value) updates a window posts in one second:
+        the time generator updates, then the data generator status, data table and interval updates.
+    """
+    updates = [('set', window['localTime'], f'{second}'), ('set', window['localDate'], '2026-10-16'),
+               ('set', window['estTime'], f'| {second} EDT'), ('set', window['marketStatus'], 'Markets Are Open'),
+               ('config', window['marketStatusDisp'], 'green'),
+               ('set', window['status'], 'Fetching Data..')]
+    for field, chance in DATA_FIELDS.items():
+        if rng.random() < chance:
+            window['values'][field] += 1
+        updates.append(('set', window[field], window['values'][field]))
+    updates += [('config', window['diffLabel'], 'green'),
+                ('set', window['interval'], f'Update Interval: {rng.uniform(0.1, 0.3):.2f}s'),
+                ('set', window['status'], 'Data Fetched')]
+    return updates
+
+
+def simulate(windows, dispatcher=None):
+    """
+    Function simulate() posts SECONDS of updates of all windows, directly or through the dispatcher
+        (drained once per frame), and returns (tkinter calls, calls made from engine threads, seconds spent
+        on the tkinter thread).
+    """
+    rng = np.random.default_rng(0)
+    targets = ['localTime', 'localDate', 'estTime', 'marketStatus', 'status', 'interval'] + list(DATA_FIELDS)
+    allWindows = [{**{target: FakeVariable() for target in targets},
+                   'marketStatusDisp': FakeWidget(), 'diffLabel': FakeWidget(),
+                   'values': dict.fromkeys(DATA_FIELDS, 0)} for _ in range(windows)]
+    FakeVariable.calls = 0
+    tkTime = 0.0
+    framesPerSecond = 1000 // FRAME_MS
+    for second in range(SECONDS):
+        for window in allWindows:
+            for kind, target, value in window_updates(window, second, rng):
+                if dispatcher is None:
+                    target.set(value) if kind == 'set' else target.config(fg=value)
+                elif kind == 'set':
+                    dispatcher.set(target, value)
+                else:
+                    dispatcher.config(target, fg=value)
+        if dispatcher is None:
+            continue
+        # the updates of a second land in a single frame, the others are empty
+        for _ in range(framesPerSecond):
+            start_time = perf_counter()
+            dispatcher.drain()
+            tkTime += perf_counter() - start_time
+    calls = FakeVariable.calls
+    return calls, (calls if dispatcher is None else 0), tkTime
+
+
+def main():
+    print(f'\nwidget updates per second, {SECONDS}s simulated session')
+    print(f'{"windows":>8} | {"direct calls":>12} | {"cross-thread":>12} | {"dispatched":>10} | '
+          f'{"cross-thread":>12} | {"pump ms/s":>9}')
+    for windows in WINDOWS:
+        direct, directCross, _ = simulate(windows)
+        dispatched, dispatchedCross, tkTime = simulate(windows, UIDispatcher(FakeRoot()))
+        print(f'{windows:>8} | {direct / SECONDS:>12.0f} | {directCross / SECONDS:>12.0f} | '
+              f'{dispatched / SECONDS:>10.0f} | {dispatchedCross / SECONDS:>12.0f} | {tkTime / SECONDS * 1000:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
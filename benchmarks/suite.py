@@ -0,0 +1,377 @@
+"""
+Benchmark suite of the per-tick hot paths on synthetic data, to know whether a change makes them slower:
+    TableControl._commit_entry() (first fill and last bars update), read_table() (cold and refresh),
+    write_table() filling a gap, the auto-complete matches of a keystroke, DisplayWindow.update_window()
+    and PlotGraph._replot() per chart type. Rendering uses the Agg backend, so no display is needed.
+Every case runs a few rounds, and its fastest round is kept (median, p95 and mean milliseconds per call).
+Results are written as JSON, and compared to a saved baseline:
+    a case is a regression if its median is slower than the baseline by more than the threshold,
+    and the command exits with status 1.
+
+    $ python3 -m benchmarks.suite --output baseline.json
+    $ python3 -m benchmarks.suite --output current.json --compare baseline.json [--threshold 0.25]
+    $ python3 -m benchmarks.suite --filter plot --rounds 1
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import matplotlib
+matplotlib.use('agg')
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from benchmarks.bench_autocomplete import INPUTS, synthetic_symbols
+from benchmarks.bench_commit_entry import synthetic_history
+from benchmarks.bench_plot_graph import STYLE
+from benchmarks.bench_ui_dispatcher import FakeRoot, FakeVariable, FakeWidget
+from StockWatch import _resilience
+from StockWatch._data_control import DataControl
+from StockWatch._db_control import MainControl, TableControl
+from StockWatch._helper_toolbox import AutoComplete
+from StockWatch._plot_engine import PlotEngine
+from StockWatch._plot_graph import PlotGraph
+from StockWatch._providers import DataProvider
+from StockWatch._sym_window import DisplayWindow
+from StockWatch._symbol_index import SymbolIndex
+from StockWatch._ui_dispatcher import UIDispatcher
+
+YEARS = 10
+GAP = 5
+REPEAT = 30
+ROUNDS = 3
+THRESHOLD = 0.25
+# cases faster than this (in milliseconds) are not flagged, their timer noise is larger than the threshold
+NOISE_MS = 0.05
+
+CASES = {}
+
+
+def case(name, repeat=REPEAT):
+    """
+    Function case() registers a case of the suite, a function that takes the suite context
+        and a number of samples, and returns the seconds each sample took.
+    """
+    def register(function):
+        CASES[name] = (function, repeat)
+        return function
+    return register
+
+
+class SuiteProvider(DataProvider):
+    """
+    A provider of the synthetic history and symbols, without latency.
+    """
+
+    def __init__(self, rows, symbols):
+        self.frame = pd.DataFrame(rows).rename(columns={'Adj_Close': 'Adj Close'})
+        self.frame.index = pd.DatetimeIndex(pd.to_datetime(self.frame.pop('Date')), name='Date')
+        self.symbols = symbols
+
+    def history(self, sym, start=None):
+        return self.frame.loc[pd.Timestamp(start) if start is not None else None:].copy()
+
+    def quotes(self, symbols):
+        last = self.frame['Close'].iloc[-1]
+        return pd.DataFrame({'longName': symbols, 'fullExchangeName': 'NasdaqGS', 'ask': last, 'askSize': 1,
+                             'bid': last, 'bidSize': 1, 'marketCap': 10 ** 9}, index=symbols)
+
+    def listed(self):
+        return self.symbols.rename(columns={'Security_Name': 'Security Name'}).set_index('Symbol')
+
+
+class SuiteCalendar():
+    """
+    A market calendar of the synthetic history, its last bar is the last trading day.
+    """
+
+    def __init__(self, lastDay):
+        self.lastDay = lastDay
+
+    def last_trading_day(self, now=None):
+        return self.lastDay
+
+
+class SuiteTimeKeep():
+    """
+    A stand-in for TimeKeep, write_table() only reads its calendar.
+    """
+
+    def __init__(self, lastDay):
+        self.calendar = SuiteCalendar(lastDay)
+
+
+class SuiteWindow():
+    """
+    A DisplayWindow without widgets: its variables and the diff label are stand-ins, posted to a ui dispatcher
+        that is drained after every sample, and its data is read through the DataControl properties.
+    """
+    dbRead = DataControl.dbRead
+    dbPyramid = DataControl.dbPyramid
+    dbStats = DataControl.dbStats
+
+    def __init__(self, sym, db_con, quote):
+        self.sym = sym
+        self.db = TableControl(sym, db_con, None)
+        self.db.read_table()
+        self.yahooQuote = quote
+        self.ui = UIDispatcher(FakeRoot())
+        self.diffLabel = FakeWidget()
+        self.latestClose = ''
+        for name in ('estDateVal', '_closeVal', '_dayRangeVal', '_openVal', '_volVal', '_prevcloseVal', '_fiftyTwoVal',
+                     '_avgVolVal', '_askVal', '_bidVal', '_marketCapVal', '_diffVal'):
+            setattr(self, name, FakeVariable())
+
+    def flash_diff(self, color):
+        pass
+
+    def update_status(self, **kwargs):
+        pass
+
+
+class Context():
+    """
+    The synthetic data and the temporary database shared by the cases.
+    """
+
+    def __init__(self, tmp):
+        self.rows = synthetic_history(YEARS)
+        self.lastDay = self.rows[-1]['Date']
+        self.provider = SuiteProvider(self.rows, synthetic_symbols())
+        self.timeKeep = SuiteTimeKeep(self.lastDay)
+        self.db_con = MainControl(os.path.join(tmp, 'suite.db'), self.provider)
+        self._symbols = 0
+
+    def symbol(self):
+        """
+        Instance method symbol() returns a symbol that has no bars yet.
+        """
+        self._symbols += 1
+        return f'SUITE{self._symbols}'
+
+    def filled(self, rows=None):
+        """
+        Instance method filled() returns the TableControl of a new symbol filled with rows (all the history by default).
+        """
+        table = TableControl(self.symbol(), self.db_con, self.timeKeep)
+        table._commit_entry(self.rows if rows is None else rows, 0)
+        return table
+
+    def revised(self, i):
+        """
+        Instance method revised() returns the last bar revised as a quote tick would, the i-th time.
+        """
+        return [dict(self.rows[-1], Close=self.rows[-1]['Close'] + (i % 7 - 3) * 0.01, Volume=1e6 + i)]
+
+    def close(self):
+        self.db_con.writer.kill()
+        self.db_con.engine.dispose()
+
+
+def timed(function, *args):
+    start_time = perf_counter()
+    function(*args)
+    return perf_counter() - start_time
+
+
+@case('commit_entry.first_fill', repeat=20)
+def commit_first_fill(ctx, repeat):
+    return [timed(TableControl(ctx.symbol(), ctx.db_con, None)._commit_entry, ctx.rows, 0) for _ in range(repeat)]
+
+
+@case('commit_entry.update')
+def commit_update(ctx, repeat):
+    table = ctx.filled()
+    table.read_table()
+    return [timed(table._commit_entry, ctx.rows[-GAP + 1:-1] + ctx.revised(i), 1) for i in range(repeat)]
+
+
+@case('read_table.cold', repeat=20)
+def read_table_cold(ctx, repeat):
+    sym = ctx.filled().sym
+    return [timed(TableControl(sym, ctx.db_con, None).read_table) for _ in range(repeat)]
+
+
+@case('read_table.refresh')
+def read_table_refresh(ctx, repeat):
+    table = ctx.filled()
+    table.read_table()
+    return [timed(table.read_table, True) for _ in range(repeat)]
+
+
+@case('write_table.gap', repeat=20)
+def write_table_gap(ctx, repeat):
+    # tables missing their last GAP bars, each is opened as a new window would
+    symbols = [ctx.filled(ctx.rows[:-GAP]).sym for _ in range(repeat)]
+    return [timed(TableControl(sym, ctx.db_con, ctx.timeKeep).write_table) for sym in symbols]
+
+
+@case('autocomplete.keystroke')
+def autocomplete_keystroke(ctx, repeat):
+    ctx.db_con.symbols._update_symbols()
+    completer = AutoComplete.__new__(AutoComplete)
+    completer.index = SymbolIndex.from_frame(ctx.provider.symbols)
+    completer.search = ctx.db_con.symbols.search
+    completer.limit = 20
+    return [timed(completer._matches, INPUTS[i % len(INPUTS)]) for i in range(repeat * len(INPUTS))]
+
+
+@case('update_window.tick', repeat=100)
+def update_window_tick(ctx, repeat):
+    window = SuiteWindow(ctx.symbol(), ctx.db_con, None)
+    window.db._commit_entry(ctx.rows, 0)
+    window.yahooQuote = ctx.provider.quotes([window.sym])
+    samples = []
+    for i in range(repeat):
+        window.db.cache.apply_rows(ctx.revised(i))
+        samples.append(timed(DisplayWindow.update_window, window, False))
+        window.ui.drain()
+    return samples
+
+
+def replot_case(chartType):
+    """
+    Function replot_case() registers the replot case of a chart type: the graph of a 1 year period is
+        replotted after every revision of the last bar, as PlotGraph._replot() does.
+    """
+    @case(f'plot_replot.{chartType}', repeat=20)
+    def plot_replot(ctx, repeat):
+        window = SuiteWindow(ctx.symbol(), ctx.db_con, None)
+        window.db._commit_entry(ctx.rows, 0)
+        graph = PlotGraph.__new__(PlotGraph)
+        graph.control = window
+        lastEntry = window.dbRead.index[-1]
+        graph.plotConf = {'startDate': lastEntry - relativedelta(years=1), 'endDate': lastEntry,
+                          'type': chartType, 'mav': 2, 'vol': True}
+        graph.engine = PlotEngine(window.sym, STYLE, figsize=(6, 3), chartType=chartType, mav=2)
+        FigureCanvasAgg(graph.engine.figure)
+        graph._replot()
+        samples = []
+        for i in range(repeat):
+            window.db.cache.apply_rows(ctx.revised(i))
+            samples.append(timed(graph._replot))
+        return samples
+    return plot_replot
+
+
+for chartType in PlotEngine.TYPES:
+    replot_case(chartType)
+
+
+def summary(samples):
+    """
+    Function summary() returns the median, p95 and mean milliseconds of the seconds of a case samples.
+    """
+    ms = np.array(samples) * 1000
+    return {'median_ms': round(float(np.median(ms)), 4), 'p95_ms': round(float(np.percentile(ms, 95)), 4),
+            'mean_ms': round(float(ms.mean()), 4), 'samples': len(ms)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(names, rounds=ROUNDS):
+    """
+    Function run() runs the cases, each on its own symbols of a shared temporary database, a number of rounds
+        in a row, and keeps the round of each case with the lowest median (the one least disturbed by the system).
+
+    Returns:
+        dict: the results, {'meta': {...}, 'cases': {name: summary}}
+    """
+    # the shared UPSTREAM rate limit is lifted, the suite measures the engine and the database
+    _resilience.UPSTREAM.limiter = _resilience.TokenBucket(rate=1e6, capacity=1e6)
+    results = {'meta': {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                        'python': platform.python_version(), 'platform': platform.platform(),
+                        'years': YEARS, 'rounds': rounds}, 'cases': {}}
+    with TemporaryDirectory() as tmp:
+        with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+            ctx = Context(tmp)
+        try:
+            for _ in range(rounds):
+                for name in names:
+                    function, repeat = CASES[name]
+                    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+                        # the first sample warms up caches and lazy imports, it is left out
+                        stats = summary(function(ctx, repeat + 1)[1:])
+                    if name not in results['cases'] or stats['median_ms'] < results['cases'][name]['median_ms']:
+                        results['cases'][name] = stats
+        finally:
+            ctx.close()
+    for name, stats in results['cases'].items():
+        print(f'{name:>24} | {stats["median_ms"]:>10.3f} | {stats["p95_ms"]:>10.3f} | '
+              f'{stats["mean_ms"]:>10.3f} | {stats["samples"]:>7}')
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Function compare() prints the median of every case against a baseline, and flags the regressions.
+
+    Returns:
+        list: the names of the cases that regressed
+    """
+    print(f'\nagainst baseline {baseline["meta"].get("commit")} ({baseline["meta"].get("timestamp")}), '
+          f'threshold +{threshold:.0%}')
+    print(f'{"case":>24} | {"baseline ms":>11} | {"current ms":>10} | {"change":>7} |')
+    regressions = []
+    for name, stats in results['cases'].items():
+        if name not in baseline['cases']:
+            print(f'{name:>24} | {"-":>11} | {stats["median_ms"]:>10.3f} | {"-":>7} | new')
+            continue
+        before, after = baseline['cases'][name]['median_ms'], stats['median_ms']
+        change = after / before - 1 if before else 0.0
+        flag = ''
+        if change > threshold and after - before > NOISE_MS:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif change < -threshold and before - after > NOISE_MS:
+            flag = 'faster'
+        print(f'{name:>24} | {before:>11.3f} | {after:>10.3f} | {change:>+7.0%} | {flag}')
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python3 -m benchmarks.suite',
+                                     description='Benchmark the per-tick hot paths, and compare them to a baseline.')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON file of saved results to compare to')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='median slowdown flagged as a regression (0.25 is 25%% slower)')
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help='runs of every case, the fastest is kept')
+    parser.add_argument('--filter', default='', help='only run the cases whose name contains this')
+    args = parser.parse_args(args)
+
+    names = [name for name in CASES if args.filter in name]
+    baseline = None
+    if args.compare:
+        with open(args.compare) as saved:
+            baseline = json.load(saved)
+
+    print(f'\n{YEARS} years of daily bars, milliseconds per call, fastest of {args.rounds} rounds')
+    print(f'{"case":>24} | {"median":>10} | {"p95":>10} | {"mean":>10} | {"samples":>7}')
+    results = run(names, args.rounds)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'\nresults written to {args.output}')
+    if baseline is not None and compare(results, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())